@@ -0,0 +1,52 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+def _as_list(value) -> list:
+    """Accept a single value, a list, or a {start, end} range (inclusive)"""
+    if value is None:
+        return []
+    if isinstance(value, dict):
+        return list(range(int(value["start"]), int(value["end"]) + 1))
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return [value]
+
+def expand_units(config: dict) -> list[tuple]:
+    """
+    Return the (league, season) units of work described by a pipeline config.
+
+    Leagues are read from `leagues` or `league`, seasons from `seasons` or `season`.
+    Each may be a single value, a list, or for seasons a `{start: ..., end: ...}` range.
+    """
+    leagues = _as_list(config.get("leagues", config.get("league")))
+    seasons = _as_list(config.get("seasons", config.get("season")))
+    return [(league, season) for league in leagues for season in seasons]
+
+def run_units(
+        func,
+        units: list[tuple],
+        max_processes: int = 1,
+        initializer=None,
+        initargs: tuple = ()
+    ) -> list:
+    """
+    Run `func(league, season)` for every unit in a pool of processes.
+
+    Args:
+        func: a picklable (module-level) function taking a league and a season
+        units: list of (league, season) tuples
+        max_processes: maximum number of units running at the same time
+        initializer: optional function called once in every worker process
+        initargs: arguments of the initializer, e.g. objects shared between the processes
+
+    Returns:
+        The result of each unit, in the order of `units`. A unit whose worker raised returns the exception instead.
+    """
+    results = [None] * len(units)
+    with ProcessPoolExecutor(max_workers=max_processes, initializer=initializer, initargs=initargs) as executor:
+        futures = {executor.submit(func, league, season): position for position, (league, season) in enumerate(units)}
+        for future in as_completed(futures):
+            try:
+                results[futures[future]] = future.result()
+            except Exception as e:
+                results[futures[future]] = e
+    return results
@@ -0,0 +1,104 @@
+from etl_project.connectors.postgresql import PostgreSqlClient
+import pandas as pd
+from sqlalchemy import Table, Column, String, MetaData, BigInteger
+from sqlalchemy import select, delete
+from sqlalchemy.engine import Connection
+
+def hash_rows(df: pd.DataFrame, columns: list[str]) -> pd.Series:
+    """
+    Return a stable 64-bit content hash per row, computed from the string representation of `columns`
+    so that the hash does not depend on the dtypes a column happens to have in a given run.
+    """
+    hashes = pd.util.hash_pandas_object(df[columns].astype(str), index=False)
+    return pd.Series(hashes.to_numpy().view("int64"), index=df.index)
+
+def create_row_keys(df: pd.DataFrame, key_columns: list[str]) -> pd.Series:
+    """Return the primary key of each row as a single string"""
+    row_keys = df[key_columns[0]].astype(str)
+    for key_column in key_columns[1:]:
+        row_keys = row_keys + "|" + df[key_column].astype(str)
+    return row_keys
+
+class RowHashStore:
+    """
+    Content hashes of the rows loaded into each target table, stored alongside the target tables.
+    Used to send only new and changed rows to the database.
+    """
+    def __init__(
+            self,
+            postgresql_client: PostgreSqlClient,
+            row_hash_table_name: str = "row_hashes"
+        ):
+        self.postgresql_client = postgresql_client
+        self.metadata = MetaData()
+        self.table = Table(
+            row_hash_table_name,
+            self.metadata,
+            Column("table_name", String, primary_key=True),
+            Column("row_key", String, primary_key=True),
+            Column("row_hash", BigInteger)
+        )
+        self.postgresql_client.create_table(metadata=self.metadata)
+
+    def get(self, table_name: str) -> pd.Series:
+        """Return the stored hashes of a table, indexed by row key"""
+        with self.postgresql_client.engine.connect() as connection:
+            rows = connection.execute(
+                select(self.table.c.row_key, self.table.c.row_hash).where(self.table.c.table_name == table_name)
+            ).all()
+        return pd.Series([row[1] for row in rows], index=[row[0] for row in rows], dtype="int64")
+
+    def save(self, table_name: str, df_hashes: pd.DataFrame, connection: Connection = None) -> None:
+        """
+        Store the hashes of the rows that were loaded into a table. 
+        Pass the `connection` the rows were loaded with so the hashes are committed together with the rows.
+        """
+        if df_hashes.empty:
+            return
+        self.postgresql_client.bulk_upsert(
+            df=df_hashes.assign(table_name=table_name),
+            table=self.table,
+            metadata=self.metadata,
+            connection=connection
+        )
+
+    def reset(self, table_name: str) -> None:
+        """Forget the stored hashes of a table"""
+        with self.postgresql_client.begin() as connection:
+            connection.execute(delete(self.table).where(self.table.c.table_name == table_name))
+
+    def diff(self, df: pd.DataFrame, table: Table) -> tuple:
+        """
+        Compare the rows of a dataframe against the hashes stored for a table.
+
+        Args:
+            df: dataframe about to be loaded
+            table: sqlalchemy table the dataframe is loaded into. Must have a primary key.
+
+        Returns:
+            A tuple of (the new and changed rows of `df`, a dict of inserted/updated/unchanged counts,
+            a dataframe of row_key/row_hash to save once the rows are loaded)
+        """
+        key_columns = [pk_column.name for pk_column in table.primary_key.columns.values()]
+        if not key_columns:
+            raise Exception(f"Change detection requires a primary key on table {table.name}")
+        if not self.postgresql_client.has_table(table):
+            # the stored hashes describe rows that no longer exist
+            self.reset(table.name)
+
+        row_keys = create_row_keys(df=df, key_columns=key_columns)
+        row_hashes = hash_rows(df=df, columns=[column.name for column in table.columns])
+        stored_hashes = self.get(table.name)
+
+        is_new = ~row_keys.isin(stored_hashes.index).to_numpy()
+        # fill_value keeps the int64 dtype, NaN would round the hashes to float64
+        previous_hashes = stored_hashes.reindex(row_keys.to_numpy(), fill_value=0).to_numpy()
+        is_changed = ~is_new & (previous_hashes != row_hashes.to_numpy())
+        to_load = is_new | is_changed
+        change_counts = {
+            "inserted": int(is_new.sum()),
+            "updated": int(is_changed.sum()),
+            "unchanged": int((~to_load).sum())
+        }
+        df_hashes = pd.DataFrame({"row_key": row_keys[to_load], "row_hash": row_hashes[to_load]})
+        return df[to_load], change_counts, df_hashes
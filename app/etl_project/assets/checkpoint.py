@@ -0,0 +1,54 @@
+from etl_project.connectors.postgresql import PostgreSqlClient
+from datetime import datetime
+from sqlalchemy import Table, Column, Integer, String, MetaData, JSON
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+class Checkpoint:
+    """
+    Completed steps of pipeline runs, stored in the logging database and keyed by run id,
+    so a rerun of a failed run resumes from its first incomplete step.
+    A step is recorded with its result, e.g. the load metrics of a load.
+    """
+    def __init__(
+            self,
+            postgresql_client: PostgreSqlClient,
+            checkpoint_table_name: str = "pipeline_checkpoints"
+        ):
+        self.postgresql_client = postgresql_client
+        self.metadata = MetaData()
+        self.table = Table(
+            checkpoint_table_name,
+            self.metadata,
+            Column("run_id", Integer, primary_key=True),
+            Column("step", String, primary_key=True),
+            Column("result", JSON),
+            Column("completed_at", String)
+        )
+        self.postgresql_client.create_table(metadata=self.metadata)
+
+    def get(self, run_id: int) -> dict:
+        """Return the completed steps of a run, as a dict of step -> result"""
+        with self.postgresql_client.engine.connect() as connection:
+            rows = connection.execute(
+                select(self.table.c.step, self.table.c.result).where(self.table.c.run_id == run_id)
+            ).fetchall()
+        return {step: result for step, result in rows}
+
+    def set(self, run_id: int, step: str, result=None) -> None:
+        """Record a step of a run as completed. A step completed again (e.g. on retry) replaces its result."""
+        insert_statement = postgresql.insert(self.table).values(
+            run_id=run_id,
+            step=step,
+            result=result,
+            completed_at=datetime.now().isoformat()
+        )
+        upsert_statement = insert_statement.on_conflict_do_update(
+            index_elements=["run_id", "step"],
+            set_={
+                "result": insert_statement.excluded.result,
+                "completed_at": insert_statement.excluded.completed_at
+            }
+        )
+        with self.postgresql_client.begin() as connection:
+            connection.execute(upsert_statement)
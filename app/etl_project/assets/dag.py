@@ -0,0 +1,140 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+class Task:
+    """
+    A unit of work in a pipeline DAG.
+
+    Args:
+        name: unique name of the task. Downstream tasks receive its result under this name.
+        func: callable receiving the results of the upstream tasks as keyword arguments, named after the tasks
+        depends_on: names of the upstream tasks
+    """
+    def __init__(self, name: str, func, depends_on: list[str] = None):
+        self.name = name
+        self.func = func
+        self.depends_on = depends_on or []
+
+class DagTaskError(Exception):
+    """Raised when a task of the DAG fails"""
+    def __init__(self, task_name: str, error: BaseException):
+        self.task_name = task_name
+        self.error = error
+        super().__init__(f"Task {task_name} failed: {error}")
+
+class DagRunner:
+    """
+    Runs tasks in a thread pool as soon as all of their upstream tasks have completed,
+    so independent branches (e.g. loading standings while player statistics are still extracting) overlap.
+    """
+    def __init__(self, tasks: list[Task], max_workers: int = 4, logger=None):
+        self.tasks = {task.name: task for task in tasks}
+        if len(self.tasks) != len(tasks):
+            raise Exception("Task names must be unique")
+        for task in tasks:
+            for upstream_name in task.depends_on:
+                if upstream_name not in self.tasks:
+                    raise Exception(f"Task {task.name} depends on unknown task {upstream_name}")
+        self._check_acyclic()
+        self.max_workers = max_workers
+        self.logger = logger
+        self.results = {}
+        self.timings = {}
+
+    def _check_acyclic(self) -> None:
+        visiting, visited = set(), set()
+        def visit(name):
+            if name in visited:
+                return
+            if name in visiting:
+                raise Exception(f"The tasks contain a cycle through {name}")
+            visiting.add(name)
+            for upstream_name in self.tasks[name].depends_on:
+                visit(upstream_name)
+            visiting.remove(name)
+            visited.add(name)
+        for name in self.tasks:
+            visit(name)
+
+    def _run_task(self, task: Task, run_start: float):
+        start = time.perf_counter()
+        if self.logger is not None:
+            self.logger.info(f"Starting task {task.name}")
+        result = task.func(**{upstream_name: self.results[upstream_name] for upstream_name in task.depends_on})
+        end = time.perf_counter()
+        self.timings[task.name] = {
+            "started_at": round(start - run_start, 3),
+            "finished_at": round(end - run_start, 3),
+            "seconds": round(end - start, 3)
+        }
+        if self.logger is not None:
+            self.logger.info(f"Finished task {task.name} in {self.timings[task.name]['seconds']}s")
+        return result
+
+    def run(self) -> dict:
+        """
+        Run every task of the DAG.
+
+        Returns:
+            The result of every task, keyed by task name
+
+        Raises:
+            DagTaskError for the first task that fails. Tasks already running are allowed to finish, no new task is started.
+        """
+        run_start = time.perf_counter()
+        pending = dict(self.tasks)
+        running = {}
+        error = None
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                if error is None:
+                    ready = [task for task in pending.values() if all(name in self.results for name in task.depends_on)]
+                    for task in ready:
+                        del pending[task.name]
+                        running[executor.submit(self._run_task, task, run_start)] = task.name
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task_name = running.pop(future)
+                    try:
+                        self.results[task_name] = future.result()
+                    except BaseException as e:
+                        if error is None:
+                            error = DagTaskError(task_name=task_name, error=e)
+        if error is not None:
+            raise error from error.error
+        return self.results
+
+def resume_tasks(tasks: list[Task], completed: dict, targets: list[str] = None) -> list[Task]:
+    """
+    Return the tasks to run to resume a DAG of which some tasks already completed, e.g. in a failed run.
+    Completed tasks are replaced by tasks without upstream tasks returning their result, and only the tasks the 
+    targets depend on through incomplete tasks are kept. The other tasks are returned as they are.
+
+    Args:
+        tasks: the tasks of the DAG
+        completed: dict of task name -> callable returning the result of the completed task
+        targets: names of the tasks whose results are needed. Defaults to the final tasks, which no task depends on.
+
+    Returns:
+        The tasks to run, in the order of `tasks`
+    """
+    tasks_by_name = {task.name: task for task in tasks}
+    if targets is None:
+        upstream_names = {upstream_name for task in tasks for upstream_name in task.depends_on}
+        targets = [task.name for task in tasks if task.name not in upstream_names]
+    needed = set()
+    def visit(name):
+        if name in needed:
+            return
+        needed.add(name)
+        if name not in completed:
+            for upstream_name in tasks_by_name[name].depends_on:
+                visit(upstream_name)
+    for name in targets:
+        visit(name)
+    return [
+        Task(name=task.name, func=completed[task.name]) if task.name in completed else task
+        for task in tasks if task.name in needed
+    ]
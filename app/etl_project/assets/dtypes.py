@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+def _cast(column: pd.Series, dtype: str) -> pd.Series:
+    if dtype == "category":
+        return column.astype("category")
+    numpy_dtype = np.dtype(dtype.lower())
+    if numpy_dtype.kind not in "iu":
+        return column.astype(dtype)
+    if column.dtype == object:
+        column = pd.to_numeric(column, errors="coerce")
+    if column.notna().any():
+        limits = np.iinfo(numpy_dtype)
+        if column.min() < limits.min or column.max() > limits.max:
+            raise Exception(f"Column {column.name} has values outside of the range of {dtype}")
+    if column.isna().any():
+        # numpy integers cannot hold missing values, use the nullable equivalent
+        dtype = dtype.capitalize()
+    return column.astype(dtype)
+
+def apply_dtypes(
+        df: pd.DataFrame,
+        dtypes: dict
+    ) -> pd.DataFrame:
+    """
+    Cast the columns of a dataframe to a dtype contract, e.g. categoricals for low-cardinality strings and
+    int16/int32 for ids and ranks. Integer columns holding missing values get the nullable equivalent (int16 -> Int16).
+    Columns missing from the dataframe are skipped.
+
+    Args:
+        df: dataframe to cast
+        dtypes: dict of column name -> dtype
+
+    Returns:
+        The cast dataframe. `attrs["memory_usage"]` holds its size in bytes `before` and `after` the cast.
+
+    Raises:
+        Exception if an integer column has values that do not fit its dtype
+    """
+    memory_before = int(df.memory_usage(deep=True).sum())
+    df = df.assign(**{column: _cast(df[column], dtype) for column, dtype in dtypes.items() if column in df.columns})
+    df.attrs["memory_usage"] = {"before": memory_before, "after": int(df.memory_usage(deep=True).sum())}
+    return df
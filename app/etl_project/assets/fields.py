@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+def extract_fields(
+        records: list[dict],
+        fields: dict
+    ) -> pd.DataFrame:
+    """
+    Build a dataframe from nested API records, reading only the fields of a declarative schema in a single pass.
+    A cheaper alternative to `pd.json_normalize` followed by a column selection, which flattens every nested field first.
+
+    Args:
+        records: records returned by the API
+        fields: dotted path of each field to read (e.g. `teams.home.id`), mapped to its type: int, float, str or bool.
+            The dotted path is used as the column name, as `pd.json_normalize` would.
+
+    Returns:
+        A dataframe with one column per field. Missing values are None for str and bool fields and NaN for float fields.
+        int fields are int64, or nullable Int64 when a value is missing.
+    """
+    paths = [(name, name.split(".")) for name in fields]
+    values = {name: [] for name in fields}
+    appends = [(path, values[name].append) for name, path in paths]
+    for record in records:
+        for path, append in appends:
+            value = record
+            for key in path:
+                if not isinstance(value, dict):
+                    value = None
+                    break
+                value = value.get(key)
+            append(value)
+    return pd.DataFrame({name: _to_column(values=values[name], field_type=field_type) for name, field_type in fields.items()})
+
+def _to_column(values: list, field_type: type):
+    if field_type is float:
+        return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").astype("float64")
+    if field_type is int:
+        column = pd.to_numeric(pd.Series(values, dtype=object), errors="coerce")
+        if column.isna().any():
+            return column.astype("Int64")
+        return column.astype("int64")
+    if field_type in (str, bool):
+        return np.array(values, dtype=object)
+    raise Exception(f"Unsupported field type {field_type}")
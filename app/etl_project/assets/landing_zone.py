@@ -0,0 +1,96 @@
+import json
+import os
+import threading
+from pathlib import Path
+import pandas as pd
+import pyarrow.parquet as pq
+
+class LandingZone:
+    """
+    A local landing zone for raw extracts, stored as Parquet files partitioned by
+    `league=.../season=.../endpoint=.../run_id=...`, so transforms can be replayed without calling the API again.
+
+    Args:
+        landing_folder_path: root folder of the landing zone
+        run_id: identifier of the run that lands files, used as the last partition
+    """
+    def __init__(self, landing_folder_path: str, run_id=None):
+        self.landing_folder_path = Path(landing_folder_path)
+        self.run_id = run_id
+
+    def _endpoint_path(self, league: str, season: int, endpoint: str) -> Path:
+        return self.landing_folder_path / f"league={league}" / f"season={season}" / f"endpoint={endpoint}"
+
+    def _run_path(self, league: str, season: int, endpoint: str, run_id) -> Path:
+        return self._endpoint_path(league=league, season=season, endpoint=endpoint) / f"run_id={run_id}"
+
+    @staticmethod
+    def _to_parquet_compatible(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Serialize nested values (lists and dicts left over by json_normalize) to json strings,
+        and mixed-type object columns to strings, which Parquet cannot store as is.
+        """
+        df = df.copy()
+        for column in df.columns[df.dtypes == object]:
+            values = df[column].map(lambda value: json.dumps(value) if isinstance(value, (list, dict)) else value)
+            if pd.api.types.infer_dtype(values, skipna=True) in ("mixed", "mixed-integer", "mixed-integer-float"):
+                values = values.map(lambda value: None if value is None or value is pd.NA or value != value else str(value))
+            df[column] = values
+        return df
+
+    def land(self, df: pd.DataFrame, league: str, season: int, endpoint: str, part: int = 0) -> Path:
+        """
+        Write the raw extract of an endpoint for the current run, replacing any file the run landed before (e.g. on retry).
+        Extracts streamed in batches are landed as several parts, numbered from 0. Landing part 0 removes the other parts.
+
+        Returns:
+            The path of the landed file
+        """
+        if self.run_id is None:
+            raise Exception("A run_id is required to land extracts")
+        run_path = self._run_path(league=league, season=season, endpoint=endpoint, run_id=self.run_id)
+        run_path.mkdir(parents=True, exist_ok=True)
+        if part == 0:
+            for stale_path in run_path.glob("part-*.parquet"):
+                stale_path.unlink()
+        path = run_path / f"part-{part}.parquet"
+        temp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        self._to_parquet_compatible(df).to_parquet(temp_path, index=False)
+        os.replace(temp_path, path)
+        return path
+
+    def latest_run_id(self, league: str, season: int, endpoint: str) -> str:
+        """Return the run id of the most recently landed file of an endpoint, or None if nothing was landed"""
+        paths = list(self._endpoint_path(league=league, season=season, endpoint=endpoint).glob("run_id=*/part-0.parquet"))
+        if not paths:
+            return None
+        latest_path = max(paths, key=lambda path: path.stat().st_mtime)
+        return latest_path.parent.name.split("=", 1)[1]
+
+    def read(self, league: str, season: int, endpoint: str, run_id=None, columns: list[str] = None) -> pd.DataFrame:
+        """
+        Read a landed extract.
+
+        Args:
+            league: league of the extract
+            season: season of the extract
+            endpoint: endpoint of the extract
+            run_id: run that landed the extract. Defaults to the latest run.
+            columns: only read these columns. Columns missing from the file are skipped.
+
+        Raises:
+            Exception if nothing was landed for the endpoint and run
+        """
+        run_id = run_id if run_id is not None else self.latest_run_id(league=league, season=season, endpoint=endpoint)
+        paths = []
+        if run_id is not None:
+            paths = sorted(
+                self._run_path(league=league, season=season, endpoint=endpoint, run_id=run_id).glob("part-*.parquet"),
+                key=lambda path: int(path.stem.split("-", 1)[1])
+            )
+        if not paths:
+            raise Exception(f"No landed {endpoint} extract for league {league}, season {season} and run_id {run_id}")
+        if columns is not None:
+            landed_columns = pq.read_schema(paths[0]).names
+            columns = [column for column in columns if column in landed_columns]
+        return pd.concat([pd.read_parquet(path, columns=columns) for path in paths], ignore_index=True)
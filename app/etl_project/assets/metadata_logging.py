@@ -1,73 +1,202 @@
 from etl_project.connectors.postgresql import PostgreSqlClient
-from datetime import datetime, timezone
-from sqlalchemy import Table, Column, Integer, String, MetaData, JSON
-from sqlalchemy import insert, select, func
+from datetime import datetime, timezone, timedelta
+import threading
+from sqlalchemy import Table, Column, Integer, String, MetaData, JSON, Index
+from sqlalchemy import insert, select, text, func
 
 class MetaDataLoggingStatus:
     """Data class for log status"""
     RUN_START = "start"
+    RUN_RETRY = "retry"
     RUN_SUCCESS = "success"
     RUN_FAILURE = "fail"
 
 class MetaDataLogging:
+    """
+    Writes the status and metrics of pipeline runs to the `pipeline_logs` table of the logging database.
+
+    Args:
+        pipeline_name: name of the pipeline
+        postgresql_client: client of the logging database
+        config: pipeline config stored with every entry
+        log_table_name: name of the log table
+        flush_interval_seconds: how often entries logged with `buffered=True` are written by the background writer
+    """
+    # log tables already created or migrated by this process, by database url and table name
+    _prepared_tables = set()
+    _prepared_tables_lock = threading.Lock()
+
     def __init__(
-            self, 
+            self,
             pipeline_name: str,
             postgresql_client: PostgreSqlClient,
-            config: dict = {}, 
-            log_table_name: str = "pipeline_logs"
+            config: dict = {},
+            log_table_name: str = "pipeline_logs",
+            flush_interval_seconds: float = 5.0
         ):
         self.pipeline_name = pipeline_name
         self.log_table_name = log_table_name
+        self.run_id_sequence_name = f"{log_table_name}_run_id_seq"
         self.postgresql_client = postgresql_client
         self.config = config
+        self.flush_interval_seconds = flush_interval_seconds
         self.metadata = MetaData()
         self.table = Table(
-            self.log_table_name, 
-            self.metadata, 
+            self.log_table_name,
+            self.metadata,
             Column("pipeline_name", String, primary_key=True),
             Column("run_id", Integer, primary_key=True),
             Column("timestamp", String, primary_key=True),
             Column("status", String, primary_key=True),
             Column("config", JSON),
-            Column("logs", String)
+            Column("logs", String),
+            Column("metrics", JSON),
+            Column("stage_metrics", JSON),
+            Index(f"{self.log_table_name}_pipeline_name_run_id_idx", "pipeline_name", "run_id")
         )
+        self._buffer = []
+        self._buffer_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._writer = None
+        self._writer_stopped = threading.Event()
         self.run_id: int = self._get_run_id()
-    
+
     def _create_log_table(self) -> None:
-        """Create log table if it does not exist."""
-        self.postgresql_client.create_table(metadata=self.metadata)
-    
-    def _get_run_id(self):
-        """Gets the next run id. Sets run id to 1 if no run id exists."""
+        """
+        Create the log table, its (pipeline_name, run_id) index and the run id sequence if they do not exist, and add the columns introduced after the table was first created.
+        The sequence is created last, so when it exists the table is complete and a single catalog lookup is made.
+        Runs once per process and database, later loggers skip it.
+        """
+        key = (self.postgresql_client.engine.url.render_as_string(hide_password=False), self.log_table_name)
+        with self._prepared_tables_lock:
+            if key in self._prepared_tables:
+                return
+            with self.postgresql_client.engine.connect() as connection:
+                sequence_exists = connection.execute(
+                    text("select to_regclass(:sequence_name) is not null"), {"sequence_name": self.run_id_sequence_name}
+                ).scalar()
+            if not sequence_exists:
+                self.postgresql_client.create_table(metadata=self.metadata)
+                with self.postgresql_client.engine.begin() as connection:
+                    # the sequence starts after the highest run id logged before it existed, so run ids never go backwards
+                    connection.execute(text(f"""
+                        do $$
+                        begin
+                            if to_regclass('{self.run_id_sequence_name}') is null then
+                                create sequence {self.run_id_sequence_name};
+                                perform setval('{self.run_id_sequence_name}', coalesce((select max(run_id) from {self.log_table_name}), 0) + 1, false);
+                            end if;
+                        exception when duplicate_table or unique_violation then
+                            null; -- created by a concurrent process
+                        end
+                        $$
+                    """))
+            self._prepared_tables.add(key)
+
+    def _get_run_id(self) -> int:
+        """Gets the next run id from the run id sequence. Run ids are unique across pipelines."""
         self._create_log_table()
-        run_id = self.postgresql_client.engine.execute(
-            select(
-                func.max(
-                    self.table.c.run_id
-                )
-            ).where(self.table.c.pipeline_name == self.pipeline_name)
-        ).first()[0]
-        if run_id is None:
-            return 1 
-        else: 
-            return run_id + 1 
+        with self.postgresql_client.begin() as connection:
+            return connection.execute(text(f"select nextval('{self.run_id_sequence_name}')")).scalar()
+
+    def resume_failed_run(self, max_age: timedelta = None, max_resumes: int = None) -> int:
+        """
+        Continue the latest run of the pipeline instead of a new run if that run failed, 
+        so the entries of the rerun are logged under the run id of the failed run.
+        A run that keeps failing is given up, and a new run started, once it is older than `max_age` 
+        or was already resumed `max_resumes` times, so its landed extracts and checkpointed loads do not go stale.
+
+        Args:
+            max_age: resume a failed run only if its first entry is more recent than this
+            max_resumes: resume a failed run only if it was resumed fewer times than this
+
+        Returns:
+            The run id of the resumed run, or None if the latest run did not fail or is not resumed
+        """
+        latest_run_id = (
+            select(func.max(self.table.c.run_id))
+            .where(self.table.c.pipeline_name == self.pipeline_name)
+            .scalar_subquery()
+        )
+        with self.postgresql_client.engine.connect() as connection:
+            rows = connection.execute(
+                select(self.table.c.run_id, self.table.c.status, self.table.c.timestamp)
+                .where(self.table.c.pipeline_name == self.pipeline_name, self.table.c.run_id == latest_run_id)
+                .order_by(self.table.c.timestamp)
+            ).all()
+        if not rows or rows[-1].status != MetaDataLoggingStatus.RUN_FAILURE:
+            return None
+        # every attempt of a run, the first one and each resume, ends with a single failure entry
+        resumes = sum(row.status == MetaDataLoggingStatus.RUN_FAILURE for row in rows) - 1
+        if max_resumes is not None and resumes >= max_resumes:
+            return None
+        if max_age is not None and datetime.now() - datetime.fromisoformat(rows[0].timestamp) > max_age:
+            return None
+        self.run_id = rows[-1].run_id
+        return self.run_id
 
     def log(
         self,
         status: MetaDataLoggingStatus = MetaDataLoggingStatus.RUN_START,
         timestamp: datetime = None,
         logs: str = None,
+        metrics: dict = None,
+        stage_metrics: dict = None,
+        buffered: bool = False
     ) -> None:
-        """Writes pipeline metadata log to a database"""
-        if timestamp is None: 
+        """
+        Writes pipeline metadata log to a database. `stage_metrics` holds the metrics of each extract, transform and load.
+        With `buffered`, the entry is queued and written by a background writer every `flush_interval_seconds`,
+        or with the next unbuffered entry, so intermediate entries (start, retries) do not wait on the logging database.
+        Unbuffered entries are written at once, together with every queued entry.
+        """
+        if timestamp is None:
             timestamp = datetime.now()
-        insert_statement = insert(self.table).values(
+        row = dict(
             pipeline_name=self.pipeline_name,
-            timestamp=timestamp,
+            timestamp=timestamp.isoformat(),
             run_id=self.run_id,
             status=status,
             config=self.config,
-            logs=logs
+            logs=logs,
+            metrics=metrics,
+            stage_metrics=stage_metrics
         )
-        self.postgresql_client.engine.execute(insert_statement)
+        if buffered:
+            with self._buffer_lock:
+                self._buffer.append(row)
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_periodically, daemon=True)
+                    self._writer.start()
+        else:
+            self.flush(rows=[row])
+
+    def flush(self, rows: list[dict] = []) -> None:
+        """Write the queued entries, and `rows`, with a single insert"""
+        with self._flush_lock:
+            with self._buffer_lock:
+                buffered_rows, self._buffer = self._buffer, []
+            rows = buffered_rows + rows
+            if not rows:
+                return
+            try:
+                with self.postgresql_client.begin() as connection:
+                    connection.execute(insert(self.table), rows)
+            except Exception:
+                with self._buffer_lock:
+                    self._buffer = buffered_rows + self._buffer
+                raise
+
+    def _write_periodically(self) -> None:
+        while not self._writer_stopped.wait(self.flush_interval_seconds):
+            try:
+                self.flush()
+            except Exception:
+                pass # the entries stay queued, and are written by the next flush
+
+    def close(self) -> None:
+        """Stop the background writer and write the queued entries"""
+        self._writer_stopped.set()
+        if self._writer is not None:
+            self._writer.join()
+        self.flush()
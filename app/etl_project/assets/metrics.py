@@ -0,0 +1,117 @@
+import functools
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+import pandas as pd
+
+try:
+    import resource
+except ImportError: # not available on Windows
+    resource = None
+
+def get_peak_rss_bytes() -> int:
+    """Return the peak resident set size of the process so far, or None where it cannot be measured"""
+    if resource is None:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak_rss if sys.platform == "darwin" else peak_rss * 1024
+
+def count_rows(value) -> int:
+    """Return the number of rows of a dataframe or of a load result, or None for other values"""
+    if isinstance(value, pd.DataFrame):
+        return len(value)
+    if isinstance(value, dict) and isinstance(value.get("rows"), int):
+        return value["rows"]
+    return None
+
+def _escape_label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class StageMetrics:
+    """
+    Collects the wall time, API requests, bytes received, rows in/out and peak RSS of each stage
+    (extract, transform, load) of a pipeline run.
+
+    Args:
+        nba_api_client: when set, the requests the client sends during each stage are counted
+    """
+    METRICS = {
+        "seconds": "Wall time of the stage in seconds",
+        "api_requests": "Requests sent to the NBA API during the stage",
+        "api_bytes_received": "Bytes received from the NBA API during the stage",
+        "rows_in": "Rows received by the stage",
+        "rows_out": "Rows produced or loaded by the stage",
+        "peak_rss_bytes": "Peak resident set size of the process at the end of the stage"
+    }
+
+    def __init__(self, nba_api_client=None):
+        self.nba_api_client = nba_api_client
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str, rows_in: int = None):
+        """
+        Measure the code of a `with` block as the stage `name`.
+        The yielded dict can be updated with `rows_out` (and `rows_in`) inside the block.
+        """
+        record = {"rows_in": rows_in, "rows_out": None}
+        request_counting = self.nba_api_client.count_requests() if self.nba_api_client is not None else nullcontext()
+        start = time.perf_counter()
+        with request_counting as request_counter:
+            try:
+                yield record
+            finally:
+                record["seconds"] = round(time.perf_counter() - start, 3)
+                record["api_requests"] = request_counter.requests if request_counter is not None else 0
+                record["api_bytes_received"] = request_counter.bytes_received if request_counter is not None else 0
+                record["peak_rss_bytes"] = get_peak_rss_bytes()
+                with self._lock:
+                    self.stages[name] = record
+
+    def measure(self, name: str, func):
+        """
+        Wrap `func` so that each call is measured as the stage `name`.
+        Rows in are counted from the dataframe arguments, rows out from the dataframe or load result returned.
+        """
+        @functools.wraps(func)
+        def measured(*args, **kwargs):
+            row_counts = [count_rows(value) for value in list(args) + list(kwargs.values())]
+            row_counts = [row_count for row_count in row_counts if row_count is not None]
+            with self.stage(name=name, rows_in=sum(row_counts) if row_counts else None) as record:
+                result = func(*args, **kwargs)
+                record["rows_out"] = count_rows(result)
+            return result
+        return measured
+
+    def to_prometheus(self, labels: dict = None) -> str:
+        """Return the metrics of every stage in the Prometheus text exposition format"""
+        labels = labels or {}
+        lines = []
+        for metric, description in self.METRICS.items():
+            metric_name = f"etl_stage_{metric}"
+            lines.append(f"# HELP {metric_name} {description}")
+            lines.append(f"# TYPE {metric_name} gauge")
+            for stage_name, record in self.stages.items():
+                if record.get(metric) is None:
+                    continue
+                stage_labels = {**labels, "stage": stage_name}
+                label_text = ",".join(f'{key}="{_escape_label_value(value)}"' for key, value in stage_labels.items())
+                lines.append(f"{metric_name}{{{label_text}}} {record[metric]}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, file_path: str, labels: dict = None) -> None:
+        """
+        Write the metrics to a Prometheus text file, e.g. for the node_exporter textfile collector.
+        The file is replaced atomically so a scrape never reads a partial file.
+        """
+        path = Path(file_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_path, "w") as file:
+            file.write(self.to_prometheus(labels=labels))
+        os.replace(temp_path, path)
@@ -1,8 +1,19 @@
 import pandas as pd 
-from etl_project.connectors.nba_api import NBAApiClient
+import numpy as np
+import threading
+import contextvars
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator
+from etl_project.connectors.nba_api import NBAApiClient, AsyncNBAApiClient, GAME_STATUS_FINISHED
 from pathlib import Path
 from sqlalchemy import Table, MetaData
 from etl_project.connectors.postgresql import PostgreSqlClient
+from etl_project.assets.change_detection import RowHashStore
+from etl_project.assets.landing_zone import LandingZone
+from etl_project.assets.fields import extract_fields
+from etl_project.assets.dtypes import apply_dtypes
 from datetime import datetime, timezone, timedelta, date
 import datetime as dt
 
@@ -10,100 +21,660 @@ def calculate_age(birth_date):
     current_date = date.today()
     return current_date.year - birth_date.year - ((current_date.month, current_date.day) < (birth_date.month, birth_date.day))
 
-def extract_teams_in_league(nba_api_client: NBAApiClient, league: str) -> list:
+def calculate_ages(
+        birth_dates: pd.Series
+    ) -> pd.Series:
     """
-    Return a list of teamIDs from teams in a specified league
+    Vectorized equivalent of `calculate_age` for a column of birth dates
     """
+    birth_dates = pd.to_datetime(birth_dates)
+    current_date = date.today()
+    birthday_not_reached = (birth_dates.dt.month > current_date.month) | (
+        (birth_dates.dt.month == current_date.month) & (birth_dates.dt.day > current_date.day)
+    )
+    return current_date.year - birth_dates.dt.year - birthday_not_reached.astype(int)
+
+# beyond this many dates since the games watermark, e.g. once the season is over, a single full-season request is cheaper than one per date
+MAX_INCREMENTAL_GAME_DATES = 7
+
+# raw columns read by the transforms, the only columns read back when replaying landed extracts
+GAMES_COLUMNS = ['id','league','season','date.start','status.short','teams.home.id','teams.home.name','scores.home.points','teams.visitors.id','teams.visitors.name','scores.visitors.points']
+PLAYERS_COLUMNS = ['id','height.meters','weight.kilograms','birth.date','leagues.standard.jersey','season','league']
+PLAYER_STATISTICS_COLUMNS = ['player.id','player.firstname','player.lastname','team.id','pos','points','totReb','assists','min','season','league']
+STANDINGS_COLUMNS = ['team.id','team.name','league','season','conference.name','conference.rank','division.name','division.rank','win.total','loss.total']
+# nested fields read from each endpoint's records, see `extract_fields`
+GAMES_FIELDS = {
+    "id": int,
+    "date.start": str,
+    "status.short": int,
+    "teams.home.id": int,
+    "teams.home.name": str,
+    "scores.home.points": float,
+    "teams.visitors.id": int,
+    "teams.visitors.name": str,
+    "scores.visitors.points": float
+}
+PLAYERS_FIELDS = {
+    "id": int,
+    "height.meters": str,
+    "weight.kilograms": str,
+    "birth.date": str,
+    "leagues.standard.jersey": int
+}
+PLAYER_STATISTICS_FIELDS = {
+    "player.id": int,
+    "player.firstname": str,
+    "player.lastname": str,
+    "team.id": int,
+    "pos": str,
+    "points": int,
+    "totReb": int,
+    "assists": int,
+    "min": str
+}
+STANDINGS_FIELDS = {
+    "team.id": int,
+    "team.name": str,
+    "conference.name": str,
+    "conference.rank": int,
+    "division.name": str,
+    "division.rank": int,
+    "win.total": int,
+    "loss.total": int
+}
+# dtype contracts of the extracted frames, applied as soon as the records are extracted
+EXTRACT_DTYPES = {
+    "games": {
+        "id": "int32", "status.short": "int8", "teams.home.id": "int16", "teams.home.name": "category", "scores.home.points": "Int16",
+        "teams.visitors.id": "int16", "teams.visitors.name": "category", "scores.visitors.points": "Int16", "league": "category", "season": "int16"
+    },
+    "players": {"id": "int32", "leagues.standard.jersey": "Int16", "league": "category", "season": "int16"},
+    "players_statistics": {
+        "player.id": "int32", "team.id": "int16", "pos": "category", "points": "Int16", "totReb": "Int16", "assists": "Int16",
+        "league": "category", "season": "int16"
+    },
+    "standings": {
+        "team.id": "int16", "team.name": "category", "conference.name": "category", "conference.rank": "Int16", "division.name": "category",
+        "division.rank": "Int16", "win.total": "Int16", "loss.total": "Int16", "league": "category", "season": "int16"
+    }
+}
+# dtype contracts of the transformed frames, one per output table
+TABLE_DTYPES = {
+    "games": {
+        "game_id": "int32", "league": "category", "season": "int16", "status": "Int16", "home_team_id": "int16", "home_team_name": "category", "home_team_score": "Int16",
+        "away_team_id": "int16", "away_team_name": "category", "away_team_score": "Int16", "winner_team_id": "int16", "loser_team_id": "int16"
+    },
+    "players_statistics": {
+        "player_id": "int32", "jersey_number": "int16", "season": "int16", "league": "category", "team_id": "int16",
+        "position": "category", "current_age": "int16", "points": "int32", "rebounds": "int32", "assists": "int32",
+        "minutes": "float64", "games_played": "int16"
+    },
+    "standings": {
+        "team_id": "int16", "team_name": "category", "league": "category", "season": "int16", "conference_name": "category",
+        "conference_rank": "Int16", "division_name": "category", "division_rank": "Int16", "win_total": "Int16", "loss_total": "Int16"
+    },
+    "team_form": {
+        "game_id": "int32", "team_id": "int16", "team_name": "category", "league": "category", "season": "int16", "opponent_team_id": "int16",
+        "points_for": "int16", "points_against": "int16", "games_played": "int16", "wins": "int16", "losses": "int16",
+        "last_10_wins": "int16", "last_10_losses": "int16", "streak": "int16"
+    },
+    "team_season_summary": {
+        "team_id": "int16", "team_name": "category", "league": "category", "season": "int16", "games_played": "int16", "wins": "int16",
+        "losses": "int16", "home_wins": "int16", "home_losses": "int16", "away_wins": "int16", "away_losses": "int16",
+        "last_10_wins": "int16", "last_10_losses": "int16", "streak": "int16"
+    },
+    "player_season_summary": {
+        "player_id": "int32", "team_id": "int16", "league": "category", "season": "int16", "position": "category", "games_played": "int16"
+    }
+}
+TEAM_FORM_KEYS = ["league", "season", "team_id"]
+EXTRACT_FIELDS = {
+    "games": GAMES_FIELDS,
+    "players": PLAYERS_FIELDS,
+    "players_statistics": PLAYER_STATISTICS_FIELDS,
+    "standings": STANDINGS_FIELDS
+}
+REQUIRED_COLUMNS = {
+    "games": GAMES_COLUMNS,
+    "players": PLAYERS_COLUMNS,
+    "players_statistics": PLAYER_STATISTICS_COLUMNS,
+    "standings": STANDINGS_COLUMNS
+}
+
+class TeamDirectory:
+    """
+    Run-scoped directory of the teams in each league. 
+    The teams of a league are requested from the NBA API once and shared by every step that needs them.
+    """
+    def __init__(self, nba_api_client: NBAApiClient):
+        self.nba_api_client = nba_api_client
+        self._teams = {}
+        self._lock = threading.Lock()
+
+    def get_teams(self, league: str) -> list[dict]:
+        """
+        Return the teams of a league with their id, name, conference and division. 
+        The teams are fetched on first use and memoized for the following calls.
+        """
+        with self._lock:
+            if league not in self._teams:
+                teams = []
+                for team in self.nba_api_client.get_teams(league):
+                    team_league = (team.get("leagues") or {}).get(league) or {}
+                    teams.append({
+                        "team_id": team["id"],
+                        "team_name": team.get("name"),
+                        "conference_name": team_league.get("conference"),
+                        "division_name": team_league.get("division")
+                    })
+                self._teams[league] = teams
+            return self._teams[league]
+
+    def get_team_ids(self, league: str) -> list[int]:
+        """Return the ids of the teams in a league"""
+        return [team["team_id"] for team in self.get_teams(league)]
+
+    def to_dataframe(self, league: str) -> pd.DataFrame:
+        """Return the teams of a league as a dataframe"""
+        return pd.DataFrame(self.get_teams(league), columns=["team_id", "team_name", "conference_name", "division_name"])
+
+    def invalidate(self, league: str = None) -> None:
+        """Forget the memoized teams of a league, or of every league if no league is given"""
+        with self._lock:
+            if league is None:
+                self._teams.clear()
+            else:
+                self._teams.pop(league, None)
+
+def extract_teams_in_league(nba_api_client: NBAApiClient, league: str, team_directory: TeamDirectory = None) -> list:
+    """
+    Return a list of teamIDs from teams in a specified league. 
+    Uses the memoized teams of `team_directory` when one is provided.
+    """
+    if team_directory is not None:
+        return team_directory.get_team_ids(league)
     teams = nba_api_client.get_teams(league)
     team_ids = []
     for team in teams:
         team_ids.append(team['id'])
     return team_ids    
 
+class TeamExtractionError(Exception):
+    """Raised when one or more per-team requests fail during a fan-out extraction"""
+    def __init__(self, failures: dict):
+        self.failures = failures
+        details = "; ".join(f"team {team}: {error}" for team, error in failures.items())
+        super().__init__(f"Extraction failed for {len(failures)} team(s). {details}")
+
+def fan_out_teams(
+        func,
+        teams: list,
+        max_workers: int = 1
+    ) -> list:
+    """
+    Call `func(team)` for every team using a bounded thread pool and concatenate the results.
+
+    Args:
+        func: callable taking a team id and returning a list of records
+        teams: list of team ids
+        max_workers: maximum number of concurrent requests. 1 runs the requests serially.
+
+    Returns:
+        A list of records ordered by the position of the team in `teams`, regardless of completion order
+
+    Raises:
+        TeamExtractionError if any of the per-team requests fail. All teams are attempted before raising.
+    """
+    def call(team):
+        try:
+            return func(team), None
+        except Exception as e:
+            return None, e
+
+    if max_workers is None or max_workers <= 1:
+        results = [call(team) for team in teams]
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # run each call in a copy of the caller's context, so request counters of the caller see the requests
+            futures = [executor.submit(contextvars.copy_context().run, call, team) for team in teams]
+            results = [future.result() for future in futures]
+
+    data = []
+    failures = {}
+    for team, (records, error) in zip(teams, results):
+        if error is not None:
+            failures[team] = error
+        else:
+            data.extend(records)
+    if failures:
+        raise TeamExtractionError(failures=failures)
+    return data
+
 def extract_players(
         nba_api_client: NBAApiClient,
         season: int,
         league: str,
+        max_workers: int = 1,
+        team_directory: TeamDirectory = None,
+        landing_zone: LandingZone = None
     )->pd.DataFrame:
     """
-    Perform extraction of players into a pandas dataframe
+    Perform extraction of players into a pandas dataframe. 
+    Only the `PLAYERS_FIELDS` of each record are read.
+    Requests for each team are issued concurrently by up to `max_workers` threads.
+    The raw dataframe is landed as Parquet when a `landing_zone` is provided.
     """
-    data = []
-
-    for team in extract_teams_in_league(nba_api_client=nba_api_client, league=league):
-        data.extend(nba_api_client.get_players(season=season, team=team))
+    teams = extract_teams_in_league(nba_api_client=nba_api_client, league=league, team_directory=team_directory)
+    data = fan_out_teams(
+        func=lambda team: nba_api_client.get_players(season=season, team=team),
+        teams=teams,
+        max_workers=max_workers
+    )
 
-    df = pd.json_normalize(data=data)
-    df["league"] = league
-    df["season"] = season    
-    return df
+    return build_extract(records=data, endpoint="players", league=league, season=season, landing_zone=landing_zone)
 
 def extract_player_statistics(
         nba_api_client: NBAApiClient, 
         league: str,
-        season: int
+        season: int,
+        max_workers: int = 1,
+        team_directory: TeamDirectory = None,
+        landing_zone: LandingZone = None
     )->pd.DataFrame:
     """
-    Perform extraction of player statistics into a pandas dataframe
+    Perform extraction of player statistics into a pandas dataframe. 
+    Only the `PLAYER_STATISTICS_FIELDS` of each record are read.
+    Requests for each team are issued concurrently by up to `max_workers` threads.
+    The raw dataframe is landed as Parquet when a `landing_zone` is provided.
     """
 
-    data = []
+    teams = extract_teams_in_league(nba_api_client=nba_api_client, league=league, team_directory=team_directory)
+    data = fan_out_teams(
+        func=lambda team: nba_api_client.get_player_statistics(season=season, team=team),
+        teams=teams,
+        max_workers=max_workers
+    )
+    return build_extract(records=data, endpoint="players_statistics", league=league, season=season, landing_zone=landing_zone)
 
-    for team in extract_teams_in_league(nba_api_client=nba_api_client, league=league):
-        data.extend(nba_api_client.get_player_statistics(season=season, team=team))
-    
-    df = pd.json_normalize(data=data)
-    df["league"] = league
-    df["season"] = season    
-    return df
+def iter_player_statistics(
+        nba_api_client: NBAApiClient, 
+        league: str,
+        season: int,
+        max_workers: int = 1,
+        team_directory: TeamDirectory = None,
+        landing_zone: LandingZone = None
+    ) -> Iterator[pd.DataFrame]:
+    """
+    Streaming variant of `extract_player_statistics`, yielding one dataframe per team so that 
+    only `max_workers` teams' statistics are held in memory at a time.
+    Each team is landed as a separate Parquet part when a `landing_zone` is provided.
+    """
+    teams = extract_teams_in_league(nba_api_client=nba_api_client, league=league, team_directory=team_directory)
+    part = 0
+    for team, data in nba_api_client.iter_player_statistics(season=season, teams=teams, max_workers=max_workers):
+        df = extract_fields(records=data, fields=PLAYER_STATISTICS_FIELDS)
+        df["league"] = league
+        df["season"] = season
+        df = apply_dtypes(df=df, dtypes=EXTRACT_DTYPES["players_statistics"])
+        if landing_zone is not None:
+            landing_zone.land(df=df, league=league, season=season, endpoint="players_statistics", part=part)
+        part += 1
+        yield df
+    if landing_zone is not None and part == 0:
+        df = apply_dtypes(df=extract_fields(records=[], fields=PLAYER_STATISTICS_FIELDS).assign(league=league, season=season), dtypes=EXTRACT_DTYPES["players_statistics"])
+        landing_zone.land(df=df, league=league, season=season, endpoint="players_statistics")
+
+def aggregate_player_statistics(
+        batches: Iterable[pd.DataFrame]
+    ) -> pd.DataFrame:
+    """
+    Summarize batches of player statistics by game as they arrive, so memory is bounded by the number 
+    of players rather than the number of games. The result is the summary `summarize_player_statistics` 
+    returns for all the batches at once, and can be passed to `transform_player_statistics`.
+    """
+    df_summary = None
+    for df_batch in batches:
+        df_batch_summary = summarize_player_statistics(df_players_statistics=df_batch)
+        if df_summary is not None:
+            df_batch_summary = combine_player_statistics_summaries(df_summary=pd.concat([df_summary, df_batch_summary], ignore_index=True))
+        df_summary = df_batch_summary
+    if df_summary is None:
+        empty_batch = extract_fields(records=[], fields=PLAYER_STATISTICS_FIELDS).assign(league=None, season=None)
+        df_summary = summarize_player_statistics(df_players_statistics=empty_batch)
+    return df_summary
 
 def extract_standings(
         nba_api_client: NBAApiClient,
         league: str,
-        season: int
+        season: int,
+        landing_zone: LandingZone = None
     )->pd.DataFrame:
     """
-    Perform extraction of standings into a pandas dataframe
+    Perform extraction of standings into a pandas dataframe. 
+    Only the `STANDINGS_FIELDS` of each record are read.
+    The raw dataframe is landed as Parquet when a `landing_zone` is provided.
     """
 
     data = nba_api_client.get_standings(league=league, season=season)
-
-    df = pd.json_normalize(data=data)
-    df["league"] = league
-    df["season"] = season
-    return df
+    return build_extract(records=data, endpoint="standings", league=league, season=season, landing_zone=landing_zone)
 
 def extract_games(
         nba_api_client: NBAApiClient,
         league: str,
-        season: int
+        season: int,
+        since: date = None,
+        landing_zone: LandingZone = None,
+        max_game_dates: int = MAX_INCREMENTAL_GAME_DATES
     )->pd.DataFrame:
     """
-    Perform extraction of game into a pandas dataframe
+    Perform extraction of game into a pandas dataframe. 
+    Only the `GAMES_FIELDS` of each record are read.
+    When `since` is provided, only the games played on or after that date are extracted, requested date by date up to today.
+    When that is more than `max_game_dates` dates, e.g. the season is over, they are taken from a single full-season request instead.
+    The raw dataframe is landed as Parquet when a `landing_zone` is provided.
     """
 
-    data = nba_api_client.get_games(league=league, season=season)
+    game_dates = get_game_dates(since=since) if since is not None else []
+    if since is None or len(game_dates) > max_game_dates:
+        data = nba_api_client.get_games(league=league, season=season)
+    else:
+        data = []
+        for game_date in game_dates:
+            data.extend(nba_api_client.get_games(league=league, season=season, game_date=game_date))
+    if since is not None:
+        data = [game for game in data if get_game_date(game) >= since]
+
+    return build_extract(records=data, endpoint="games", league=league, season=season, landing_zone=landing_zone, deduplicate=since is not None)
+
+def get_game_date(
+        game: dict
+    ) -> date:
+    """Return the date a game record starts on"""
+    return date.fromisoformat(game["date"]["start"][:10])
+
+def get_game_dates(
+        since: date
+    ) -> list[date]:
+    """Return the dates from `since` up to today"""
+    return list(pd.date_range(start=since, end=datetime.now(timezone.utc).date()).date)
+
+def build_extract(
+        records: list[dict],
+        endpoint: str,
+        league: str,
+        season: int,
+        landing_zone: LandingZone = None,
+        deduplicate: bool = False
+    ) -> pd.DataFrame:
+    """
+    Read the `EXTRACT_FIELDS` of the records of an endpoint into a dataframe with the dtypes of `EXTRACT_DTYPES`. 
+    The raw dataframe is landed as Parquet when a `landing_zone` is provided.
 
-    df=pd.json_normalize(data=data)
+    Args:
+        records: the records returned by the NBA API
+        endpoint: one of "games", "players", "players_statistics", "standings"
+        league: league of the records
+        season: season of the records
+        landing_zone: optional, landing zone of the run
+        deduplicate: keep only the last record of each id, e.g. for games requested date by date
+    """
+    df = extract_fields(records=records, fields=EXTRACT_FIELDS[endpoint])
+    if deduplicate and not df.empty:
+        df = df.drop_duplicates(subset=["id"], keep="last")
     df["league"] = league
     df["season"] = season
-
+    df = apply_dtypes(df=df, dtypes=EXTRACT_DTYPES[endpoint])
+    if landing_zone is not None:
+        landing_zone.land(df=df, league=league, season=season, endpoint=endpoint)
     return df
 
+async def extract_teams_in_league_async(nba_api_client: AsyncNBAApiClient, league: str) -> list:
+    """Async variant of `extract_teams_in_league`"""
+    teams = await nba_api_client.get_teams(league)
+    return [team["id"] for team in teams]
+
+async def fan_out_teams_async(
+        func,
+        teams: list
+    ) -> list:
+    """
+    Async variant of `fan_out_teams`. The requests of every team are awaited concurrently, 
+    concurrency is bounded by the `max_concurrency` of the client.
+
+    Args:
+        func: coroutine function taking a team id and returning a list of records
+        teams: list of team ids
+
+    Returns:
+        A list of records ordered by the position of the team in `teams`, regardless of completion order
+
+    Raises:
+        TeamExtractionError if any of the per-team requests fail. All teams are attempted before raising.
+    """
+    results = await asyncio.gather(*(func(team) for team in teams), return_exceptions=True)
+    data = []
+    failures = {}
+    for team, result in zip(teams, results):
+        if isinstance(result, BaseException):
+            failures[team] = result
+        else:
+            data.extend(result)
+    if failures:
+        raise TeamExtractionError(failures=failures)
+    return data
+
+async def extract_players_async(
+        nba_api_client: AsyncNBAApiClient,
+        league: str,
+        season: int,
+        teams: list = None,
+        landing_zone: LandingZone = None
+    ) -> pd.DataFrame:
+    """Async variant of `extract_players`. The teams of the league are requested unless `teams` is provided."""
+    if teams is None:
+        teams = await extract_teams_in_league_async(nba_api_client=nba_api_client, league=league)
+    data = await fan_out_teams_async(func=lambda team: nba_api_client.get_players(season=season, team=team), teams=teams)
+    return build_extract(records=data, endpoint="players", league=league, season=season, landing_zone=landing_zone)
+
+async def extract_player_statistics_async(
+        nba_api_client: AsyncNBAApiClient,
+        league: str,
+        season: int,
+        teams: list = None,
+        landing_zone: LandingZone = None
+    ) -> pd.DataFrame:
+    """Async variant of `extract_player_statistics`. The teams of the league are requested unless `teams` is provided."""
+    if teams is None:
+        teams = await extract_teams_in_league_async(nba_api_client=nba_api_client, league=league)
+    data = await fan_out_teams_async(func=lambda team: nba_api_client.get_player_statistics(season=season, team=team), teams=teams)
+    return build_extract(records=data, endpoint="players_statistics", league=league, season=season, landing_zone=landing_zone)
+
+async def extract_standings_async(
+        nba_api_client: AsyncNBAApiClient,
+        league: str,
+        season: int,
+        landing_zone: LandingZone = None
+    ) -> pd.DataFrame:
+    """Async variant of `extract_standings`"""
+    data = await nba_api_client.get_standings(league=league, season=season)
+    return build_extract(records=data, endpoint="standings", league=league, season=season, landing_zone=landing_zone)
+
+async def extract_games_async(
+        nba_api_client: AsyncNBAApiClient,
+        league: str,
+        season: int,
+        since: date = None,
+        landing_zone: LandingZone = None,
+        max_game_dates: int = MAX_INCREMENTAL_GAME_DATES
+    ) -> pd.DataFrame:
+    """Async variant of `extract_games`. With `since`, the games of every date are requested concurrently."""
+    game_dates = get_game_dates(since=since) if since is not None else []
+    if since is None or len(game_dates) > max_game_dates:
+        data = await nba_api_client.get_games(league=league, season=season)
+    else:
+        games_by_date = await asyncio.gather(*(
+            nba_api_client.get_games(league=league, season=season, game_date=game_date) for game_date in game_dates
+        ))
+        data = [game for games in games_by_date for game in games]
+    if since is not None:
+        data = [game for game in data if get_game_date(game) >= since]
+    return build_extract(records=data, endpoint="games", league=league, season=season, landing_zone=landing_zone, deduplicate=since is not None)
+
+async def extract_season_async(
+        nba_api_client: AsyncNBAApiClient,
+        league: str,
+        season: int,
+        teams: list = None,
+        games_since: date = None,
+        landing_zone: LandingZone = None,
+        endpoints: list[str] = None
+    ) -> dict:
+    """
+    Extract the games, players, player statistics and standings of a league and season concurrently, 
+    so the requests of every endpoint overlap.
+
+    Args:
+        nba_api_client: the async NBA API client
+        league: the league
+        season: the season in YYYY format
+        teams: optional, the team ids of the league. They are requested once when not provided.
+        games_since: optional, only extract the games played on or after this date
+        landing_zone: optional, landing zone of the run
+        endpoints: optional, only extract these endpoints
+
+    Returns:
+        A dict of endpoint ("games", "players", "players_statistics", "standings") -> raw dataframe
+    """
+    endpoints = endpoints if endpoints is not None else list(EXTRACT_FIELDS)
+    if teams is None and {"players", "players_statistics"} & set(endpoints):
+        teams = await extract_teams_in_league_async(nba_api_client=nba_api_client, league=league)
+    extracts = {
+        "games": lambda: extract_games_async(nba_api_client=nba_api_client, league=league, season=season, since=games_since, landing_zone=landing_zone),
+        "players": lambda: extract_players_async(nba_api_client=nba_api_client, league=league, season=season, teams=teams, landing_zone=landing_zone),
+        "players_statistics": lambda: extract_player_statistics_async(nba_api_client=nba_api_client, league=league, season=season, teams=teams, landing_zone=landing_zone),
+        "standings": lambda: extract_standings_async(nba_api_client=nba_api_client, league=league, season=season, landing_zone=landing_zone)
+    }
+    dfs = await asyncio.gather(*(extracts[endpoint]() for endpoint in endpoints))
+    return dict(zip(endpoints, dfs))
+
+async def extract_seasons_async(
+        nba_api_client: AsyncNBAApiClient,
+        units: list[tuple],
+        landing_zone: LandingZone = None
+    ) -> dict:
+    """
+    Extract several leagues and seasons in one event loop, e.g. for a backfill. 
+    The teams of each league are requested once and the requests of every season overlap.
+
+    Args:
+        nba_api_client: the async NBA API client
+        units: list of (league, season)
+        landing_zone: optional, landing zone of the run
+
+    Returns:
+        A dict of (league, season) -> the extracts returned by `extract_season_async`
+    """
+    leagues = list(dict.fromkeys(league for league, _ in units))
+    team_ids = await asyncio.gather(*(extract_teams_in_league_async(nba_api_client=nba_api_client, league=league) for league in leagues))
+    teams_by_league = dict(zip(leagues, team_ids))
+    extracts = await asyncio.gather(*(
+        extract_season_async(nba_api_client=nba_api_client, league=league, season=season, teams=teams_by_league[league], landing_zone=landing_zone)
+        for league, season in units
+    ))
+    return {(league, season): extract for (league, season), extract in zip(units, extracts)}
+
+def get_games_watermark(
+        df_games: pd.DataFrame
+    ) -> date:
+    """
+    Return the date of the latest finished game in an extracted games dataframe, or None if no game is finished
+    """
+    if df_games.empty or "status.short" not in df_games.columns:
+        return None
+    finished_games = df_games[df_games["status.short"] == GAME_STATUS_FINISHED]
+    if finished_games.empty:
+        return None
+    return pd.to_datetime(finished_games["date.start"]).max().date()
+
 def create_key_player(
         row
     ):
     return str(row["player_id"])+row["league"]+str(row["season"])
 
+def create_player_keys(
+        df: pd.DataFrame
+    ) -> pd.Series:
+    """
+    Vectorized equivalent of `create_key_player` for a whole dataframe
+    """
+    return df["player_id"].astype(str) + df["league"].astype(str) + df["season"].astype(str)
+
+
+def parse_minutes(
+        minutes: pd.Series
+    ) -> pd.Series:
+    """
+    Convert minutes played in "mm:ss" (or "mm") format to a number of minutes. 
+    A season only has a few thousand distinct values, so each distinct value is parsed once.
+    """
+    codes, uniques = pd.factorize(minutes)
+    if len(uniques) == 0:
+        return pd.Series(np.nan, index=minutes.index, dtype="float64")
+    parts = pd.Series(uniques, dtype=object).str.partition(":")
+    parsed_uniques = (pd.to_numeric(parts[0], errors="coerce") + pd.to_numeric(parts[2], errors="coerce").fillna(0) / 60).to_numpy()
+    return pd.Series(np.where(codes >= 0, parsed_uniques[codes], np.nan), index=minutes.index)
+
+# one row per player, team, league and season in the player statistics summary
+PLAYER_STATISTICS_KEYS = ["player_id", "team_id", "league", "season"]
+
+def combine_player_statistics_summaries(
+        df_summary: pd.DataFrame
+    ) -> pd.DataFrame:
+    """
+    Collapse a player statistics summary holding several rows per player, team, league and season, 
+    e.g. the concatenated summaries of several batches. The name and position are taken from the first row.
+    """
+    df_totals = df_summary.groupby(PLAYER_STATISTICS_KEYS, as_index=False, observed=True, sort=False)[
+        ["points", "rebounds", "assists", "minutes", "games_played"]
+    ].sum()
+    # cheaper than a groupby "first" aggregation on string columns
+    df_attributes = df_summary.drop_duplicates(subset=PLAYER_STATISTICS_KEYS, keep="first")[PLAYER_STATISTICS_KEYS + ["first_name", "last_name", "position"]]
+    return df_attributes.merge(df_totals, on=PLAYER_STATISTICS_KEYS)
+
+def summarize_player_statistics(
+        df_players_statistics: pd.DataFrame
+    ) -> pd.DataFrame:
+    """
+    Sum the player statistics by game per player, team, league and season. 
+    The name and position of each player are taken from their first game.
+    """
+    df_players_statistics_renamed = df_players_statistics.reindex(columns=PLAYER_STATISTICS_COLUMNS).rename(columns={
+        "player.id": "player_id",
+        "player.firstname": "first_name",
+        "player.lastname": "last_name",
+        "team.id": "team_id",
+        "pos": "position",
+        "totReb": "rebounds"
+    })
+    df_players_statistics_renamed["minutes"] = parse_minutes(df_players_statistics_renamed.pop("min"))
+    df_players_statistics_renamed["games_played"] = 1
+    return combine_player_statistics_summaries(df_summary=df_players_statistics_renamed)
 
 def transform_player_statistics(
         df_players:pd.DataFrame, 
-        df_players_statistics:pd.DataFrame
+        df_players_statistics:pd.DataFrame = None,
+        df_player_statistics_summary:pd.DataFrame = None
     )->pd.DataFrame:
     """
-    Using df result from extracting players and df result from extracting player statistics, transform to create final df
+    Using df result from extracting players and df result from extracting player statistics, transform to create final df. 
+    The player statistics by game are summed per player, team, league and season first, then joined to the player attributes. 
+    Pass `df_player_statistics_summary` instead of `df_players_statistics` when the statistics were already summarized, 
+    e.g. by `aggregate_player_statistics`.
     """
-    df_players_selected = df_players[['id','height.meters','weight.kilograms','birth.date','leagues.standard.jersey','season','league']]
+    if df_player_statistics_summary is None:
+        df_player_statistics_summary = summarize_player_statistics(df_players_statistics=df_players_statistics)
+
+    df_players_selected = df_players[PLAYERS_COLUMNS]
 
     df_players_renamed = df_players_selected.rename(columns={
         "id": "player_id",
@@ -112,39 +683,23 @@ def transform_player_statistics(
         "birth.date": "birth_date",
         "leagues.standard.jersey": "jersey_number"
     })
-    
-    df_players_statistics_selected = df_players_statistics[['player.id','player.firstname','player.lastname','team.id','pos','points','season','league']]
-
-    df_player_statistics_renamed = df_players_statistics_selected.rename(columns={
-        "player.id": "player_id",
-        "player.firstname": "first_name",
-        "player.lastname": "last_name",
-        "team.id": "team_id",
-        "pos": "position"
-    })
+    # players are extracted per team, a player who changed teams is listed more than once
+    df_players_renamed = df_players_renamed.drop_duplicates(subset=["player_id","league","season"], keep="first")
 
-    df_player_summary = pd.merge(
-        left=df_players_renamed, 
-        right=df_player_statistics_renamed, 
-        left_on=["player_id","league","season"], 
-        right_on=["player_id","league","season"]
+    df = pd.merge(
+        left=df_player_statistics_summary, 
+        right=df_players_renamed[["player_id","birth_date","jersey_number","league","season"]], 
+        on=["player_id","league","season"]
     )
 
-    df_player_summary['birth_date']= pd.to_datetime(df_player_summary['birth_date']).dt.date
-    df_player_summary["current_age"] = df_player_summary['birth_date'].apply(calculate_age)
+    birth_dates = pd.to_datetime(df['birth_date'])
+    df['birth_date']= birth_dates.dt.date
+    df["current_age"] = calculate_ages(birth_dates)
+    df["player_table_id"] = create_player_keys(df)
 
-    df = df_player_summary.groupby(['player_id','birth_date','jersey_number','season','league','first_name'\
-        ,'last_name','team_id','position','current_age'], as_index=False).sum("points")
-    
-    df.drop_duplicates(subset=['player_id'], keep='first')
-    
-    df = df.astype({'jersey_number':'int','current_age':'int','points':int})
-    
-    df["player_table_id"] = df.apply(lambda row: create_key_player(row), axis=1)
-    
-    df.drop_duplicates(subset=['player_table_id'], keep='first')
-
-    return df
+    df = df[['player_id','birth_date','jersey_number','season','league','first_name','last_name','team_id','position','current_age',
+        'points','rebounds','assists','minutes','games_played','player_table_id']]
+    return apply_dtypes(df=df, dtypes=TABLE_DTYPES["players_statistics"])
 
 def get_winner_id(
         row
@@ -161,6 +716,24 @@ def get_loser_id(
         return row["home_team_id"]
     else:
         return row["away_team_id"]
+
+def get_winner_ids(
+        df: pd.DataFrame
+    ) -> np.ndarray:
+    """
+    Vectorized equivalent of `get_winner_id` for a whole dataframe
+    """
+    home_team_won = (df["home_team_score"] > df["away_team_score"]).fillna(False).astype(bool)
+    return np.where(home_team_won, df["home_team_id"], df["away_team_id"])
+
+def get_loser_ids(
+        df: pd.DataFrame
+    ) -> np.ndarray:
+    """
+    Vectorized equivalent of `get_loser_id` for a whole dataframe
+    """
+    home_team_lost = (df["home_team_score"] < df["away_team_score"]).fillna(False).astype(bool)
+    return np.where(home_team_lost, df["home_team_id"], df["away_team_id"])
     
 def transform_games(
         df_games:pd.DataFrame
@@ -168,11 +741,12 @@ def transform_games(
     """
     Create final df for games data
     """
-    df_games_selected = df_games[['id','league','season','date.start','teams.home.id','teams.home.name','scores.home.points','teams.visitors.id','teams.visitors.name','scores.visitors.points']]
+    df_games_selected = df_games.reindex(columns=GAMES_COLUMNS)
 
     df_games_renamed = df_games_selected.rename(columns={
         "id": "game_id",
         "date.start": "date",
+        "status.short": "status",
         "teams.home.id": "home_team_id",
         "teams.home.name": "home_team_name",
         "scores.home.points": "home_team_score",
@@ -182,23 +756,31 @@ def transform_games(
     })
     
     df_games_renamed['date']= pd.to_datetime(df_games_renamed['date']).dt.date
-    df_games_renamed['winner_team_id'] = df_games_renamed.apply(lambda row: get_winner_id(row), axis=1)
-    df_games_renamed['loser_team_id'] = df_games_renamed.apply(lambda row: get_loser_id(row), axis=1)
+    df_games_renamed['winner_team_id'] = get_winner_ids(df_games_renamed)
+    df_games_renamed['loser_team_id'] = get_loser_ids(df_games_renamed)
 
-    return df_games_renamed
+    return apply_dtypes(df=df_games_renamed, dtypes=TABLE_DTYPES["games"])
 
 def create_key_team(
         row
     ):
     return str(row["team_id"])+row["league"]+str(row["season"])
 
+def create_team_keys(
+        df: pd.DataFrame
+    ) -> pd.Series:
+    """
+    Vectorized equivalent of `create_key_team` for a whole dataframe
+    """
+    return df["team_id"].astype(str) + df["league"].astype(str) + df["season"].astype(str)
+
 def transform_standings(
         df_standings:pd.DataFrame
     )->pd.DataFrame:
     """
     Create final df for standings data
     """
-    df_standings_selected = df_standings[['team.id','team.name','league','season','conference.name','conference.rank','division.name','division.rank','win.total','loss.total']]
+    df_standings_selected = df_standings[STANDINGS_COLUMNS]
     df_standings_renamed = df_standings_selected.rename(columns={
         "team.id": "team_id", 
         "team.name": "team_name",
@@ -211,17 +793,179 @@ def transform_standings(
 
     })
 
-    df_standings_renamed["standings_table_id"] = df_standings_renamed.apply(lambda row: create_key_team(row), axis=1)
+    df_standings_renamed["standings_table_id"] = create_team_keys(df_standings_renamed)
+
+    return apply_dtypes(df=df_standings_renamed, dtypes=TABLE_DTYPES["standings"])
+
+def transform_team_form(
+        df_games: pd.DataFrame
+    ) -> pd.DataFrame:
+    """
+    Create the running form of each team after each of its finished games: record, last 10 games and streak.
+    The games must cover the whole season (e.g. the games table rather than an incremental extract), 
+    as the records are counted from the first game of the season.
+
+    Args:
+        df_games: games as built by `transform_games`
+
+    Returns:
+        One row per team and finished game, with the `streak` of consecutive wins (positive) or losses (negative)
+    """
+    # live games have scores too, only finished games count. Games loaded before their status was stored have 
+    # no status, they count once both scores are known.
+    finished = (df_games["status"] == GAME_STATUS_FINISHED).fillna(False)
+    unknown_status = df_games["status"].isna() & df_games["home_team_score"].notna() & df_games["away_team_score"].notna()
+    df_games = df_games[(finished | unknown_status).to_numpy(dtype=bool)]
+    home = df_games.rename(columns={
+        "home_team_id": "team_id", "home_team_name": "team_name", "home_team_score": "points_for",
+        "away_team_id": "opponent_team_id", "away_team_score": "points_against"
+    })
+    away = df_games.rename(columns={
+        "away_team_id": "team_id", "away_team_name": "team_name", "away_team_score": "points_for",
+        "home_team_id": "opponent_team_id", "home_team_score": "points_against"
+    })
+    columns = ["game_id", "team_id", "team_name", "league", "season", "date", "opponent_team_id", "points_for", "points_against"]
+    df = pd.concat([home[columns].assign(is_home=True), away[columns].assign(is_home=False)], ignore_index=True)
+    # team names are categoricals with different categories on the home and away sides
+    df["team_name"] = df["team_name"].astype(str)
+    df = df.sort_values(TEAM_FORM_KEYS + ["date", "game_id"], kind="stable", ignore_index=True)
+
+    df["won"] = (df["points_for"] > df["points_against"]).astype(bool)
+    teams = df.groupby(TEAM_FORM_KEYS, sort=False, observed=True)
+    df["games_played"] = teams.cumcount() + 1
+    df["wins"] = teams["won"].cumsum()
+    df["losses"] = df["games_played"] - df["wins"]
+    # wins over the last 10 games: the running wins minus the running wins 10 games earlier
+    df["last_10_wins"] = df["wins"] - df.groupby(TEAM_FORM_KEYS, sort=False, observed=True)["wins"].shift(10, fill_value=0)
+    df["last_10_losses"] = df["games_played"].clip(upper=10) - df["last_10_wins"]
+    # a streak starts at the first game of a team and at each change of result
+    streak_ids = (df["won"] != teams["won"].shift()).cumsum()
+    streak_lengths = df.groupby(streak_ids).cumcount() + 1
+    df["streak"] = np.where(df["won"], streak_lengths, -streak_lengths)
+
+    df = df[["game_id", "team_id", "team_name", "league", "season", "date", "is_home", "opponent_team_id", "points_for", "points_against",
+        "won", "games_played", "wins", "losses", "last_10_wins", "last_10_losses", "streak"]]
+    return apply_dtypes(df=df, dtypes=TABLE_DTYPES["team_form"])
+
+def transform_team_season_summary(
+        df_team_form: pd.DataFrame
+    ) -> pd.DataFrame:
+    """
+    Create the season summary of each team: record, home/away splits, points per game and current form.
+
+    Args:
+        df_team_form: team form as built by `transform_team_form`
+    """
+    is_home = df_team_form["is_home"]
+    won = df_team_form["won"]
+    df_summary = df_team_form.assign(
+        home_games=is_home.astype("int16"),
+        home_wins=(won & is_home).astype("int16"),
+        home_points=df_team_form["points_for"].where(is_home, 0).astype("int32"),
+        away_games=(~is_home).astype("int16"),
+        away_wins=(won & ~is_home).astype("int16"),
+        away_points=df_team_form["points_for"].where(~is_home, 0).astype("int32"),
+        points_for=df_team_form["points_for"].astype("int32"),
+        points_against=df_team_form["points_against"].astype("int32")
+    ).groupby(TEAM_FORM_KEYS, sort=False, observed=True, as_index=False).agg(
+        games_played=("won", "size"),
+        wins=("won", "sum"),
+        points_for=("points_for", "sum"),
+        points_against=("points_against", "sum"),
+        home_games=("home_games", "sum"),
+        home_wins=("home_wins", "sum"),
+        home_points=("home_points", "sum"),
+        away_games=("away_games", "sum"),
+        away_wins=("away_wins", "sum"),
+        away_points=("away_points", "sum")
+    )
+    # the form is sorted by date, the last row of a team is its current form
+    df_current_form = df_team_form.groupby(TEAM_FORM_KEYS, sort=False, observed=True).tail(1)
+    df = pd.merge(
+        left=df_summary,
+        right=df_current_form[TEAM_FORM_KEYS + ["team_name", "last_10_wins", "last_10_losses", "streak"]],
+        on=TEAM_FORM_KEYS
+    )
+
+    df["losses"] = df["games_played"] - df["wins"]
+    df["home_losses"] = df["home_games"] - df["home_wins"]
+    df["away_losses"] = df["away_games"] - df["away_wins"]
+    df["win_percentage"] = (df["wins"] / df["games_played"]).round(3)
+    df["points_per_game"] = (df["points_for"] / df["games_played"]).round(1)
+    df["points_allowed_per_game"] = (df["points_against"] / df["games_played"]).round(1)
+    # a team without home (or away) games yet has no home (or away) points per game
+    df["home_points_per_game"] = (df["home_points"] / df["home_games"].replace(0, np.nan)).round(1)
+    df["away_points_per_game"] = (df["away_points"] / df["away_games"].replace(0, np.nan)).round(1)
 
-    return df_standings_renamed
+    df = df[["team_id", "team_name", "league", "season", "games_played", "wins", "losses", "win_percentage", "points_per_game",
+        "points_allowed_per_game", "home_wins", "home_losses", "home_points_per_game", "away_wins", "away_losses", "away_points_per_game",
+        "last_10_wins", "last_10_losses", "streak"]]
+    return apply_dtypes(df=df, dtypes=TABLE_DTYPES["team_season_summary"])
+
+def transform_player_season_summary(
+        df_players_statistics: pd.DataFrame
+    ) -> pd.DataFrame:
+    """
+    Create the per game averages of each player, team, league and season.
+
+    Args:
+        df_players_statistics: player statistics as built by `transform_player_statistics`
+    """
+    df = df_players_statistics[PLAYER_STATISTICS_KEYS + ["first_name", "last_name", "position", "games_played"]].copy()
+    games_played = df_players_statistics["games_played"].replace(0, np.nan)
+    for column in ["points", "rebounds", "assists", "minutes"]:
+        df[f"{column}_per_game"] = (df_players_statistics[column] / games_played).round(1)
+    return apply_dtypes(df=df, dtypes=TABLE_DTYPES["player_season_summary"])
+
+def read_games(
+        postgresql_client: PostgreSqlClient,
+        table: Table,
+        league: str,
+        season: int
+    ) -> pd.DataFrame:
+    """
+    Read the loaded games of a league and season, e.g. to compute season-long aggregates 
+    when only the latest games were extracted.
+
+    Returns:
+        The games, with the columns and dtypes built by `transform_games`
+    """
+    df = pd.read_sql(
+        sql=table.select().where(table.c.league == league, table.c.season == season),
+        con=postgresql_client.engine
+    )
+    return apply_dtypes(df=df, dtypes=TABLE_DTYPES["games"])
+
+def to_records(
+        df: pd.DataFrame
+    ) -> list[dict]:
+    """
+    Convert a dataframe to a list of dicts of python values, with None for missing values 
+    (nullable integer columns otherwise yield pd.NA, which the database driver cannot send).
+    """
+    return df.astype(object).where(df.notna(), None).to_dict(orient='records')
+
+def iter_records(
+        df: pd.DataFrame,
+        chunksize: int
+    ):
+    """
+    Yield the rows of a dataframe as lists of dicts of at most `chunksize` rows, 
+    so only one batch is converted to python objects at a time.
+    """
+    for start in range(0, len(df), chunksize):
+        yield to_records(df.iloc[start:start + chunksize])
 
 def load(
         df: pd.DataFrame,
         postgresql_client: PostgreSqlClient, 
         table: Table, 
         metadata: MetaData, 
-        load_method: str = "overwrite"
-    ) -> None:
+        load_method: str = "overwrite",
+        chunksize: int = None,
+        row_hash_store: RowHashStore = None,
+        replace_where: dict = None
+    ) -> dict:
     """
     Load dataframe to a database.
 
@@ -230,25 +974,91 @@ def load(
         postgresql_client: postgresql client
         table: sqlalchemy table
         metadata: sqlalchemy metadata
-        load_method: supports one of: [insert, upsert, overwrite]
-    """
-    if load_method == "insert":
-        postgresql_client.insert(
-            data=df.to_dict(orient='records'),
-            table=table,
-            metadata=metadata
-        )
-    elif load_method == "upsert":
-        postgresql_client.upsert(
-            data=df.to_dict(orient='records'),
-            table=table,
-            metadata=metadata
-        )
-    elif load_method == "overwrite": 
-        postgresql_client.overwrite(
-            data=df.to_dict(orient='records'),
-            table=table,
-            metadata=metadata
-        )
-    else: 
-        raise Exception("Please specify a correct load method: [insert, upsert, overwrite]")
+        load_method: supports one of: [insert, upsert, overwrite, bulk_upsert, replace]. 
+            bulk_upsert streams the dataframe with COPY and merges it server-side, for large frames.
+            replace swaps the rows matching `replace_where` for the dataframe, e.g. one league and season.
+        chunksize: when set, rows are sent in batches of `chunksize` inside a single transaction 
+            instead of one statement holding the whole dataframe.
+        row_hash_store: when set with the upsert or bulk_upsert load methods, only the rows whose content hash 
+            differs from the stored one are sent to the database.
+        replace_where: dict of column name -> value selecting the rows replaced by the replace load method.
+
+    The rows, and their hashes when a row hash store is given, are loaded in a single transaction 
+    (except for the overwrite load method, which swaps tables in its own transaction).
+
+    Returns:
+        A dict with the number of `rows` loaded, the `seconds` it took and the `rows_per_second`. 
+        With a row hash store, also the number of `inserted`, `updated` and `unchanged` rows.
+    """
+    if load_method not in ["insert", "upsert", "overwrite", "bulk_upsert", "replace"]:
+        raise Exception("Please specify a correct load method: [insert, upsert, overwrite, bulk_upsert, replace]")
+    start_time = time.perf_counter()
+    change_counts = {}
+    detect_changes = row_hash_store is not None and load_method in ["upsert", "bulk_upsert"]
+    if detect_changes:
+        df, change_counts, df_hashes = row_hash_store.diff(df=df, table=table)
+    if load_method == "overwrite":
+        # the overwrite swaps a shadow table into place in its own transaction
+        if chunksize:
+            postgresql_client.overwrite_chunks(chunks=iter_records(df=df, chunksize=chunksize), table=table, metadata=metadata)
+        else:
+            postgresql_client.overwrite(data=to_records(df), table=table, metadata=metadata)
+    else:
+        with postgresql_client.begin() as connection:
+            if df.empty and load_method != "replace":
+                # nothing to send, e.g. an incremental extract without new games
+                pass
+            elif load_method == "insert" and chunksize:
+                postgresql_client.insert_chunks(
+                    chunks=iter_records(df=df, chunksize=chunksize),
+                    table=table,
+                    metadata=metadata,
+                    connection=connection
+                )
+            elif load_method == "insert":
+                postgresql_client.insert(
+                    data=to_records(df),
+                    table=table,
+                    metadata=metadata,
+                    connection=connection
+                )
+            elif load_method == "upsert" and chunksize:
+                postgresql_client.upsert_chunks(
+                    chunks=iter_records(df=df, chunksize=chunksize),
+                    table=table,
+                    metadata=metadata,
+                    connection=connection
+                )
+            elif load_method == "upsert":
+                postgresql_client.upsert(
+                    data=to_records(df),
+                    table=table,
+                    metadata=metadata,
+                    connection=connection
+                )
+            elif load_method == "replace":
+                postgresql_client.replace_chunks(
+                    chunks=iter_records(df=df, chunksize=chunksize) if chunksize else [to_records(df)],
+                    table=table,
+                    metadata=metadata,
+                    where=replace_where,
+                    connection=connection
+                )
+            elif load_method == "bulk_upsert":
+                postgresql_client.bulk_upsert(
+                    df=df,
+                    table=table,
+                    metadata=metadata,
+                    chunksize=chunksize or 10000,
+                    connection=connection
+                )
+            if detect_changes:
+                # the hashes are committed with the rows, a failed load leaves both untouched
+                row_hash_store.save(table_name=table.name, df_hashes=df_hashes, connection=connection)
+    seconds = time.perf_counter() - start_time
+    return {
+        "rows": len(df),
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(len(df) / seconds, 1) if seconds > 0 else None,
+        **change_counts
+    }
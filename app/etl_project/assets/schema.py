@@ -0,0 +1,143 @@
+from sqlalchemy import Table, Column, Integer, String, MetaData, Float, Date, Boolean, Index
+
+def create_tables(metadata: MetaData, partition_by_season: bool = False) -> dict:
+    """
+    Define the target tables, with their keys and the indexes of the lookups by league, season, team and date.
+
+    Args:
+        metadata: metadata the tables are added to
+        partition_by_season: declare the tables as Postgres partitioned tables, with one list partition per season.
+            Primary keys of partitioned tables include the season, as Postgres requires.
+            `PostgreSqlClient.create_table` creates the partitions of the seasons it is given.
+
+    Returns:
+        A dict of table name -> sqlalchemy table
+    """
+    partitioning = {"postgresql_partition_by": "LIST (season)"} if partition_by_season else {}
+
+    table_games = Table(
+        "games", metadata,
+        Column("game_id", Integer, primary_key=True),
+        Column("league", String),
+        Column("season", Integer, primary_key=partition_by_season),
+        Column("date", Date),
+        Column("status", Integer),
+        Column("home_team_id", Integer),
+        Column("home_team_name", String),
+        Column("home_team_score", Float),
+        Column("away_team_id", Integer),
+        Column("away_team_name", String),
+        Column("away_team_score", Float),
+        Column("winner_team_id", Integer),
+        Column("loser_team_id", Integer),
+        Index("games_league_season_home_team_id_date_idx", "league", "season", "home_team_id", "date"),
+        Index("games_league_season_away_team_id_date_idx", "league", "season", "away_team_id", "date"),
+        Index("games_league_season_date_idx", "league", "season", "date"),
+        **partitioning
+    )
+    table_standings = Table(
+        "standings", metadata,
+        Column("team_id", Integer),
+        Column("team_name", String),
+        Column("league", String),
+        Column("season", Integer, primary_key=partition_by_season),
+        Column("conference_name", String),
+        Column("conference_rank", Integer),
+        Column("division_name", String),
+        Column("division_rank", Integer),
+        Column("win_total", Integer),
+        Column("loss_total", Integer),
+        Column("standings_table_id", String, primary_key=True),
+        Index("standings_league_season_team_id_idx", "league", "season", "team_id"),
+        **partitioning
+    )
+    table_players_statistics = Table(
+        "players_statistics", metadata,
+        Column("player_id", Integer, primary_key=True),
+        Column("birth_date", Date),
+        Column("jersey_number", Integer),
+        Column("season", Integer, primary_key=True),
+        Column("league", String, primary_key=True),
+        Column("first_name", String),
+        Column("last_name", String),
+        Column("team_id", Integer, primary_key=True),
+        Column("position", String),
+        Column("current_age", Integer),
+        Column("points", Integer),
+        Column("rebounds", Integer),
+        Column("assists", Integer),
+        Column("minutes", Float),
+        Column("games_played", Integer),
+        Column("player_table_id", String),
+        Index("players_statistics_league_season_team_id_idx", "league", "season", "team_id"),
+        # replaced per league/season on every load, tables of earlier versions hold a row per position that can be dropped
+        info={"rebuilt_on_load": True},
+        **partitioning
+    )
+    # analytics marts derived from the tables above, for the dashboards
+    table_team_form = Table(
+        "team_form", metadata,
+        Column("game_id", Integer, primary_key=True),
+        Column("team_id", Integer, primary_key=True),
+        Column("team_name", String),
+        Column("league", String),
+        Column("season", Integer, primary_key=partition_by_season),
+        Column("date", Date),
+        Column("is_home", Boolean),
+        Column("opponent_team_id", Integer),
+        Column("points_for", Integer),
+        Column("points_against", Integer),
+        Column("won", Boolean),
+        Column("games_played", Integer),
+        Column("wins", Integer),
+        Column("losses", Integer),
+        Column("last_10_wins", Integer),
+        Column("last_10_losses", Integer),
+        Column("streak", Integer),
+        Index("team_form_league_season_team_id_date_idx", "league", "season", "team_id", "date"),
+        **partitioning
+    )
+    table_team_season_summary = Table(
+        "team_season_summary", metadata,
+        Column("league", String, primary_key=True),
+        Column("season", Integer, primary_key=True),
+        Column("team_id", Integer, primary_key=True),
+        Column("team_name", String),
+        Column("games_played", Integer),
+        Column("wins", Integer),
+        Column("losses", Integer),
+        Column("win_percentage", Float),
+        Column("points_per_game", Float),
+        Column("points_allowed_per_game", Float),
+        Column("home_wins", Integer),
+        Column("home_losses", Integer),
+        Column("home_points_per_game", Float),
+        Column("away_wins", Integer),
+        Column("away_losses", Integer),
+        Column("away_points_per_game", Float),
+        Column("last_10_wins", Integer),
+        Column("last_10_losses", Integer),
+        Column("streak", Integer),
+        **partitioning
+    )
+    table_player_season_summary = Table(
+        "player_season_summary", metadata,
+        Column("league", String, primary_key=True),
+        Column("season", Integer, primary_key=True),
+        Column("player_id", Integer, primary_key=True),
+        Column("team_id", Integer, primary_key=True),
+        Column("first_name", String),
+        Column("last_name", String),
+        Column("position", String),
+        Column("games_played", Integer),
+        Column("points_per_game", Float),
+        Column("rebounds_per_game", Float),
+        Column("assists_per_game", Float),
+        Column("minutes_per_game", Float),
+        Index("player_season_summary_points_per_game_idx", "league", "season", "points_per_game"),
+        **partitioning
+    )
+    return {
+        "games": table_games, "standings": table_standings, "players_statistics": table_players_statistics, "team_form": table_team_form,
+        "team_season_summary": table_team_season_summary, "player_season_summary": table_player_season_summary
+    }
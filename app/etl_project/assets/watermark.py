@@ -0,0 +1,61 @@
+from etl_project.connectors.postgresql import PostgreSqlClient
+from datetime import datetime, date
+from sqlalchemy import Table, Column, Integer, String, MetaData, Date
+from sqlalchemy import select, func
+from sqlalchemy.dialects import postgresql
+
+class Watermark:
+    """
+    High-water marks of incremental extractions, stored in the logging database.
+    A watermark is kept per pipeline, league and season.
+    """
+    def __init__(
+            self,
+            pipeline_name: str,
+            postgresql_client: PostgreSqlClient,
+            watermark_table_name: str = "pipeline_watermarks"
+        ):
+        self.pipeline_name = pipeline_name
+        self.postgresql_client = postgresql_client
+        self.metadata = MetaData()
+        self.table = Table(
+            watermark_table_name,
+            self.metadata,
+            Column("pipeline_name", String, primary_key=True),
+            Column("league", String, primary_key=True),
+            Column("season", Integer, primary_key=True),
+            Column("watermark", Date),
+            Column("updated_at", String)
+        )
+        self.postgresql_client.create_table(metadata=self.metadata)
+
+    def get(self, league: str, season: int) -> date:
+        """Return the watermark of a league and season, or None if no watermark was recorded yet"""
+        with self.postgresql_client.engine.connect() as connection:
+            row = connection.execute(
+                select(self.table.c.watermark).where(
+                    self.table.c.pipeline_name == self.pipeline_name,
+                    self.table.c.league == league,
+                    self.table.c.season == season
+                )
+            ).first()
+        return None if row is None else row[0]
+
+    def set(self, league: str, season: int, watermark: date) -> None:
+        """Record the watermark of a league and season. Watermarks never move backwards."""
+        insert_statement = postgresql.insert(self.table).values(
+            pipeline_name=self.pipeline_name,
+            league=league,
+            season=season,
+            watermark=watermark,
+            updated_at=str(datetime.now())
+        )
+        upsert_statement = insert_statement.on_conflict_do_update(
+            index_elements=["pipeline_name", "league", "season"],
+            set_={
+                "watermark": func.greatest(self.table.c.watermark, insert_statement.excluded.watermark),
+                "updated_at": insert_statement.excluded.updated_at
+            }
+        )
+        with self.postgresql_client.begin() as connection:
+            connection.execute(upsert_statement)
@@ -1,23 +1,272 @@
 import requests
-from datetime import datetime
+from requests.adapters import HTTPAdapter
+import httpx
+import asyncio
+from datetime import datetime, date
 import pandas as pd
+import contextvars
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Iterator
+from etl_project.connectors.rate_limiter import TokenBucketRateLimiter
+from etl_project.connectors.response_cache import ResponseCache
 
-class NBAApiClient:
+class RequestCounter:
+    """Thread-safe count of the requests sent to the NBA API and of the bytes received"""
+    def __init__(self):
+        self.requests = 0
+        self.bytes_received = 0
+        self._lock = threading.Lock()
 
-    def __init__(self, api_key: str):
-        self.base_url = "https://v2.nba.api-sports.io"
+    def add(self, bytes_received: int) -> None:
+        with self._lock:
+            self.requests += 1
+            self.bytes_received += bytes_received
+
+GAME_STATUS_FINISHED = 3
+# playoff games are only scheduled round by round, a season is over once its last game is this old
+FINISHED_SEASON_GRACE_DAYS = 30
+
+# counters of the `count_requests` blocks the current code runs in
+_active_request_counters = contextvars.ContextVar("active_request_counters", default=())
+
+class BaseNBAApiClient:
+    """Retry, rate limiting, response caching and request counting shared by the sync and async NBA API clients"""
+
+    RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+    def __init__(
+            self, 
+            api_key: str,
+            max_retries: int = 5,
+            backoff_factor: float = 1.0,
+            max_backoff: float = 60.0,
+            timeout: float = 30.0,
+            rate_limiter: TokenBucketRateLimiter = None,
+            response_cache: ResponseCache = None,
+            base_url: str = "https://v2.nba.api-sports.io"
+        ):
+        self.base_url = base_url.rstrip("/")
         self.rapidapi_host = "v2.nba.api-sports.io"
         if api_key is None: 
             raise Exception("API key cannot be set to None.")
         self.api_key = api_key
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter if rate_limiter is not None else TokenBucketRateLimiter()
+        self.response_cache = response_cache
+        self.request_counter = RequestCounter()
+        # (league, season) of the seasons known to be over
+        self._finished_seasons = set()
+        self.headers = {
+            "X-RAPIDAPI-KEY": self.api_key,
+            "x-rapidapi-host": self.rapidapi_host
+        }
+
+    @contextmanager
+    def count_requests(self):
+        """
+        Count the requests sent and bytes received inside a `with` block, e.g. one extract. 
+        Threads started inside the block are counted when they run in a copy of its context (`contextvars.copy_context`).
+
+        Returns:
+            A context manager yielding a RequestCounter
+        """
+        counter = RequestCounter()
+        token = _active_request_counters.set(_active_request_counters.get() + (counter,))
+        try:
+            yield counter
+        finally:
+            _active_request_counters.reset(token)
+
+    def _count_request(self, response: requests.Response) -> None:
+        bytes_received = len(response.content)
+        self.request_counter.add(bytes_received)
+        for counter in _active_request_counters.get():
+            counter.add(bytes_received)
+
+    def _backoff_seconds(self, attempt: int, response: requests.Response = None) -> float:
+        """Exponential backoff with full jitter. A `Retry-After` header takes precedence when present, capped at `max_backoff`."""
+        if response is not None and response.headers.get("Retry-After"):
+            try:
+                return min(max(float(response.headers.get("Retry-After")), 0.0), self.max_backoff)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * 2 ** attempt))
+
+    @staticmethod
+    def _is_rate_limited(response: requests.Response) -> bool:
+        """api-sports may answer with a 200 and a `rateLimit` error instead of a 429"""
+        if response.status_code == 429:
+            return True
+        if response.status_code == 200:
+            try:
+                errors = response.json().get("errors")
+            except ValueError:
+                return False
+            return isinstance(errors, dict) and "rateLimit" in errors
+        return False
+
+    @staticmethod
+    def _finished_season_key(league: str, season: int) -> str:
+        return ResponseCache.make_key(endpoint="finished_season", params={"league": league, "season": int(season)})
+
+    def _is_finished_season(self, league: str, season: int) -> bool:
+        """
+        Whether every game of a league's season is finished, as seen in a full-season games response of this client
+        or, through the marker left in the response cache, of an earlier run.
+        Endpoints queried without a league (players) follow the standard league.
+        """
+        if (league, int(season)) in self._finished_seasons:
+            return True
+        if self.response_cache is not None and self.response_cache.get(self._finished_season_key(league=league, season=season)) is not None:
+            self._finished_seasons.add((league, int(season)))
+            return True
+        return False
+
+    def _record_finished_season(self, endpoint: str, params: dict, data: list[dict]) -> None:
+        """Remember a season as finished when a full-season games response holds only finished games, the last of them a while ago"""
+        if endpoint != "games" or "date" in params or not data:
+            return
+        if any((game.get("status") or {}).get("short") != GAME_STATUS_FINISHED for game in data):
+            return
+        last_game_date = max(date.fromisoformat(game["date"]["start"][:10]) for game in data)
+        if (date.today() - last_game_date).days < FINISHED_SEASON_GRACE_DAYS:
+            return
+        league = params.get("league", "standard")
+        self._finished_seasons.add((league, int(params["season"])))
+        if self.response_cache is not None:
+            self.response_cache.set(key=self._finished_season_key(league=league, season=params["season"]), data=[], ttl_key="historical")
+
+    def _lookup_cache(self, endpoint: str, params: dict) -> tuple:
+        """
+        Returns:
+            A tuple of (cache key, cached entry, conditional request headers revalidating the entry when it is stale)
+        """
+        if self.response_cache is None:
+            return None, None, {}
+        cache_key = ResponseCache.make_key(endpoint=endpoint, params=params)
+        cached_entry = self.response_cache.get(cache_key)
+        conditional_headers = {}
+        if cached_entry is not None and not self.response_cache.is_fresh(cached_entry):
+            if cached_entry.get("etag"):
+                conditional_headers["If-None-Match"] = cached_entry["etag"]
+            if cached_entry.get("last_modified"):
+                conditional_headers["If-Modified-Since"] = cached_entry["last_modified"]
+        return cache_key, cached_entry, conditional_headers
+
+    def _handle_response(self, response, endpoint: str, params: dict, allow_empty: bool, cache_key: str, cached_entry: dict) -> list[dict]:
+        """Return the `response` list of the final response of a request, caching it, or raise if the request failed"""
+        if response.status_code == 304 and cached_entry is not None:
+            self.response_cache.record(revalidation=True)
+            self.response_cache.refresh(key=cache_key, entry=cached_entry)
+            return cached_entry["data"]
+        if self._is_rate_limited(response):
+            raise Exception(f"NBA API rate limit still exceeded after {self.max_retries} retries. Status Code: {response.status_code}. Response: {response.text}")
+
+        payload = response.json() if response.status_code == 200 else {}
+        if payload.get("errors"):
+            # e.g. a daily quota or a bad token, answered with a 200 and an empty response that must not be cached
+            raise Exception(f"NBA API returned errors: {payload['errors']}")
+        data = payload.get("response")
+        if data is not None and (allow_empty or data): 
+            self._record_finished_season(endpoint=endpoint, params=params, data=data)
+            if self.response_cache is not None:
+                finished_season = "season" in params and self._is_finished_season(league=params.get("league", "standard"), season=params["season"])
+                self.response_cache.record(miss=True)
+                self.response_cache.set(
+                    key=cache_key,
+                    data=data,
+                    ttl_key="historical" if finished_season else endpoint,
+                    etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified")
+                )
+            return data
+        else: 
+            raise Exception(f"Failed to extract data from NBA API. Status Code: {response.status_code}. Response: {response.text}")
+
+class NBAApiClient(BaseNBAApiClient):
+    """
+    Client of the NBA API, sending requests over a pooled `requests` session.
+    See `BaseNBAApiClient` for the retry, rate limiting and caching arguments.
 
-    def get_games(self, league: str, season: int) -> list[dict]:
+    Args:
+        pool_maxsize: maximum number of connections kept open to the API
+    """
+
+    def __init__(self, api_key: str, pool_maxsize: int = 10, **kwargs):
+        super().__init__(api_key=api_key, **kwargs)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+        # http is only expected for local stand-ins of the API, e.g. in the benchmarks
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(self.headers)
+
+    def close(self) -> None:
+        """Close the pooled connections held by the client"""
+        self.session.close()
+
+    def _get(self, endpoint: str, params: dict, allow_empty: bool = True) -> list[dict]:
+        """
+        Send a GET request to an endpoint of the NBA API, retrying transient failures.
+        The response cache is consulted first when the client has one. Responses for seasons whose games 
+        are all finished are cached with the `historical` time to live, others with the time to live of their endpoint.
+
+        Args: 
+            endpoint: the endpoint path, e.g. "games"
+            params: the query parameters
+            allow_empty: whether an empty `response` list is a valid result
+
+        Returns: 
+            The `response` list of the payload
+        
+        Raises:
+            Exception if response code is not 200 or the API is still rate limiting after all retries, or the API returned errors. 
+        """
+        url = f"{self.base_url}/{endpoint}/"
+        cache_key, cached_entry, conditional_headers = self._lookup_cache(endpoint=endpoint, params=params)
+        if cached_entry is not None and self.response_cache.is_fresh(cached_entry):
+            self.response_cache.record(hit=True)
+            return cached_entry["data"]
+
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            try:
+                response = self.session.get(url=url, params=params, headers=conditional_headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self._backoff_seconds(attempt))
+                continue
+            self._count_request(response)
+            self.rate_limiter.update_from_headers(response.headers)
+            rate_limited = self._is_rate_limited(response)
+            if rate_limited:
+                self.rate_limiter.throttle()
+            retryable = rate_limited or response.status_code in self.RETRY_STATUS_CODES
+            if not retryable or attempt == self.max_retries:
+                break
+            time.sleep(self._backoff_seconds(attempt, response))
+
+        return self._handle_response(
+            response=response, endpoint=endpoint, params=params, allow_empty=allow_empty, cache_key=cache_key, cached_entry=cached_entry
+        )
+
+    def get_games(self, league: str, season: int, game_date: date = None) -> list[dict]:
         """
         Get the games data for an indicated league in a specific season. 
 
         Args: 
             league: the league for which games data will be requested, possible values are: "africa" "orlando" "sacramento" "standard" "utah" "vegas"
             season: the season the game was played in in YYYY format
+            game_date: optional, only request the games played on this date
 
         Returns: 
             A list of games for a given league in the given season
@@ -25,20 +274,13 @@ class NBAApiClient:
         Raises:
             Exception if response code is not 200. 
         """
-        url = f"{self.base_url}/games/"
         params = {
             "league": league,
             "season": season
         }
-        headers = {
-            "X-RAPIDAPI-KEY": self.api_key,
-            "x-rapidapi-host": self.rapidapi_host
-        }
-        response = requests.get(url=url, params=params, headers=headers)
-        if response.status_code == 200 and response.json().get("response") is not None: 
-            return response.json().get("response")
-        else: 
-            raise Exception(f"Failed to extract data from NBA API. Status Code: {response.status_code}. Response: {response.text}")
+        if game_date is not None:
+            params["date"] = str(game_date)
+        return self._get(endpoint="games", params=params)
         
     def get_teams(self, league: str) -> list[dict]:
         """
@@ -53,19 +295,10 @@ class NBAApiClient:
         Raises:
             Exception if response code is not 200. 
         """
-        url = f"{self.base_url}/teams/"
         params = {
             "league": league
         }
-        headers = {
-            "X-RAPIDAPI-KEY": self.api_key,
-            "x-rapidapi-host": self.rapidapi_host
-        }
-        response = requests.get(url=url, params=params, headers=headers)
-        if response.status_code == 200 and response.json().get("response"): 
-            return response.json().get("response")
-        else: 
-            raise Exception(f"Failed to extract data from NBA API. Status Code: {response.status_code}. Response: {response.text}")
+        return self._get(endpoint="teams", params=params, allow_empty=False)
     
     def get_players(self, season: int, team: int) -> list[dict]:
         """
@@ -81,20 +314,11 @@ class NBAApiClient:
         Raises:
             Exception if response code is not 200. 
         """
-        url = f"{self.base_url}/players/"
         params = {
             "season": season,
             "team": team
         }
-        headers = {
-            "X-RAPIDAPI-KEY": self.api_key,
-            "x-rapidapi-host": self.rapidapi_host
-        }
-        response = requests.get(url=url, params=params, headers=headers)
-        if response.status_code == 200 and response.json().get("response") is not None: 
-            return response.json().get("response")
-        else: 
-            raise Exception(f"Failed to extract data from NBA API. Status Code: {response.status_code}. Response: {response.text}")
+        return self._get(endpoint="players", params=params)
         
     def get_player_statistics(self, season: int, team: int ) -> list[dict]:
         """
@@ -109,21 +333,46 @@ class NBAApiClient:
         Raises:
             Exception if response code is not 200. 
         """
-        url = f"{self.base_url}/players/statistics/"
         params = {
             "season": season,
             "team": team
         }
-        headers = {
-            "X-RAPIDAPI-KEY": self.api_key,
-            "x-rapidapi-host": self.rapidapi_host
-        }
-        response = requests.get(url=url, params=params, headers=headers)
-        if response.status_code == 200 and response.json().get("response") is not None: 
-            return response.json().get("response")
-        else: 
-            raise Exception(f"Failed to extract data from NBA API. Status Code: {response.status_code}. Response: {response.text}")
+        return self._get(endpoint="players/statistics", params=params)
+
+    def iter_player_statistics(self, season: int, teams: list[int], max_workers: int = 1) -> Iterator[tuple]:
+        """
+        Get the player statistics of several teams one team at a time, so that only a few teams' statistics are held in memory. 
+
+        Args: 
+            season: the season the game was played in in YYYY format
+            teams: the team ids
+            max_workers: maximum number of teams requested concurrently. At most this many teams are held ahead of the consumer.
+
+        Returns: 
+            A generator of (team id, list of player statistics by game of the team), in the order of `teams`
         
+        Raises:
+            Exception if a response code is not 200. Teams after the failing team are not yielded.
+        """
+        if max_workers is None or max_workers <= 1:
+            for team in teams:
+                yield team, self.get_player_statistics(season=season, team=team)
+            return
+        remaining_teams = iter(teams)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            in_flight = deque()
+            for team in remaining_teams:
+                in_flight.append((team, executor.submit(contextvars.copy_context().run, self.get_player_statistics, season=season, team=team)))
+                if len(in_flight) >= max_workers:
+                    break
+            while in_flight:
+                team, future = in_flight.popleft()
+                records = future.result()
+                for next_team in remaining_teams:
+                    in_flight.append((next_team, executor.submit(contextvars.copy_context().run, self.get_player_statistics, season=season, team=next_team)))
+                    break
+                yield team, records
+
 
     def get_standings(self, league: str, season: int) -> list[dict]:
         """
@@ -139,20 +388,132 @@ class NBAApiClient:
         Raises:
             Exception if response code is not 200. 
         """
-        url = f"{self.base_url}/standings/"
         params = {
             "league": league,
             "season": season
         }
-        headers = {
-            "X-RAPIDAPI-KEY": self.api_key,
-            "x-rapidapi-host": self.rapidapi_host
+        return self._get(endpoint="standings", params=params)
+
+
+class AsyncNBAApiClient(BaseNBAApiClient):
+    """
+    Asyncio client of the NBA API, with the endpoint methods and return contracts of `NBAApiClient` as coroutines.
+    Requests share one `httpx.AsyncClient`, whose connections are kept alive and reused, and at most `max_concurrency` 
+    requests are in flight at once. See `BaseNBAApiClient` for the retry, rate limiting and caching arguments.
+    Use it as `async with AsyncNBAApiClient(...) as client:`, or call `aclose` when done, inside one event loop.
+
+    Args:
+        max_concurrency: maximum number of requests in flight, and of connections kept open to the API
+        http2: negotiate HTTP/2 with the API, which multiplexes the requests over a single connection. Requires the `h2` package.
+    """
+
+    def __init__(self, api_key: str, max_concurrency: int = 10, http2: bool = False, **kwargs):
+        super().__init__(api_key=api_key, **kwargs)
+        self.max_concurrency = max_concurrency
+        self.http2 = http2
+        self._client = None
+        self._semaphore = None
+
+    async def __aenter__(self) -> "AsyncNBAApiClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Close the pooled connections held by the client"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._semaphore = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # created on first use, in the event loop of the requests
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=self.timeout,
+                http2=self.http2,
+                limits=httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    async def _get(self, endpoint: str, params: dict, allow_empty: bool = True) -> list[dict]:
+        """
+        Send a GET request to an endpoint of the NBA API, retrying transient failures. See `NBAApiClient._get`.
+
+        Raises:
+            Exception if response code is not 200 or the API is still rate limiting after all retries, or the API returned errors. 
+        """
+        url = f"{self.base_url}/{endpoint}/"
+        cache_key, cached_entry, conditional_headers = self._lookup_cache(endpoint=endpoint, params=params)
+        if cached_entry is not None and self.response_cache.is_fresh(cached_entry):
+            self.response_cache.record(hit=True)
+            return cached_entry["data"]
+
+        client = self._get_client()
+        for attempt in range(self.max_retries + 1):
+            await asyncio.sleep(self.rate_limiter.reserve())
+            try:
+                async with self._semaphore:
+                    response = await client.get(url, params=params, headers=conditional_headers)
+            except httpx.TransportError:
+                if attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(self._backoff_seconds(attempt))
+                continue
+            self._count_request(response)
+            self.rate_limiter.update_from_headers(response.headers)
+            rate_limited = self._is_rate_limited(response)
+            if rate_limited:
+                self.rate_limiter.throttle()
+            retryable = rate_limited or response.status_code in self.RETRY_STATUS_CODES
+            if not retryable or attempt == self.max_retries:
+                break
+            await asyncio.sleep(self._backoff_seconds(attempt, response))
+
+        return self._handle_response(
+            response=response, endpoint=endpoint, params=params, allow_empty=allow_empty, cache_key=cache_key, cached_entry=cached_entry
+        )
+
+    async def get_games(self, league: str, season: int, game_date: date = None) -> list[dict]:
+        """Get the games data for an indicated league in a specific season. See `NBAApiClient.get_games`."""
+        params = {
+            "league": league,
+            "season": season
         }
-        response = requests.get(url=url, params=params, headers=headers)
-        if response.status_code == 200 and response.json().get("response") is not None: 
-            return response.json().get("response")
-        else: 
-            raise Exception(f"Failed to extract data from NBA API. Status Code: {response.status_code}. Response: {response.text}")
+        if game_date is not None:
+            params["date"] = str(game_date)
+        return await self._get(endpoint="games", params=params)
 
+    async def get_teams(self, league: str) -> list[dict]:
+        """Get the team data for an indicated league. See `NBAApiClient.get_teams`."""
+        params = {
+            "league": league
+        }
+        return await self._get(endpoint="teams", params=params, allow_empty=False)
 
+    async def get_players(self, season: int, team: int) -> list[dict]:
+        """Get the player data for an indicated season and team. See `NBAApiClient.get_players`."""
+        params = {
+            "season": season,
+            "team": team
+        }
+        return await self._get(endpoint="players", params=params)
 
+    async def get_player_statistics(self, season: int, team: int) -> list[dict]:
+        """Get the player statistics data for an indicated season and team. See `NBAApiClient.get_player_statistics`."""
+        params = {
+            "season": season,
+            "team": team
+        }
+        return await self._get(endpoint="players/statistics", params=params)
+
+    async def get_standings(self, league: str, season: int) -> list[dict]:
+        """Get the standings data for an indicated league and season year. See `NBAApiClient.get_standings`."""
+        params = {
+            "league": league,
+            "season": season
+        }
+        return await self._get(endpoint="standings", params=params)
@@ -1,17 +1,79 @@
-from sqlalchemy import create_engine, Table, MetaData
-from sqlalchemy.engine import URL, CursorResult
+from sqlalchemy import create_engine, Table, MetaData, Column, Integer, select, inspect, text, and_
+from sqlalchemy.engine import URL, CursorResult, Connection
 from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.schema import CreateIndex
+import pandas as pd
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+
+# engines shared by the clients of a process, by connection url, so every client reuses one connection pool
+_engines = {}
+# tables known to exist and already migrated by this process, by connection url
+_schema_caches = {}
+_engines_lock = threading.Lock()
+# pg8000 sends the number of bind parameters of a statement as a signed 16-bit integer
+MAX_STATEMENT_PARAMETERS = 32767
+
+def get_engine(connection_url: URL, **engine_options):
+    """
+    Return the engine of a connection url, creating it with `engine_options` (e.g. pool settings) on first use.
+    Later calls for the same url get the same engine, whatever their options.
+    """
+    key = connection_url.render_as_string(hide_password=False)
+    with _engines_lock:
+        if key not in _engines:
+            _engines[key] = create_engine(connection_url, **engine_options)
+            _schema_caches[key] = {"tables": set(), "partitions": set()}
+        return _engines[key]
+
+def _get_schema_cache(engine) -> dict:
+    with _engines_lock:
+        return _schema_caches[engine.url.render_as_string(hide_password=False)]
+
+def split_rows(rows: list[dict], table: Table) -> Iterator[list[dict]]:
+    """
+    Split a batch of rows into the largest slices a multi-row statement on `table` can send, 
+    one bind parameter per column and row staying within `MAX_STATEMENT_PARAMETERS`.
+    """
+    rows_per_statement = max(1, MAX_STATEMENT_PARAMETERS // max(1, len(table.columns)))
+    for start in range(0, len(rows), rows_per_statement):
+        yield rows[start:start + rows_per_statement]
+
+def dispose_engines() -> None:
+    """
+    Drop the pooled connections of every shared engine without closing them, 
+    e.g. in a forked process that must not use the connections of its parent.
+    """
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose(close=False)
 
 class PostgreSqlClient:
     """
     A client for querying postgresql database. 
+    Clients of the same database share one engine and connection pool, created with the pool settings of the first client.
+
+    Args:
+        pool_size: number of connections kept open in the pool
+        max_overflow: number of connections opened beyond `pool_size` under load, and closed when returned
+        pool_pre_ping: test connections when they are checked out, replacing the ones the server closed
+        pool_recycle: replace connections older than this many seconds, e.g. before a proxy or firewall drops them
+        connect_args: extra arguments of the pg8000 connections, e.g. `{"unix_sock": ".../.s.PGSQL.5432"}` to connect through a unix socket
     """
     def __init__(self, 
         server_name: str, 
         database_name: str, 
         username: str, 
         password: str, 
-        port: int = 5432
+        port: int = 5432,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        pool_pre_ping: bool = True,
+        pool_recycle: int = 1800,
+        connect_args: dict = None
     ):  
         self.host_name = server_name
         self.database_name = database_name
@@ -28,34 +90,332 @@ class PostgreSqlClient:
             database = database_name, 
         )
 
-        self.engine = create_engine(connection_url)
+        self.engine = get_engine(
+            connection_url,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_pre_ping=pool_pre_ping,
+            pool_recycle=pool_recycle,
+            connect_args=connect_args or {}
+        )
+        self._schema_cache = _get_schema_cache(self.engine)
+
+    @contextmanager
+    def begin(self, connection: Connection = None):
+        """
+        Begin a transaction on a pooled connection, committed when the `with` block exits without error. 
+        When `connection` is given, its transaction is joined instead, e.g. to load a table and its row hashes together.
+        """
+        if connection is not None:
+            yield connection
+        else:
+            with self.engine.begin() as connection:
+                yield connection
+
+    def has_table(self, table: Table) -> bool:
+        """Return whether a table exists. Tables found or created once are not looked up again by this process."""
+        if table.fullname in self._schema_cache["tables"]:
+            return True
+        if not inspect(self.engine).has_table(table.name, schema=table.schema):
+            return False
+        self._schema_cache["tables"].add(table.fullname)
+        return True
 
     def select_all(self, table: Table)-> list[dict]:
-        return [dict(row) for row in self.engine.execute(table.select()).all()]
+        with self.engine.connect() as connection:
+            return [dict(row) for row in connection.execute(table.select()).all()]
 
-    def create_table(self, metadata: MetaData) -> None:
+    def create_table(self, metadata: MetaData, seasons: list[int] = None) -> None:
         """
-        Creates table provided in the metadata object
+        Creates table provided in the metadata object, and migrates the tables that already exist: 
+        the columns, indexes and primary key they do not have yet are added. 
+        Tables partitioned by season (see `etl_project.assets.schema`) get a partition for each of `seasons`.
+        Idempotent. Call it once per run before loading, the load methods do not create tables.
+        Tables already created or migrated by this process are skipped, without a catalog lookup.
+
+        Raises:
+            Exception if a table declared as partitioned exists as a plain table, which cannot be converted in place
+        """
+        new_tables = [table for table in metadata.sorted_tables if table.fullname not in self._schema_cache["tables"]]
+        if new_tables:
+            metadata.create_all(self.engine, tables=new_tables)
+        for table in new_tables:
+            self.add_missing_columns(table=table)
+            self.add_missing_indexes(table=table)
+            self.add_missing_primary_key(table=table)
+            self._schema_cache["tables"].add(table.fullname)
+        for table in metadata.sorted_tables:
+            if table.dialect_options["postgresql"]["partition_by"]:
+                self.create_partitions(table=table, seasons=seasons or [])
+
+    def add_missing_indexes(self, table: Table) -> None:
+        """Create the indexes declared on `table` that the database table does not have yet"""
+        existing_indexes = {index["name"] for index in inspect(self.engine).get_indexes(table.name, schema=table.schema)}
+        with self.engine.begin() as connection:
+            for index in table.indexes:
+                if index.name in existing_indexes:
+                    continue
+                create_index = str(CreateIndex(index).compile(dialect=self.engine.dialect))
+                connection.execute(text(create_index.replace("CREATE INDEX ", "CREATE INDEX IF NOT EXISTS ", 1)))
+
+    def add_missing_primary_key(self, table: Table) -> None:
+        """
+        Add the primary key declared on `table` when the database table has none, e.g. a table created before it was declared.
+        Tables declared with `info={"rebuilt_on_load": True}`, whose rows are all replaced by their next load, 
+        are first reduced to one row per key, dropping the rows with a null key.
+
+        Raises:
+            Exception if the table holds rows with duplicate keys, or has a primary key on other columns 
+            (e.g. a table created with a different partitioning by season), which upserts could not use
+        """
+        key_columns = [column.name for column in table.primary_key.columns]
+        existing_key_columns = inspect(self.engine).get_pk_constraint(table.name, schema=table.schema)["constrained_columns"]
+        if existing_key_columns and key_columns and set(existing_key_columns) != set(key_columns):
+            raise Exception(f"Table {table.name} has the primary key ({', '.join(existing_key_columns)}) instead of ({', '.join(key_columns)})")
+        if not key_columns or existing_key_columns:
+            return
+        preparer = self.engine.dialect.identifier_preparer
+        table_name = preparer.format_table(table)
+        quoted_key_columns = [preparer.quote(name) for name in key_columns]
+        try:
+            with self.engine.begin() as connection:
+                if table.info.get("rebuilt_on_load"):
+                    connection.execute(text(f"DELETE FROM {table_name} WHERE {' OR '.join(f'{name} IS NULL' for name in quoted_key_columns)}"))
+                    connection.execute(text(
+                        f"DELETE FROM {table_name} AS duplicate USING {table_name} AS kept "
+                        f"WHERE duplicate.ctid > kept.ctid AND {' AND '.join(f'duplicate.{name} = kept.{name}' for name in quoted_key_columns)}"
+                    ))
+                connection.execute(text(f"ALTER TABLE {table_name} ADD PRIMARY KEY ({', '.join(quoted_key_columns)})"))
+        except IntegrityError as e:
+            raise Exception(f"Cannot add the primary key ({', '.join(key_columns)}) of table {table.name}, it holds duplicate rows") from e
+
+    def create_partitions(self, table: Table, seasons: list[int]) -> None:
         """
-        metadata.create_all(self.engine)
+        Create the partition of each season of a table partitioned by `LIST (season)`, named `<table>_<season>`.
+
+        Raises:
+            Exception if the table exists as a plain table
+        """
+        seasons = [int(season) for season in seasons if (table.fullname, int(season)) not in self._schema_cache["partitions"]]
+        if not seasons:
+            return
+        preparer = self.engine.dialect.identifier_preparer
+        schema_prefix = f"{preparer.quote_schema(table.schema)}." if table.schema else ""
+        with self.engine.begin() as connection:
+            is_partitioned = connection.execute(
+                text("select exists (select 1 from pg_partitioned_table where partrelid = to_regclass(:table_name))"),
+                {"table_name": table.fullname}
+            ).scalar()
+            if not is_partitioned:
+                raise Exception(f"Table {table.fullname} exists and is not partitioned by season. Recreate it, or disable the partitioning by season.")
+            for season in seasons:
+                connection.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {schema_prefix}{preparer.quote(f'{table.name}_{season}')} "
+                    f"PARTITION OF {preparer.format_table(table)} FOR VALUES IN ({season})"
+                ))
+        self._schema_cache["partitions"].update((table.fullname, season) for season in seasons)
     
+    def add_missing_columns(self, table: Table) -> list[str]:
+        """
+        Add the columns of `table` that the database table does not have yet, e.g. columns introduced after it was created.
+
+        Returns:
+            The names of the added columns
+        """
+        existing_columns = {column["name"] for column in inspect(self.engine).get_columns(table.name, schema=table.schema)}
+        missing_columns = [column for column in table.columns if column.name not in existing_columns]
+        preparer = self.engine.dialect.identifier_preparer
+        with self.engine.begin() as connection:
+            for column in missing_columns:
+                connection.execute(text(
+                    f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN IF NOT EXISTS {preparer.quote(column.name)} {column.type.compile(dialect=self.engine.dialect)}"
+                ))
+        return [column.name for column in missing_columns]
+
     def drop_table(self, table_name: str) -> None: 
-        self.engine.execute(f"drop table if exists {table_name};")
+        with self.engine.begin() as connection:
+            connection.execute(text(f"drop table if exists {table_name};"))
+        self._schema_cache["tables"].discard(table_name)
+        self._schema_cache["partitions"] = {partition for partition in self._schema_cache["partitions"] if partition[0] != table_name}
     
-    def insert(self, data: list[dict], table: Table, metadata: MetaData) -> None:
-        metadata.create_all(self.engine)
-        insert_statement = postgresql.insert(table).values(data)
-        self.engine.execute(insert_statement)
+    def insert(self, data: list[dict], table: Table, metadata: MetaData, connection: Connection = None) -> None:
+        self.insert_chunks(chunks=[data], table=table, metadata=metadata, connection=connection)
     
     def overwrite(self, data: list[dict], table: Table, metadata: MetaData) -> None: 
-        self.drop_table(table.name)
-        self.insert(data=data, table=table, metadata=metadata)
+        self.overwrite_chunks(chunks=[data], table=table, metadata=metadata)
+
+    def upsert(self, data: list[dict], table: Table, metadata: MetaData, connection: Connection = None) -> None:
+        self.upsert_chunks(chunks=[data], table=table, metadata=metadata, connection=connection)
 
-    def upsert(self, data: list[dict], table: Table, metadata: MetaData) -> None:
-        metadata.create_all(self.engine)
+    def _upsert_statement(self, data: list[dict], table: Table):
         key_columns = [pk_column.name for pk_column in table.primary_key.columns.values()]
         insert_statement = postgresql.insert(table).values(data)
-        upsert_statement = insert_statement.on_conflict_do_update(
+        return insert_statement.on_conflict_do_update(
             index_elements=key_columns,
             set_={c.key: c for c in insert_statement.excluded if c.key not in key_columns})
-        self.engine.execute(upsert_statement)
+
+    def insert_chunks(self, chunks: Iterable[list[dict]], table: Table, metadata: MetaData, connection: Connection = None) -> int:
+        """
+        Insert batches of rows with multi-row INSERTs, a batch split across statements when it exceeds the driver's parameter limit. 
+        All batches are sent inside a single transaction (the transaction of `connection` when given), 
+        so a failing batch rolls back the whole table load. 
+
+        Returns:
+            The number of rows inserted
+        """
+        rows = 0
+        with self.begin(connection) as connection:
+            for chunk in chunks:
+                for rows_slice in split_rows(rows=chunk, table=table):
+                    connection.execute(postgresql.insert(table).values(rows_slice))
+                rows += len(chunk)
+        return rows
+
+    def upsert_chunks(self, chunks: Iterable[list[dict]], table: Table, metadata: MetaData, connection: Connection = None) -> int:
+        """
+        Upsert batches of rows with multi-row INSERT ... ON CONFLICT statements, a batch split across statements when it exceeds the driver's parameter limit. 
+        All batches are sent inside a single transaction (the transaction of `connection` when given), 
+        so a failing batch rolls back the whole table load. 
+
+        Returns:
+            The number of rows upserted
+        """
+        rows = 0
+        with self.begin(connection) as connection:
+            for chunk in chunks:
+                for rows_slice in split_rows(rows=chunk, table=table):
+                    connection.execute(self._upsert_statement(data=rows_slice, table=table))
+                rows += len(chunk)
+        return rows
+
+    def replace_chunks(self, chunks: Iterable[list[dict]], table: Table, metadata: MetaData, where: dict, connection: Connection = None) -> int:
+        """
+        Replace the rows matching `where` (column name -> value) by batches of rows, in a single transaction 
+        (the transaction of `connection` when given). 
+        Readers keep seeing the previous rows until the transaction commits, and rows outside `where` are left untouched.
+
+        Returns:
+            The number of rows inserted
+        """
+        rows = 0
+        with self.begin(connection) as connection:
+            connection.execute(table.delete().where(and_(*[table.c[column] == value for column, value in where.items()])))
+            for chunk in chunks:
+                for rows_slice in split_rows(rows=chunk, table=table):
+                    connection.execute(postgresql.insert(table).values(rows_slice))
+                rows += len(chunk)
+        return rows
+
+    def overwrite_chunks(self, chunks: Iterable[list[dict]], table: Table, metadata: MetaData) -> int:
+        """
+        Replace the contents of a table without readers ever seeing it empty or partially loaded. 
+        The rows are loaded into a shadow table which is then renamed into place in a single transaction, 
+        carrying over the indexes declared on the table and the grants of the table it replaces.
+
+        Returns:
+            The number of rows loaded
+
+        Raises:
+            Exception if the table is partitioned by season, its shadow would have no partitions to load into
+        """
+        if table.dialect_options["postgresql"]["partition_by"]:
+            raise Exception(f"Table {table.fullname} is partitioned by season and cannot be overwritten. Load it with `upsert` or `replace` instead.")
+        shadow_table = self._shadow_table(table)
+        shadow_table.drop(self.engine, checkfirst=True)
+        shadow_table.create(self.engine)
+        rows = self.insert_chunks(chunks=chunks, table=shadow_table, metadata=shadow_table.metadata)
+        self._swap_tables(table=table, shadow_table=shadow_table)
+        return rows
+
+    @staticmethod
+    def _shadow_table(table: Table) -> Table:
+        """Copy a table definition under a shadow name, with index names that do not clash with the live table"""
+        shadow_table = table.to_metadata(MetaData(), name=f"{table.name}__shadow")
+        for index in shadow_table.indexes:
+            index.name = f"{index.name}__shadow"
+        if shadow_table.primary_key.name is not None:
+            shadow_table.primary_key.name = f"{shadow_table.primary_key.name}__shadow"
+        return shadow_table
+
+    def _swap_tables(self, table: Table, shadow_table: Table, lock_timeout: str = "10s") -> None:
+        """Atomically replace `table` by `shadow_table`, carrying over grants and restoring the canonical index names"""
+        preparer = self.engine.dialect.identifier_preparer
+        schema_prefix = f"{preparer.quote_schema(table.schema)}." if table.schema else ""
+        old_table_name = f"{table.name}__old"
+
+        index_renames = [(f"{index.name}__shadow", index.name) for index in table.indexes if index.name]
+        if table.primary_key.name is not None:
+            index_renames.append((f"{table.primary_key.name}__shadow", table.primary_key.name))
+        elif len(table.primary_key.columns) > 0:
+            index_renames.append((f"{shadow_table.name}_pkey", f"{table.name}_pkey"))
+
+        with self.engine.begin() as connection:
+            connection.execute(text(f"SET LOCAL lock_timeout = '{lock_timeout}'"))
+            if inspect(connection).has_table(table.name, schema=table.schema):
+                grants = connection.execute(
+                    text(
+                        "select grantee, privilege_type from information_schema.role_table_grants "
+                        "where table_schema = coalesce(:schema, current_schema()) and table_name = :table_name "
+                        "and grantee <> current_user"
+                    ),
+                    {"schema": table.schema, "table_name": table.name}
+                ).all()
+                for grantee, privilege_type in grants:
+                    grantee = grantee if grantee == "PUBLIC" else preparer.quote(grantee)
+                    connection.execute(text(f"GRANT {privilege_type} ON {preparer.format_table(shadow_table)} TO {grantee}"))
+                connection.execute(text(f"ALTER TABLE {preparer.format_table(table)} RENAME TO {preparer.quote(old_table_name)}"))
+                connection.execute(text(f"DROP TABLE {schema_prefix}{preparer.quote(old_table_name)}"))
+            connection.execute(text(f"ALTER TABLE {preparer.format_table(shadow_table)} RENAME TO {preparer.quote(table.name)}"))
+            for shadow_index_name, index_name in index_renames:
+                connection.execute(text(f"ALTER INDEX {schema_prefix}{preparer.quote(shadow_index_name)} RENAME TO {preparer.quote(index_name)}"))
+
+    def bulk_upsert(self, df: pd.DataFrame, table: Table, metadata: MetaData, chunksize: int = 10000, connection: Connection = None) -> None:
+        """
+        Stream a dataframe into a temporary staging table with `COPY FROM STDIN` and merge it 
+        into `table` server-side with `INSERT ... ON CONFLICT DO UPDATE`. 
+        Tables without a primary key are appended to. 
+
+        Args:
+            df: dataframe holding (at least) the columns of the table
+            table: sqlalchemy table
+            metadata: sqlalchemy metadata
+            chunksize: number of rows rendered to csv at a time while streaming
+            connection: join the transaction of this connection instead of beginning one
+        """
+        column_names = [column.name for column in table.columns]
+        df = df[column_names].copy()
+        for column in table.columns:
+            # floats holding whole numbers (e.g. ids with missing values) are rendered as "1.0", which COPY rejects for integer columns
+            if isinstance(column.type, Integer) and pd.api.types.is_float_dtype(df[column.name]):
+                df[column.name] = df[column.name].astype("Int64")
+
+        staging_table = Table(
+            f"{table.name}_staging_{uuid.uuid4().hex[:8]}",
+            MetaData(),
+            *[Column(column.name, column.type) for column in table.columns],
+            prefixes=["TEMPORARY"],
+            postgresql_on_commit="DROP"
+        )
+        preparer = self.engine.dialect.identifier_preparer
+        copy_statement = (
+            f"COPY {preparer.format_table(staging_table)} "
+            f"({', '.join(preparer.quote(name) for name in column_names)}) "
+            "FROM STDIN WITH (FORMAT csv)"
+        )
+        csv_chunks = (
+            df.iloc[start:start + chunksize].to_csv(index=False, header=False)
+            for start in range(0, len(df), chunksize)
+        )
+
+        key_columns = [pk_column.name for pk_column in table.primary_key.columns.values()]
+        merge_statement = postgresql.insert(table).from_select(column_names, select(staging_table))
+        if key_columns:
+            merge_statement = merge_statement.on_conflict_do_update(
+                index_elements=key_columns,
+                set_={c.key: c for c in merge_statement.excluded if c.key not in key_columns})
+
+        with self.begin(connection) as connection:
+            staging_table.create(connection)
+            cursor = connection.connection.cursor()
+            cursor.execute(copy_statement, stream=csv_chunks)
+            connection.execute(merge_statement)
@@ -0,0 +1,118 @@
+import multiprocessing
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucketRateLimiter:
+    """
+    A thread-safe token bucket used to pace requests to the NBA API.
+
+    The bucket starts with a conservative rate and adjusts itself from the rate limit headers
+    returned by api-sports (`X-RateLimit-Limit` and `X-RateLimit-Remaining` are per minute),
+    so requests are issued as fast as the current subscription allows without being throttled.
+    """
+    LIMIT_HEADER = "X-RateLimit-Limit"
+    REMAINING_HEADER = "X-RateLimit-Remaining"
+
+    def __init__(self, requests_per_minute: int = 10, period_seconds: float = 60.0):
+        self.period_seconds = period_seconds
+        self.capacity = float(requests_per_minute)
+        self.tokens = float(requests_per_minute)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        """Tokens added to the bucket per second"""
+        return self.capacity / self.period_seconds
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self) -> float:
+        """
+        Take a token from the bucket.
+
+        Returns:
+            The number of seconds the caller has to wait before sending its request
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def acquire(self) -> None:
+        """Block until a request may be sent"""
+        wait_seconds = self.reserve()
+        if wait_seconds > 0:
+            time.sleep(wait_seconds)
+
+    def update_from_headers(self, headers: dict) -> None:
+        """
+        Synchronise the bucket with the rate limit headers of a response.
+
+        Args:
+            headers: the response headers
+        """
+        limit = _parse_int(headers.get(self.LIMIT_HEADER))
+        remaining = _parse_int(headers.get(self.REMAINING_HEADER))
+        with self._lock:
+            self._refill(time.monotonic())
+            if limit is not None and limit > 0:
+                self.capacity = float(limit)
+            if remaining is not None:
+                self.tokens = min(self.tokens, float(remaining))
+
+    def throttle(self) -> None:
+        """Empty the bucket after the API reported that the rate limit was exceeded"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, 0.0)
+
+
+def _parse_int(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class SharedTokenBucketRateLimiter(TokenBucketRateLimiter):
+    """
+    A token bucket whose state lives in shared memory, so that several processes 
+    (e.g. the workers of a backfill) draw from a single API rate limit. 
+    Pass it to the worker processes when they are created, e.g. through a pool initializer.
+    """
+    def __init__(self, requests_per_minute: int = 10, period_seconds: float = 60.0):
+        self.period_seconds = period_seconds
+        # capacity, tokens, updated_at. time.monotonic is system-wide so it can be compared across processes.
+        self._state = multiprocessing.Array("d", [float(requests_per_minute), float(requests_per_minute), time.monotonic()])
+        self._lock = self._state.get_lock()
+
+    @property
+    def capacity(self) -> float:
+        return self._state[0]
+
+    @capacity.setter
+    def capacity(self, value: float) -> None:
+        self._state[0] = value
+
+    @property
+    def tokens(self) -> float:
+        return self._state[1]
+
+    @tokens.setter
+    def tokens(self, value: float) -> None:
+        self._state[1] = value
+
+    @property
+    def updated_at(self) -> float:
+        return self._state[2]
+
+    @updated_at.setter
+    def updated_at(self, value: float) -> None:
+        self._state[2] = value
@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+
+class ResponseCache:
+    """
+    An on-disk cache of NBA API responses.
+
+    Entries are keyed by endpoint and query parameters and stored as one json file each.
+    Every cache key has a time to live, looked up by the `ttl_key` given by the caller
+    (usually the endpoint name). Stale entries are kept so they can be revalidated with
+    `If-None-Match` / `If-Modified-Since` when the API returned validators for them.
+    The number of entries is capped, evicting the least recently used entries first. The entries are counted in memory,
+    the folder is only scanned when the cap is exceeded and then trimmed by a tenth so the next writes do not scan again.
+    """
+    def __init__(
+            self,
+            cache_folder_path: str,
+            ttl_seconds: dict = None,
+            default_ttl_seconds: float = 3600,
+            max_entries: int = 1000
+        ):
+        self.cache_folder_path = Path(cache_folder_path)
+        self.cache_folder_path.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds or {}
+        self.default_ttl_seconds = default_ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self._lock = threading.Lock()
+        self._keys = {path.stem for path in self.cache_folder_path.glob("*.json")}
+
+    @staticmethod
+    def make_key(endpoint: str, params: dict) -> str:
+        """Create a stable key from an endpoint and its query parameters"""
+        raw = json.dumps({"endpoint": endpoint, "params": params}, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_folder_path / f"{key}.json"
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Read an entry from the cache and mark it as recently used.
+
+        Returns:
+            The entry with keys `data`, `etag`, `last_modified`, `ttl_key` and `stored_at`, or None if the key is not cached
+        """
+        path = self._path(key)
+        with self._lock:
+            try:
+                with open(path, "r") as file:
+                    entry = json.load(file)
+                os.utime(path)
+            except FileNotFoundError:
+                # e.g. evicted by another process sharing the folder
+                self._keys.discard(key)
+                return None
+            except ValueError:
+                return None
+        return entry
+
+    def is_fresh(self, entry: dict) -> bool:
+        """Whether an entry is younger than the time to live of its ttl key"""
+        ttl = self.ttl_seconds.get(entry.get("ttl_key"), self.default_ttl_seconds)
+        if ttl is None:
+            return True
+        return time.time() - entry["stored_at"] < ttl
+
+    def set(self, key: str, data: list, ttl_key: str, etag: str = None, last_modified: str = None) -> None:
+        """Write an entry to the cache, evicting the least recently used entries if the cache is full"""
+        entry = {
+            "data": data,
+            "ttl_key": ttl_key,
+            "etag": etag,
+            "last_modified": last_modified,
+            "stored_at": time.time()
+        }
+        path = self._path(key)
+        temp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with self._lock:
+            with open(temp_path, "w") as file:
+                json.dump(entry, file)
+            os.replace(temp_path, path)
+            self._keys.add(key)
+            if len(self._keys) > self.max_entries:
+                self._evict()
+
+    def refresh(self, key: str, entry: dict) -> None:
+        """Restart the time to live of an entry that the API confirmed is unchanged"""
+        self.set(key=key, data=entry["data"], ttl_key=entry["ttl_key"], etag=entry["etag"], last_modified=entry["last_modified"])
+
+    def _evict(self) -> None:
+        paths = list(self.cache_folder_path.glob("*.json"))
+        # the folder may be shared with other processes, recount from its contents
+        target_entries = self.max_entries - self.max_entries // 10
+        if len(paths) > target_entries:
+            paths.sort(key=lambda path: path.stat().st_mtime)
+            for path in paths[:len(paths) - target_entries]:
+                path.unlink(missing_ok=True)
+            paths = paths[len(paths) - target_entries:]
+        self._keys = {path.stem for path in paths}
+
+    def record(self, hit: bool = False, miss: bool = False, revalidation: bool = False) -> None:
+        """Increment the hit/miss/revalidation counters"""
+        with self._lock:
+            self.hits += int(hit)
+            self.misses += int(miss)
+            self.revalidations += int(revalidation)
+
+    def stats(self) -> dict:
+        """Return the hit/miss/revalidation counters"""
+        return {"hits": self.hits, "misses": self.misses, "revalidations": self.revalidations}
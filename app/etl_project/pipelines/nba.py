@@ -1,173 +1,498 @@
 from dotenv import load_dotenv
-import os 
-from etl_project.assets.nba import calculate_age, extract_teams_in_league, extract_standings, extract_games, extract_players, extract_player_statistics, \
-    get_loser_id, get_winner_id, transform_games, transform_standings, transform_player_statistics, load
-from etl_project.connectors.nba_api import NBAApiClient
-from etl_project.connectors.postgresql import PostgreSqlClient
-from sqlalchemy import Table, Column, Integer, String, MetaData, Float, Date
+import os
+from datetime import timedelta
+from etl_project.assets.nba import TeamDirectory, calculate_age, extract_teams_in_league, extract_standings, extract_games, extract_players, extract_player_statistics, \
+    iter_player_statistics, aggregate_player_statistics, get_loser_id, get_winner_id, get_games_watermark, transform_games, transform_standings, \
+    transform_player_statistics, transform_team_form, transform_team_season_summary, transform_player_season_summary, read_games, load, \
+    extract_season_async, REQUIRED_COLUMNS, EXTRACT_DTYPES
+from etl_project.assets.dtypes import apply_dtypes
+from etl_project.assets.landing_zone import LandingZone
+from etl_project.assets.schema import create_tables
+from etl_project.assets.watermark import Watermark
+from etl_project.assets.change_detection import RowHashStore
+from etl_project.assets.checkpoint import Checkpoint
+from etl_project.assets.backfill import expand_units, run_units
+from etl_project.assets.dag import Task, DagRunner, resume_tasks
+from etl_project.assets.metrics import StageMetrics
+from etl_project.connectors.nba_api import NBAApiClient, AsyncNBAApiClient
+from etl_project.connectors.response_cache import ResponseCache
+from etl_project.connectors.rate_limiter import TokenBucketRateLimiter, SharedTokenBucketRateLimiter
+from etl_project.connectors.postgresql import PostgreSqlClient, dispose_engines
+from sqlalchemy import MetaData
 from etl_project.assets.pipeline_logging import PipelineLogging
 from etl_project.assets.metadata_logging import MetaDataLogging, MetaDataLoggingStatus
 import logging
+import asyncio
+import pandas as pd
+import time
 import yaml
 from pathlib import Path
 from sqlalchemy.exc import SQLAlchemyError
 
-if __name__ == "__main__":
-    #pipeline_logging = PipelineLogging(pipeline_name="nba", log_folder_path="etl_project/logs")
-    load_dotenv()
+# endpoint landed by each extract task
+EXTRACT_TASK_ENDPOINTS = {
+    "extract_games": "games",
+    "extract_players": "players",
+    "extract_player_statistics": "players_statistics",
+    "extract_standings": "standings"
+}
 
-    # Get config variables
-    yaml_file_path = __file__.replace(".py", ".yaml")
+def get_pipeline_config(yaml_file_path: str) -> dict:
+    """Read the pipeline yaml file"""
     if Path(yaml_file_path).exists():
         with open(yaml_file_path) as yaml_file:
-            pipeline_config = yaml.safe_load(yaml_file)
-            config = pipeline_config.get("config")
-            PIPELINE_NAME = pipeline_config.get("name")
+            return yaml.safe_load(yaml_file)
     else:
         raise Exception(f"Missing {yaml_file_path} file! Please create the yaml file with at least a `name` key for the pipeline name.")
 
-    pipeline_logging = PipelineLogging(pipeline_name=pipeline_config.get("name"), log_folder_path=config.get("log_folder_path"))
-    
-    # set up environment variables
-    LOGGING_SERVER_NAME = os.environ.get("LOGGING_SERVER_NAME")
-    LOGGING_DATABASE_NAME = os.environ.get("LOGGING_DATABASE_NAME")
-    LOGGING_USERNAME = os.environ.get("LOGGING_USERNAME")
-    LOGGING_PASSWORD = os.environ.get("LOGGING_PASSWORD")
-    LOGGING_PORT = os.environ.get("LOGGING_PORT")
-
-    postgresql_logging_client = PostgreSqlClient(
-        server_name=LOGGING_SERVER_NAME,
-        database_name=LOGGING_DATABASE_NAME,
-        username=LOGGING_USERNAME,
-        password=LOGGING_PASSWORD,
-        port=LOGGING_PORT
+def create_logging_postgresql_client(config: dict = {}) -> PostgreSqlClient:
+    """
+    Clients of the same database share one connection pool, so a logging database that is the data database 
+    (same server, port, database and credentials) is written through the pool of the data client.
+    """
+    return PostgreSqlClient(
+        server_name=os.environ.get("LOGGING_SERVER_NAME"),
+        database_name=os.environ.get("LOGGING_DATABASE_NAME"),
+        username=os.environ.get("LOGGING_USERNAME"),
+        password=os.environ.get("LOGGING_PASSWORD"),
+        port=os.environ.get("LOGGING_PORT"),
+        **config.get("postgresql_pool", {})
     )
 
-    metadata_logger = MetaDataLogging(
-        pipeline_name=PIPELINE_NAME, 
-        postgresql_client=postgresql_logging_client,
-        config=pipeline_config.get("config")
+def create_postgresql_client(config: dict = {}) -> PostgreSqlClient:
+    return PostgreSqlClient(
+        server_name=os.environ.get("SERVER_NAME"),
+        database_name=os.environ.get("DATABASE_NAME"),
+        username=os.environ.get("DB_USERNAME"),
+        password=os.environ.get("DB_PASSWORD"),
+        port=os.environ.get("PORT"),
+        **config.get("postgresql_pool", {})
     )
 
-    pipeline_logging.logger.info("Starting pipeline run")
-    try:
-        metadata_logger.log() #log start
-        pipeline_logging.logger.info("Getting pipeline environment variables")
-        API_KEY = os.environ.get("API_KEY")
-        DB_USERNAME = os.environ.get("DB_USERNAME")
-        DB_PASSWORD = os.environ.get("DB_PASSWORD")
-        SERVER_NAME = os.environ.get("SERVER_NAME")
-        DATABASE_NAME = os.environ.get("DATABASE_NAME")
-        PORT = os.environ.get("PORT")
-        
-        # Creating NBA API client
-        pipeline_logging.logger.info("Creating NBA API client")
-        nba_api_client = NBAApiClient(api_key=API_KEY)
-        
-        # Extracting data
-        pipeline_logging.logger.info("Extracting data from NBA API client")
-        pipeline_logging.logger.info("Extracting games data from NBA API client")
-        df_games = extract_games(nba_api_client=nba_api_client, league=config.get("league"), season=config.get("season"))
-        pipeline_logging.logger.info("Extracting players data from NBA API client")
-        df_players = extract_players(nba_api_client=nba_api_client, league=config.get("league"), season=config.get("season"))
-        pipeline_logging.logger.info("Extracting players statistics data from NBA API client")
-        df_players_statistics = extract_player_statistics(nba_api_client=nba_api_client, league=config.get("league"), season=config.get("season"))
-        pipeline_logging.logger.info("Extracting standings data from NBA API client")
-        df_standings = extract_standings(nba_api_client=nba_api_client, league=config.get("league"), season=config.get("season"))
-
-        # Transforming data
-        pipeline_logging.logger.info("Transforming games df")
-        df_games_transformed = transform_games(df_games=df_games)
-        pipeline_logging.logger.info("Transforming players statistics")
-        df_players_statistics_transformed = transform_player_statistics(df_players=df_players, df_players_statistics=df_players_statistics)
-        pipeline_logging.logger.info("Transforming standings")
-        df_standings_transformed = transform_standings(df_standings=df_standings)
-        
-        pipeline_logging.logger.info("Loading data to postgres")
-        postgresql_client = PostgreSqlClient(
-            server_name=SERVER_NAME,
-            database_name=DATABASE_NAME,
-            username=DB_USERNAME,
-            password=DB_PASSWORD,
-            port=PORT
-        )
-        
-        pipeline_logging.logger.info("Loading games data to postgres")
-        metadata = MetaData()
-        table_games = Table(
-            "games", metadata, 
-            Column("game_id", Integer, primary_key=True),
-            Column("league", String),
-            Column("season", Integer),
-            Column("date", Date),
-            Column("home_team_id", Integer),
-            Column("home_team_name", String),
-            Column("home_team_score", Float),
-            Column("away_team_id", Integer),
-            Column("away_team_name", String),
-            Column("away_team_score", Float),
-            Column("winner_team_id", Integer),
-            Column("loser_team_id", Integer)
-        )
-        load(
-            df=df_games_transformed,
-            postgresql_client=postgresql_client, 
-            table=table_games, 
+def create_nba_api_client(config: dict, rate_limiter: TokenBucketRateLimiter = None) -> NBAApiClient:
+    response_cache = None
+    if config.get("response_cache") is not None:
+        response_cache = ResponseCache(**config.get("response_cache"))
+    return NBAApiClient(api_key=os.environ.get("API_KEY"), response_cache=response_cache, rate_limiter=rate_limiter)
+
+def create_async_nba_api_client(config: dict, nba_api_client: NBAApiClient) -> AsyncNBAApiClient:
+    """Async client sharing the rate limiter and response cache of `nba_api_client`"""
+    return AsyncNBAApiClient(
+        api_key=nba_api_client.api_key,
+        max_concurrency=config.get("max_workers", 1),
+        http2=config.get("http2", False),
+        rate_limiter=nba_api_client.rate_limiter,
+        response_cache=nba_api_client.response_cache,
+        base_url=nba_api_client.base_url
+    )
+
+def run_pipeline(
+        pipeline_name: str,
+        config: dict,
+        league: str,
+        season: int,
+        pipeline_logging: PipelineLogging,
+        postgresql_logging_client: PostgreSqlClient,
+        nba_api_client: NBAApiClient,
+        team_directory: TeamDirectory,
+        run_id=None
+    ) -> dict:
+    """
+    Extract, transform and load one league and season. 
+    The steps run as a DAG so that the games, standings and player statistics branches overlap.
+
+    Raw extracts are landed as Parquet under `landing_folder_path` when it is configured. 
+    With `replay` enabled, the extracts are read back from the landing zone instead of the API 
+    (from the run `replay_run_id`, or the latest landed run).
+    With `async_extraction` enabled, the four extracts are requested concurrently in one event loop by an `AsyncNBAApiClient`.
+
+    With `resume` enabled, completed loads, and extracts once landed, are checkpointed under `run_id`. A run with the 
+    run id of an earlier attempt (a retry, or the rerun of a failed run) reads the landed extracts back and returns the 
+    recorded metrics of the completed loads instead of running them again. Transforms are always run again.
+
+    Every task is measured (wall time, API requests and bytes, rows in/out, peak RSS). The measures are written 
+    in the Prometheus text format to `prometheus_folder_path` when it is configured.
+
+    Returns:
+        The load metrics of each table, the memory usage of each frame and the metrics of each task (under `stages`)
+    """
+    postgresql_client = create_postgresql_client(config=config)
+    row_hash_store = RowHashStore(postgresql_client=postgresql_client)
+    metadata = MetaData()
+    tables = create_tables(metadata=metadata, partition_by_season=config.get("partition_by_season", False))
+    # create and migrate the tables up front, the loads do not create them
+    postgresql_client.create_table(metadata=metadata, seasons=[season])
+    landing_zone = None
+    if config.get("landing_folder_path") is not None:
+        landing_zone = LandingZone(landing_folder_path=config.get("landing_folder_path"), run_id=run_id)
+    replay = config.get("replay", False)
+    if replay and landing_zone is None:
+        raise Exception("Replay requires a landing_folder_path")
+    games_watermark = None
+    if config.get("incremental") and not replay:
+        games_watermark = Watermark(pipeline_name=pipeline_name, postgresql_client=postgresql_logging_client)
+    checkpoint = None
+    completed_steps = {}
+    if config.get("resume"):
+        checkpoint = Checkpoint(postgresql_client=postgresql_logging_client)
+        completed_steps = checkpoint.get(run_id=run_id)
+    # extracts are only checkpointed when they are landed, so that a resumed run can read them back
+    checkpoint_extracts = landing_zone is not None and not replay
+    resumed_extracts = {step for step in EXTRACT_TASK_ENDPOINTS if step in completed_steps and checkpoint_extracts}
+
+    async_extraction = config.get("async_extraction", False) and not replay
+    # the streaming extract summarizes the player statistics by game as they arrive
+    stream_player_statistics = config.get("stream_player_statistics") and not replay and not async_extraction \
+        and "extract_player_statistics" not in resumed_extracts
+
+    def get_games_since():
+        games_since = None
+        if games_watermark is not None:
+            games_since = games_watermark.get(league=league, season=season)
+            pipeline_logging.logger.info(f"Extracting games played on or after {games_since}" if games_since else "No games watermark found, extracting the full season")
+        return games_since
+
+    def extract_games_task():
+        return extract_games(nba_api_client=nba_api_client, league=league, season=season, since=get_games_since(), landing_zone=landing_zone)
+
+    def extract_async_task():
+        async def extract_season():
+            async with create_async_nba_api_client(config=config, nba_api_client=nba_api_client) as async_nba_api_client:
+                return await extract_season_async(
+                    nba_api_client=async_nba_api_client,
+                    league=league,
+                    season=season,
+                    teams=team_directory.get_team_ids(league),
+                    games_since=get_games_since(),
+                    landing_zone=landing_zone,
+                    endpoints=[endpoint for step, endpoint in EXTRACT_TASK_ENDPOINTS.items() if step not in resumed_extracts]
+                )
+        return asyncio.run(extract_season())
+
+    def extract_player_statistics_task():
+        if stream_player_statistics:
+            return aggregate_player_statistics(batches=iter_player_statistics(nba_api_client=nba_api_client, league=league, season=season, max_workers=config.get("max_workers", 1), team_directory=team_directory, landing_zone=landing_zone))
+        return extract_player_statistics(nba_api_client=nba_api_client, league=league, season=season, max_workers=config.get("max_workers", 1), team_directory=team_directory, landing_zone=landing_zone)
+
+    def transform_player_statistics_task(extract_players, extract_player_statistics):
+        if stream_player_statistics:
+            return transform_player_statistics(df_players=extract_players, df_player_statistics_summary=extract_player_statistics)
+        return transform_player_statistics(df_players=extract_players, df_players_statistics=extract_player_statistics)
+
+    def replay_task(endpoint: str, landed_run_id=None):
+        def read_landed_extract():
+            pipeline_logging.logger.info(f"Replaying landed {endpoint} extract")
+            df = landing_zone.read(
+                league=league,
+                season=season,
+                endpoint=endpoint,
+                run_id=landed_run_id if landed_run_id is not None else config.get("replay_run_id"),
+                columns=REQUIRED_COLUMNS[endpoint]
+            )
+            return apply_dtypes(df=df, dtypes=EXTRACT_DTYPES[endpoint])
+        return read_landed_extract
+
+    def load_games_task(transform_games, extract_games):
+        load_stats = load(
+            df=transform_games,
+            postgresql_client=postgresql_client,
+            table=tables["games"],
             metadata=metadata,
-            load_method="upsert"
+            load_method="bulk_upsert",
+            chunksize=config.get("load_chunksize"),
+            row_hash_store=row_hash_store
         )
+        pipeline_logging.logger.info(f"Loaded {load_stats['rows']} rows into games in {load_stats['seconds']}s ({load_stats['rows_per_second']} rows/sec). "
+            f"Inserted: {load_stats['inserted']}, updated: {load_stats['updated']}, unchanged: {load_stats['unchanged']}")
+        if games_watermark is not None:
+            latest_finished_game_date = get_games_watermark(df_games=extract_games)
+            if latest_finished_game_date is not None:
+                pipeline_logging.logger.info(f"Moving games watermark to {latest_finished_game_date}")
+                games_watermark.set(league=league, season=season, watermark=latest_finished_game_date)
+        return load_stats
 
-        pipeline_logging.logger.info("Loading standings data to postgres")
-        
-        table_standings = Table(
-            "standings", metadata, 
-            Column("team_id", Integer),
-            Column("team_name", String),
-            Column("league", String),
-            Column("season", Integer),
-            Column("conference_name", String),
-            Column("conference_rank", Integer),
-            Column("division_name", String),
-            Column("division_rank", Integer),
-            Column("win_total", Integer),
-            Column("loss_total", Integer),
-            Column("standings_table_id", String, primary_key=True)
+    def load_standings_task(transform_standings):
+        load_stats = load(
+            df=transform_standings,
+            postgresql_client=postgresql_client,
+            table=tables["standings"],
+            metadata=metadata,
+            load_method="upsert",
+            chunksize=config.get("load_chunksize"),
+            row_hash_store=row_hash_store
         )
-        load(
-            df=df_standings_transformed,
-            postgresql_client=postgresql_client, 
-            table=table_standings, 
+        pipeline_logging.logger.info(f"Loaded {load_stats['rows']} rows into standings in {load_stats['seconds']}s ({load_stats['rows_per_second']} rows/sec). "
+            f"Inserted: {load_stats['inserted']}, updated: {load_stats['updated']}, unchanged: {load_stats['unchanged']}")
+        return load_stats
+
+    def load_players_statistics_task(transform_player_statistics):
+        load_stats = load(
+            df=transform_player_statistics,
+            postgresql_client=postgresql_client,
+            table=tables["players_statistics"],
             metadata=metadata,
-            load_method="upsert"
+            load_method="replace",
+            chunksize=config.get("load_chunksize"),
+            replace_where={"league": league, "season": season}
         )
+        pipeline_logging.logger.info(f"Loaded {load_stats['rows']} rows into players_statistics in {load_stats['seconds']}s ({load_stats['rows_per_second']} rows/sec)")
+        return load_stats
+
+    def transform_team_form_task(transform_games, load_games):
+        df_games = transform_games
+        if config.get("incremental"):
+            # only the latest games were extracted, the form is computed over every loaded game of the season
+            df_games = read_games(postgresql_client=postgresql_client, table=tables["games"], league=league, season=season)
+        return transform_team_form(df_games=df_games)
 
-        pipeline_logging.logger.info("Loading players statistics data to postgres")
-        table_players_statistics = Table(
-            "players_statistics", metadata,
-            Column("player_id", Integer),
-            Column("birth_date", Date),
-            Column("jersey_number", Integer),
-            Column("season", Integer),
-            Column("league", String),
-            Column("first_name", String),
-            Column("last_name", String),
-            Column("team_id", Integer),
-            Column("position", String),
-            Column("current_age", Integer),
-            Column("points", Integer),
-            Column("player_table_id", String)
+    def load_mart_task(table_name: str, load_method: str = "upsert"):
+        def load_mart(**upstream_results):
+            load_stats = load(
+                df=upstream_results[f"transform_{table_name}"],
+                postgresql_client=postgresql_client,
+                table=tables[table_name],
+                metadata=metadata,
+                load_method=load_method,
+                chunksize=config.get("load_chunksize"),
+                row_hash_store=row_hash_store
+            )
+            pipeline_logging.logger.info(f"Loaded {load_stats['rows']} rows into {table_name} in {load_stats['seconds']}s ({load_stats['rows_per_second']} rows/sec). "
+                f"Inserted: {load_stats['inserted']}, updated: {load_stats['updated']}, unchanged: {load_stats['unchanged']}")
+            return load_stats
+        return load_mart
+
+    if replay:
+        extract_tasks = [
+            Task(name="extract_games", func=replay_task("games")),
+            Task(name="extract_players", func=replay_task("players")),
+            Task(name="extract_player_statistics", func=replay_task("players_statistics")),
+            Task(name="extract_standings", func=replay_task("standings")),
+        ]
+    elif async_extraction:
+        extract_tasks = [
+            Task(name="extract", func=extract_async_task),
+            Task(name="extract_games", func=lambda extract: extract["games"], depends_on=["extract"]),
+            Task(name="extract_players", func=lambda extract: extract["players"], depends_on=["extract"]),
+            Task(name="extract_player_statistics", func=lambda extract: extract["players_statistics"], depends_on=["extract"]),
+            Task(name="extract_standings", func=lambda extract: extract["standings"], depends_on=["extract"]),
+        ]
+    else:
+        extract_tasks = [
+            Task(name="extract_games", func=extract_games_task),
+            Task(name="extract_players", func=lambda: extract_players(nba_api_client=nba_api_client, league=league, season=season, max_workers=config.get("max_workers", 1), team_directory=team_directory, landing_zone=landing_zone)),
+            Task(name="extract_player_statistics", func=extract_player_statistics_task),
+            Task(name="extract_standings", func=lambda: extract_standings(nba_api_client=nba_api_client, league=league, season=season, landing_zone=landing_zone)),
+        ]
+    tasks = extract_tasks + [
+        Task(name="transform_games", func=lambda extract_games: transform_games(df_games=extract_games), depends_on=["extract_games"]),
+        Task(
+            name="transform_player_statistics",
+            func=transform_player_statistics_task,
+            depends_on=["extract_players", "extract_player_statistics"]
+        ),
+        Task(name="transform_standings", func=lambda extract_standings: transform_standings(df_standings=extract_standings), depends_on=["extract_standings"]),
+        Task(name="load_games", func=load_games_task, depends_on=["transform_games", "extract_games"]),
+        Task(name="load_standings", func=load_standings_task, depends_on=["transform_standings"]),
+        Task(name="load_players_statistics", func=load_players_statistics_task, depends_on=["transform_player_statistics"]),
+        Task(name="transform_team_form", func=transform_team_form_task, depends_on=["transform_games", "load_games"]),
+        Task(
+            name="transform_team_season_summary",
+            func=lambda transform_team_form: transform_team_season_summary(df_team_form=transform_team_form),
+            depends_on=["transform_team_form"]
+        ),
+        Task(
+            name="transform_player_season_summary",
+            func=lambda transform_player_statistics: transform_player_season_summary(df_players_statistics=transform_player_statistics),
+            depends_on=["transform_player_statistics"]
+        ),
+        Task(name="load_team_form", func=load_mart_task("team_form", load_method="bulk_upsert"), depends_on=["transform_team_form"]),
+        Task(name="load_team_season_summary", func=load_mart_task("team_season_summary"), depends_on=["transform_team_season_summary"]),
+        Task(name="load_player_season_summary", func=load_mart_task("player_season_summary"), depends_on=["transform_player_season_summary"]),
+    ]
+    def checkpoint_task(step: str, func):
+        def run_step(**upstream_results):
+            result = func(**upstream_results)
+            checkpoint.set(run_id=run_id, step=step, result=result if step.startswith("load_") else None)
+            return result
+        return run_step
+
+    if checkpoint is not None:
+        completed = {}
+        for step, result in completed_steps.items():
+            if step in resumed_extracts:
+                completed[step] = replay_task(EXTRACT_TASK_ENDPOINTS[step], landed_run_id=run_id)
+            elif step.startswith("load_"):
+                completed[step] = lambda result=result: result
+        if completed:
+            pipeline_logging.logger.info(f"Resuming run {run_id} after its completed steps: {', '.join(sorted(completed))}")
+            tasks = resume_tasks(tasks=tasks, completed=completed, targets=[task.name for task in tasks if task.name.startswith("load_")])
+        for task in tasks:
+            checkpointed = task.name.startswith("load_") or (checkpoint_extracts and task.name in EXTRACT_TASK_ENDPOINTS)
+            if checkpointed and task.name not in completed:
+                task.func = checkpoint_task(step=task.name, func=task.func)
+    stage_metrics = StageMetrics(nba_api_client=nba_api_client)
+    for task in tasks:
+        task.func = stage_metrics.measure(name=task.name, func=task.func)
+    dag_runner = DagRunner(tasks=tasks, max_workers=config.get("dag_max_workers", 4), logger=pipeline_logging.logger)
+    results = dag_runner.run()
+    if config.get("prometheus_folder_path") is not None:
+        stage_metrics.write_prometheus(
+            file_path=Path(config.get("prometheus_folder_path")) / f"{pipeline_name}_{league}_{season}.prom",
+            labels={"pipeline": pipeline_name, "league": league, "season": season}
         )
-        load(
-            df=df_players_statistics_transformed,
-            postgresql_client=postgresql_client, 
-            table=table_players_statistics, 
-            metadata=metadata,
-            load_method="overwrite"
+    memory_usage = {}
+    for task_name, result in results.items():
+        if isinstance(result, pd.DataFrame) and "memory_usage" in result.attrs:
+            memory_usage[task_name] = result.attrs["memory_usage"]
+            pipeline_logging.logger.info(f"{task_name} memory usage: {memory_usage[task_name]['before'] / 2**20:.3f} MB before dtype contract, {memory_usage[task_name]['after'] / 2**20:.3f} MB after")
+    if nba_api_client.response_cache is not None:
+        pipeline_logging.logger.info(f"NBA API response cache stats: {nba_api_client.response_cache.stats()}")
+    return {
+        "load": {table_name: results[f"load_{table_name}"] for table_name in tables},
+        "memory_usage": memory_usage,
+        "stages": {name: {**dag_runner.timings.get(name, {}), **record} for name, record in stage_metrics.stages.items()}
+    }
+
+def run_unit(
+        pipeline_name: str,
+        config: dict,
+        league: str,
+        season: int,
+        unit_name: str = None,
+        nba_api_client: NBAApiClient = None,
+        team_directory: TeamDirectory = None
+    ) -> dict:
+    """
+    Run the pipeline for one league and season, retrying it up to `unit_retries` times,
+    and write a start entry, a retry entry per failed attempt and a single success/failure entry to the pipeline logs.
+    The start and retry entries are buffered and written with the final entry at the latest.
+    With `resume` enabled, a unit whose latest run failed continues that run from its checkpoints (see `run_pipeline`), 
+    and so does every retry, unless the failed run is older than `resume_max_age_hours` or was resumed `resume_max_resumes` times already.
+
+    Returns:
+        A dict with the league, season, final status and number of attempts of the unit
+    """
+    unit_name = unit_name or f"{pipeline_name}_{league}_{season}"
+    unit_config = {**config, "league": league, "season": season}
+    pipeline_logging = PipelineLogging(pipeline_name=unit_name, log_folder_path=config.get("log_folder_path"))
+    postgresql_logging_client = create_logging_postgresql_client(config=config)
+    metadata_logger = MetaDataLogging(
+        pipeline_name=unit_name,
+        postgresql_client=postgresql_logging_client,
+        config=unit_config
+    )
+    unit_retries = config.get("unit_retries", 0)
+    resumed_run_id = None
+    if config.get("resume"):
+        resumed_run_id = metadata_logger.resume_failed_run(
+            max_age=timedelta(hours=config.get("resume_max_age_hours", 24)),
+            max_resumes=config.get("resume_max_resumes", 2)
         )
+    if resumed_run_id is not None:
+        pipeline_logging.logger.info(f"Resuming failed run {metadata_logger.run_id}")
 
-        metadata_logger.log(status=MetaDataLoggingStatus.RUN_SUCCESS, logs=pipeline_logging.get_logs()) # log end
-        pipeline_logging.logger.handlers.clear()
+    pipeline_logging.logger.info("Starting pipeline run")
+    attempt = 0
+    try:
+        metadata_logger.log(buffered=True) #log start
+        if nba_api_client is None:
+            pipeline_logging.logger.info("Creating NBA API client")
+            nba_api_client = create_nba_api_client(config=config)
+        team_directory = team_directory or TeamDirectory(nba_api_client=nba_api_client)
+        while True:
+            attempt += 1
+            try:
+                run_metrics = run_pipeline(
+                    pipeline_name=pipeline_name,
+                    config=unit_config,
+                    league=league,
+                    season=season,
+                    pipeline_logging=pipeline_logging,
+                    postgresql_logging_client=postgresql_logging_client,
+                    nba_api_client=nba_api_client,
+                    team_directory=team_directory,
+                    run_id=metadata_logger.run_id
+                )
+                break
+            except Exception as e:
+                if attempt > unit_retries:
+                    raise
+                pipeline_logging.logger.warning(f"Attempt {attempt} failed, retrying: {e}")
+                metadata_logger.log(status=MetaDataLoggingStatus.RUN_RETRY, logs=str(e), metrics={"attempts": attempt}, buffered=True)
+                time.sleep(2 ** attempt)
+        stages = run_metrics.pop("stages")
+        metadata_logger.log(status=MetaDataLoggingStatus.RUN_SUCCESS, logs=pipeline_logging.get_logs(), metrics={"attempts": attempt, **run_metrics}, stage_metrics=stages) # log end
+        status = MetaDataLoggingStatus.RUN_SUCCESS
     except BaseException as e:
         pipeline_logging.logger.error(f"Pipeline run failed. See detailed logs: {e}")
-        metadata_logger.log(status=MetaDataLoggingStatus.RUN_FAILURE, logs=pipeline_logging.get_logs()) # log error
+        metadata_logger.log(status=MetaDataLoggingStatus.RUN_FAILURE, logs=pipeline_logging.get_logs(), metrics={"attempts": attempt}) # log error
+        status = MetaDataLoggingStatus.RUN_FAILURE
+    finally:
+        metadata_logger.close()
+    pipeline_logging.logger.handlers.clear()
+    return {"league": league, "season": season, "status": status, "attempts": attempt}
+
+# state of a backfill worker process, reused by every unit the process runs
+_worker = {}
+
+def _init_worker(pipeline_name: str, config: dict, rate_limiter: SharedTokenBucketRateLimiter) -> None:
+    load_dotenv()
+    # the worker is forked from the backfill process, it opens its own connections
+    dispose_engines()
+    _worker["pipeline_name"] = pipeline_name
+    _worker["config"] = config
+    _worker["nba_api_client"] = create_nba_api_client(config=config, rate_limiter=rate_limiter)
+    _worker["team_directory"] = TeamDirectory(nba_api_client=_worker["nba_api_client"])
+
+def _run_unit_in_worker(league: str, season: int) -> dict:
+    return run_unit(
+        pipeline_name=_worker["pipeline_name"],
+        config=_worker["config"],
+        league=league,
+        season=season,
+        nba_api_client=_worker["nba_api_client"],
+        team_directory=_worker["team_directory"]
+    )
+
+def run_backfill(pipeline_name: str, config: dict, units: list[tuple]) -> list:
+    """
+    Run several league/season units in a pool of `max_processes` processes sharing one API rate limit.
+    The target and logging tables are created up front so the workers do not race to create them.
+    """
+    postgresql_client = create_postgresql_client(config=config)
+    metadata = MetaData()
+    create_tables(metadata=metadata, partition_by_season=config.get("partition_by_season", False))
+    postgresql_client.create_table(metadata=metadata, seasons=sorted({season for _, season in units}))
+    RowHashStore(postgresql_client=postgresql_client)
+    postgresql_logging_client = create_logging_postgresql_client(config=config)
+    MetaDataLogging(pipeline_name=pipeline_name, postgresql_client=postgresql_logging_client)
+    Watermark(pipeline_name=pipeline_name, postgresql_client=postgresql_logging_client)
+    if config.get("resume"):
+        Checkpoint(postgresql_client=postgresql_logging_client)
+
+    return run_units(
+        func=_run_unit_in_worker,
+        units=units,
+        max_processes=config.get("max_processes", 1),
+        initializer=_init_worker,
+        initargs=(pipeline_name, config, SharedTokenBucketRateLimiter())
+    )
+
+if __name__ == "__main__":
+    load_dotenv()
+
+    # Get config variables
+    pipeline_config = get_pipeline_config(yaml_file_path=__file__.replace(".py", ".yaml"))
+    config = pipeline_config.get("config")
+    PIPELINE_NAME = pipeline_config.get("name")
+
+    units = expand_units(config=config)
+    if len(units) == 1:
+        league, season = units[0]
+        run_unit(pipeline_name=PIPELINE_NAME, config=config, league=league, season=season, unit_name=PIPELINE_NAME)
+    else:
+        pipeline_logging = PipelineLogging(pipeline_name=PIPELINE_NAME, log_folder_path=config.get("log_folder_path"))
+        pipeline_logging.logger.info(f"Starting backfill of {len(units)} league/season units with {config.get('max_processes', 1)} processes")
+        for result in run_backfill(pipeline_name=PIPELINE_NAME, config=config, units=units):
+            pipeline_logging.logger.info(f"Backfill unit result: {result}")
         pipeline_logging.logger.handlers.clear()
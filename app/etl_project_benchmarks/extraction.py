@@ -0,0 +1,78 @@
+"""
+Benchmark the schema-driven `extract_fields` against `pd.json_normalize` followed by a column selection,
+on synthetic player statistics payloads shaped like the `players/statistics` endpoint.
+
+Usage:
+    python -m etl_project_benchmarks.extraction --records 500000
+"""
+import argparse
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from etl_project.assets.fields import extract_fields
+from etl_project.assets.nba import PLAYER_STATISTICS_FIELDS
+
+
+def make_player_statistics(records: int, seed: int = 0) -> list[dict]:
+    """Synthetic player statistics records, with every field the API returns per player and game"""
+    rng = np.random.default_rng(seed)
+    player_ids = rng.integers(1, 5000, records).tolist()
+    team_ids = rng.integers(1, 41, records).tolist()
+    points = rng.integers(0, 50, records).tolist()
+    data = []
+    for position in range(records):
+        data.append({
+            "player": {"id": player_ids[position], "firstname": "First", "lastname": "Last"},
+            "team": {"id": team_ids[position], "name": "Team", "nickname": "Nickname", "code": "TEA", "logo": "https://example.com/logo.png"},
+            "game": {"id": position},
+            "points": points[position] if position % 50 else None,
+            "pos": "SF",
+            "min": "31:12",
+            "fgm": 7, "fga": 15, "fgp": "46.7",
+            "ftm": 3, "fta": 4, "ftp": "75.0",
+            "tpm": 2, "tpa": 6, "tpp": "33.3",
+            "offReb": 1, "defReb": 5, "totReb": 6,
+            "assists": 4, "pFouls": 2, "steals": 1, "turnovers": 3, "blocks": 0,
+            "plusMinus": "-4", "comment": None
+        })
+    return data
+
+
+def measure(func) -> dict:
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    df = func()
+    seconds = time.perf_counter() - start_time
+    peak_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "df": df,
+        "seconds": round(seconds, 3),
+        "peak_mb": round(peak_bytes / 2**20, 1),
+        "result_mb": round(df.memory_usage(deep=True).sum() / 2**20, 1)
+    }
+
+
+def run(records: int) -> list[dict]:
+    data = make_player_statistics(records)
+    columns = list(PLAYER_STATISTICS_FIELDS)
+    cases = [
+        ("json_normalize", lambda: pd.json_normalize(data=data)[columns]),
+        ("extract_fields", lambda: extract_fields(records=data, fields=PLAYER_STATISTICS_FIELDS)),
+    ]
+    results = [{"method": name, **measure(func)} for name, func in cases]
+    expected, actual = results[0].pop("df"), results[1].pop("df")
+    for column, field_type in PLAYER_STATISTICS_FIELDS.items():
+        if field_type in (int, float):
+            np.testing.assert_array_equal(actual[column].astype("float64"), expected[column].astype("float64"))
+        else:
+            assert actual[column].tolist() == expected[column].tolist()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=500_000)
+    args = parser.parse_args()
+    print(pd.DataFrame(run(records=args.records)).to_string(index=False))
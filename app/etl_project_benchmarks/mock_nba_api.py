@@ -0,0 +1,220 @@
+"""
+A local stand-in for the api-sports NBA API, serving synthetic payloads of a configurable size for the
+games, teams, players, players/statistics and standings endpoints, with injectable latency and rate limiting.
+
+Usage:
+    with MockNBAApi(teams=30, players_per_team=15, games_per_team=82) as mock_nba_api:
+        nba_api_client = NBAApiClient(api_key="benchmark", base_url=mock_nba_api.base_url)
+"""
+import json
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+CONFERENCES = ["East", "West"]
+DIVISIONS = ["Atlantic", "Central", "Southeast", "Northwest", "Pacific", "Southwest"]
+POSITIONS = ["G", "F", "C", "G-F", "F-C"]
+
+
+class MockNBAApi:
+    """
+    Args:
+        teams: number of teams in the league
+        players_per_team: number of players on each team
+        games_per_team: number of games each team plays in a season. Every player has a statistics line per game of their team.
+        latency_seconds: delay added to every response
+        rate_limit_every: answer every n-th request with a 429, 0 to never rate limit
+        retry_after_seconds: `Retry-After` header of the 429 responses
+    """
+    def __init__(
+            self,
+            teams: int = 30,
+            players_per_team: int = 15,
+            games_per_team: int = 82,
+            latency_seconds: float = 0.0,
+            rate_limit_every: int = 0,
+            retry_after_seconds: float = 0.0
+        ):
+        self.teams = teams
+        self.players_per_team = players_per_team
+        self.games_per_team = games_per_team
+        self.latency_seconds = latency_seconds
+        self.rate_limit_every = rate_limit_every
+        self.retry_after_seconds = retry_after_seconds
+        self.request_count = 0
+        self.rate_limited_count = 0
+        self._lock = threading.Lock()
+        self._payloads = {}
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockNBAApi":
+        mock_nba_api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                mock_nba_api._handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "MockNBAApi":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _handle(self, request: BaseHTTPRequestHandler) -> None:
+        with self._lock:
+            self.request_count += 1
+            rate_limited = self.rate_limit_every > 0 and self.request_count % self.rate_limit_every == 0
+            self.rate_limited_count += int(rate_limited)
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        if rate_limited:
+            request.send_response(429)
+            request.send_header("Retry-After", str(self.retry_after_seconds))
+            request.send_header("Content-Length", "0")
+            request.end_headers()
+            return
+        url = urlparse(request.path)
+        endpoint = url.path.strip("/")
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        body = self._payload(endpoint=endpoint, params=params)
+        if body is None:
+            request.send_response(404)
+            request.send_header("Content-Length", "0")
+            request.end_headers()
+            return
+        request.send_response(200)
+        request.send_header("Content-Type", "application/json")
+        request.send_header("Content-Length", str(len(body)))
+        request.end_headers()
+        request.wfile.write(body)
+
+    def _payload(self, endpoint: str, params: dict) -> bytes:
+        """Return the json body of a request, generated once per endpoint and parameters"""
+        key = (endpoint, tuple(sorted(params.items())))
+        with self._lock:
+            if key in self._payloads:
+                return self._payloads[key]
+        generators = {
+            "teams": lambda: self.teams_response(),
+            "games": lambda: self.games_response(season=int(params.get("season", 2022)), game_date=params.get("date")),
+            "players": lambda: self.players_response(team=int(params["team"])),
+            "players/statistics": lambda: self.player_statistics_response(team=int(params["team"])),
+            "standings": lambda: self.standings_response(league=params.get("league", "standard"), season=int(params.get("season", 2022)))
+        }
+        if endpoint not in generators:
+            return None
+        response = generators[endpoint]()
+        body = json.dumps({"get": endpoint, "parameters": params, "errors": [], "results": len(response), "response": response}).encode("utf-8")
+        with self._lock:
+            self._payloads[key] = body
+        return body
+
+    def teams_response(self) -> list[dict]:
+        return [
+            {
+                "id": team, "name": f"Team {team}", "nickname": f"Nickname {team}", "code": f"T{team:02d}", "city": f"City {team}",
+                "logo": f"https://example.com/logos/{team}.png", "allStar": False, "nbaFranchise": True,
+                "leagues": {"standard": {"conference": CONFERENCES[team % 2], "division": DIVISIONS[team % len(DIVISIONS)]}}
+            }
+            for team in range(1, self.teams + 1)
+        ]
+
+    def games_response(self, season: int, game_date: str = None) -> list[dict]:
+        games = []
+        game_count = self.teams * self.games_per_team // 2
+        season_start = date(season, 10, 18)
+        for game in range(game_count):
+            home_team = 1 + game % self.teams
+            away_team = 1 + (game + 1 + game // self.teams) % self.teams
+            if away_team == home_team:
+                away_team = 1 + home_team % self.teams
+            start = season_start + timedelta(days=game * 170 // max(game_count, 1))
+            if game_date is not None and start.isoformat() != game_date:
+                continue
+            games.append({
+                "id": season * 10000 + game,
+                "league": "standard",
+                "season": season,
+                "date": {"start": f"{start.isoformat()}T23:30:00.000Z", "end": None, "duration": "2:15"},
+                "stage": 2,
+                "status": {"clock": None, "halftime": False, "short": 3, "long": "Finished"},
+                "periods": {"current": 4, "total": 4, "endOfPeriod": False},
+                "arena": {"name": f"Arena {home_team}", "city": f"City {home_team}", "state": None, "country": "USA"},
+                "teams": {
+                    "visitors": {"id": away_team, "name": f"Team {away_team}", "nickname": f"Nickname {away_team}", "code": f"T{away_team:02d}", "logo": None},
+                    "home": {"id": home_team, "name": f"Team {home_team}", "nickname": f"Nickname {home_team}", "code": f"T{home_team:02d}", "logo": None}
+                },
+                "scores": {
+                    "visitors": {"win": 0, "loss": 0, "series": {"win": 0, "loss": 0}, "linescore": ["25", "25", "25", "25"], "points": 90 + (game * 7) % 40},
+                    "home": {"win": 0, "loss": 0, "series": {"win": 0, "loss": 0}, "linescore": ["25", "25", "25", "25"], "points": 90 + (game * 11) % 40}
+                },
+                "officials": [], "timesTied": None, "leadChanges": None, "nugget": None
+            })
+        return games
+
+    def _player_id(self, team: int, player: int) -> int:
+        return team * 1000 + player
+
+    def players_response(self, team: int) -> list[dict]:
+        return [
+            {
+                "id": self._player_id(team, player), "firstname": f"First{player}", "lastname": f"Last{team}_{player}",
+                "birth": {"date": f"{1985 + player % 15}-{1 + player % 12:02d}-{1 + player % 28:02d}", "country": "USA"},
+                "nba": {"start": 2015, "pro": 3},
+                "height": {"feets": "6", "inches": "7", "meters": "2.01"},
+                "weight": {"pounds": "220", "kilograms": "99.8"},
+                "college": "College", "affiliation": "College/USA",
+                "leagues": {"standard": {"jersey": player, "active": True, "pos": POSITIONS[player % len(POSITIONS)]}}
+            }
+            for player in range(self.players_per_team)
+        ]
+
+    def player_statistics_response(self, team: int) -> list[dict]:
+        return [
+            {
+                "player": {"id": self._player_id(team, player), "firstname": f"First{player}", "lastname": f"Last{team}_{player}"},
+                "team": {"id": team, "name": f"Team {team}", "nickname": f"Nickname {team}", "code": f"T{team:02d}", "logo": None},
+                "game": {"id": game},
+                "points": (player * 7 + game) % 35, "pos": POSITIONS[player % len(POSITIONS)], "min": f"{(player + game) % 40}:{game % 60:02d}",
+                "fgm": 5, "fga": 11, "fgp": "45.5", "ftm": 2, "fta": 3, "ftp": "66.7", "tpm": 1, "tpa": 4, "tpp": "25.0",
+                "offReb": 1, "defReb": 4, "totReb": (player + game) % 12, "assists": (player * 3 + game) % 10,
+                "pFouls": 2, "steals": 1, "turnovers": 2, "blocks": 0, "plusMinus": "3", "comment": None
+            }
+            for game in range(self.games_per_team)
+            for player in range(self.players_per_team)
+        ]
+
+    def standings_response(self, league: str, season: int) -> list[dict]:
+        return [
+            {
+                "league": league, "season": season,
+                "team": {"id": team, "name": f"Team {team}", "nickname": f"Nickname {team}", "code": f"T{team:02d}", "logo": None},
+                "conference": {"name": CONFERENCES[team % 2].lower(), "rank": 1 + team // 2, "win": 41, "loss": 41},
+                "division": {"name": DIVISIONS[team % len(DIVISIONS)].lower(), "rank": 1 + team % 5, "win": 8, "loss": 8, "gamesBehind": None},
+                "win": {"home": 20, "away": 21, "total": 41, "percentage": "0.500", "lastTen": 5},
+                "loss": {"home": 21, "away": 20, "total": 41, "percentage": "0.500", "lastTen": 5},
+                "gamesBehind": None, "streak": 1, "winStreak": True, "tieBreakerPoints": None
+            }
+            for team in range(1, self.teams + 1)
+        ]
@@ -0,0 +1,90 @@
+"""
+Benchmark `transform_player_statistics`, which sums the statistics by game per player, team, league and season before
+joining the player attributes, against the previous implementation grouping the joined frame by ten columns.
+
+Usage:
+    python -m etl_project_benchmarks.player_statistics --lines 500000
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from etl_project.assets.nba import calculate_ages, create_player_keys, transform_player_statistics, apply_dtypes, \
+    EXTRACT_DTYPES, PLAYERS_COLUMNS
+
+
+def make_season(lines: int, games: int = 82, seed: int = 0) -> tuple:
+    """Synthetic players and player statistics by game of a season with `lines` statistics lines"""
+    rng = np.random.default_rng(seed)
+    players = max(lines // games, 1)
+    player_ids = np.arange(1, players + 1)
+    team_ids = rng.integers(1, 31, players)
+    df_players = pd.DataFrame({
+        "id": player_ids,
+        "height.meters": "2.01",
+        "weight.kilograms": "100.2",
+        "birth.date": (pd.Timestamp("1985-01-01") + pd.to_timedelta(rng.integers(0, 365 * 15, players), unit="D")).strftime("%Y-%m-%d"),
+        "leagues.standard.jersey": rng.integers(0, 100, players),
+        "season": 2022,
+        "league": "standard"
+    })
+    line_players = rng.integers(0, players, lines)
+    df_players_statistics = pd.DataFrame({
+        "player.id": player_ids[line_players],
+        "player.firstname": pd.Series([f"First{player_id}" for player_id in player_ids]).to_numpy()[line_players],
+        "player.lastname": pd.Series([f"Last{player_id}" for player_id in player_ids]).to_numpy()[line_players],
+        "team.id": team_ids[line_players],
+        "pos": rng.choice(["G", "F", "C"], players)[line_players],
+        "points": rng.integers(0, 40, lines),
+        "totReb": rng.integers(0, 15, lines),
+        "assists": rng.integers(0, 12, lines),
+        "min": [f"{minutes}:{seconds:02d}" for minutes, seconds in zip(rng.integers(0, 48, lines), rng.integers(0, 60, lines))],
+        "season": 2022,
+        "league": "standard"
+    })
+    return (
+        apply_dtypes(df=df_players, dtypes=EXTRACT_DTYPES["players"]),
+        apply_dtypes(df=df_players_statistics, dtypes=EXTRACT_DTYPES["players_statistics"])
+    )
+
+
+def transform_player_statistics_by_ten_columns(df_players: pd.DataFrame, df_players_statistics: pd.DataFrame) -> pd.DataFrame:
+    """The previous implementation: join every line to its player, then group by ten columns to sum the points"""
+    df_players_renamed = df_players[PLAYERS_COLUMNS].rename(columns={
+        "id": "player_id", "height.meters": "height_meters", "weight.kilograms": "weight_kilograms",
+        "birth.date": "birth_date", "leagues.standard.jersey": "jersey_number"
+    })
+    df_player_statistics_renamed = df_players_statistics[['player.id','player.firstname','player.lastname','team.id','pos','points','season','league']].rename(columns={
+        "player.id": "player_id", "player.firstname": "first_name", "player.lastname": "last_name", "team.id": "team_id", "pos": "position"
+    })
+    df_player_summary = pd.merge(left=df_players_renamed, right=df_player_statistics_renamed, on=["player_id","league","season"])
+    birth_dates = pd.to_datetime(df_player_summary['birth_date'])
+    df_player_summary['birth_date'] = birth_dates.dt.date
+    df_player_summary["current_age"] = calculate_ages(birth_dates)
+    df = df_player_summary.groupby(['player_id','birth_date','jersey_number','season','league','first_name'
+        ,'last_name','team_id','position','current_age'], as_index=False, observed=True).sum("points")
+    df["player_table_id"] = create_player_keys(df)
+    return df
+
+
+def run(lines: int) -> list[dict]:
+    df_players, df_players_statistics = make_season(lines)
+    results = []
+    for name, func in [("ten_column_groupby", transform_player_statistics_by_ten_columns), ("key_groupby_then_join", transform_player_statistics)]:
+        start_time = time.perf_counter()
+        df = func(df_players=df_players, df_players_statistics=df_players_statistics)
+        results.append({"method": name, "seconds": round(time.perf_counter() - start_time, 3), "rows": len(df), "df": df})
+    expected, actual = results[0].pop("df"), results[1].pop("df")
+    keys = ["player_id", "team_id"]
+    np.testing.assert_array_equal(
+        actual.sort_values(keys)["points"].to_numpy(dtype="int64"),
+        expected.sort_values(keys)["points"].to_numpy(dtype="int64")
+    )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=500_000)
+    args = parser.parse_args()
+    print(pd.DataFrame(run(lines=args.lines)).to_string(index=False))
@@ -0,0 +1,77 @@
+"""
+Benchmark the vectorized transform helpers against the row-wise implementations they replace.
+
+Usage:
+    python -m etl_project_benchmarks.transforms --rows 1000000
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from etl_project.assets.nba import calculate_age, calculate_ages, create_key_player, create_player_keys, \
+    create_key_team, create_team_keys, get_winner_id, get_winner_ids, get_loser_id, get_loser_ids
+
+
+def make_games(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Synthetic games with the columns produced by the games rename in `transform_games`"""
+    rng = np.random.default_rng(seed)
+    home_team_score = rng.integers(80, 130, rows).astype(float)
+    away_team_score = rng.integers(80, 130, rows).astype(float)
+    # games that have not been played yet have no scores
+    home_team_score[rng.random(rows) < 0.05] = np.nan
+    return pd.DataFrame({
+        "home_team_id": rng.integers(1, 41, rows),
+        "away_team_id": rng.integers(1, 41, rows),
+        "home_team_score": home_team_score,
+        "away_team_score": away_team_score
+    })
+
+
+def make_players(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Synthetic players with the key and birth date columns used by `transform_player_statistics`"""
+    rng = np.random.default_rng(seed)
+    birth_dates = pd.Timestamp("1975-01-01") + pd.to_timedelta(rng.integers(0, 365 * 30, rows), unit="D")
+    return pd.DataFrame({
+        "player_id": rng.integers(1, 5000, rows),
+        "team_id": rng.integers(1, 41, rows),
+        "league": rng.choice(["standard", "africa", "vegas"], rows),
+        "season": rng.integers(2015, 2024, rows),
+        "birth_date": birth_dates.date
+    })
+
+
+def timed(func):
+    start_time = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start_time
+
+
+def run(rows: int) -> list[dict]:
+    games = make_games(rows)
+    players = make_players(rows)
+    cases = [
+        ("winner_team_id", lambda: games.apply(get_winner_id, axis=1), lambda: pd.Series(get_winner_ids(games))),
+        ("loser_team_id", lambda: games.apply(get_loser_id, axis=1), lambda: pd.Series(get_loser_ids(games))),
+        ("player_table_id", lambda: players.apply(create_key_player, axis=1), lambda: create_player_keys(players)),
+        ("standings_table_id", lambda: players.apply(create_key_team, axis=1), lambda: create_team_keys(players)),
+        ("current_age", lambda: players["birth_date"].apply(calculate_age), lambda: calculate_ages(players["birth_date"])),
+    ]
+    results = []
+    for name, row_wise, vectorized in cases:
+        expected, row_wise_seconds = timed(row_wise)
+        actual, vectorized_seconds = timed(vectorized)
+        np.testing.assert_array_equal(np.asarray(actual), np.asarray(expected))
+        results.append({
+            "column": name,
+            "row_wise_seconds": round(row_wise_seconds, 3),
+            "vectorized_seconds": round(vectorized_seconds, 3),
+            "speedup": round(row_wise_seconds / vectorized_seconds, 1)
+        })
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+    print(pd.DataFrame(run(rows=args.rows)).to_string(index=False))
@@ -0,0 +1,11 @@
+from etl_project.assets.backfill import expand_units
+
+def test_expand_units_single_league_and_season():
+    assert expand_units({"league": "standard", "season": 2022}) == [("standard", 2022)]
+
+def test_expand_units_lists_and_ranges():
+    units = expand_units({"leagues": ["standard", "vegas"], "seasons": {"start": 2020, "end": 2022}})
+
+    assert len(units) == 6
+    assert units[0] == ("standard", 2020)
+    assert units[-1] == ("vegas", 2022)
@@ -0,0 +1,42 @@
+from etl_project.assets.change_detection import hash_rows, create_row_keys, RowHashStore
+from sqlalchemy import Table, Column, Integer, MetaData
+import pandas as pd
+import uuid
+
+def test_hash_rows_is_stable_across_dtypes():
+    df = pd.DataFrame({"team_id": [1, 2], "team_name": ["Atlanta Hawks", "Boston Celtics"]})
+    df_categorical = df.astype({"team_id": "int16", "team_name": "category"})
+
+    assert hash_rows(df, ["team_id", "team_name"]).tolist() == hash_rows(df_categorical, ["team_id", "team_name"]).tolist()
+    assert hash_rows(df, ["team_id", "team_name"]).nunique() == 2
+
+def test_create_row_keys():
+    df = pd.DataFrame({"player_id": [1, 2], "season": [2022, 2022]})
+
+    assert create_row_keys(df, ["player_id", "season"]).tolist() == ["1|2022", "2|2022"]
+
+def test_row_hash_store_diff_returns_only_new_and_changed_rows(postgresql_client):
+    suffix = uuid.uuid4().hex[:8]
+    row_hash_store = RowHashStore(postgresql_client=postgresql_client, row_hash_table_name=f"row_hashes_{suffix}")
+    metadata = MetaData()
+    table = Table(f"standings_{suffix}", metadata, Column("team_id", Integer, primary_key=True), Column("season", Integer, primary_key=True), Column("win_total", Integer))
+    postgresql_client.create_table(metadata=metadata)
+    df = pd.DataFrame({"team_id": [1, 2], "season": [2022, 2022], "win_total": [10, 12]})
+    try:
+        df_to_load, change_counts, df_hashes = row_hash_store.diff(df=df, table=table)
+        assert change_counts == {"inserted": 2, "updated": 0, "unchanged": 0}
+        row_hash_store.save(table_name=table.name, df_hashes=df_hashes)
+
+        df_next = pd.DataFrame({"team_id": [1, 2, 3], "season": [2022, 2022, 2022], "win_total": [10, 13, 8]}, dtype="int16")
+        df_to_load, change_counts, df_hashes = row_hash_store.diff(df=df_next, table=table)
+        assert change_counts == {"inserted": 1, "updated": 1, "unchanged": 1}
+        assert df_to_load["team_id"].tolist() == [2, 3]
+        assert df_hashes["row_key"].tolist() == ["2|2022", "3|2022"]
+
+        # the stored hashes are forgotten once the table they describe is dropped
+        postgresql_client.drop_table(table.name)
+        df_to_load, change_counts, _ = row_hash_store.diff(df=df, table=table)
+        assert change_counts == {"inserted": 2, "updated": 0, "unchanged": 0}
+    finally:
+        postgresql_client.drop_table(table.name)
+        postgresql_client.drop_table(row_hash_store.table.name)
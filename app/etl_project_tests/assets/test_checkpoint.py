@@ -0,0 +1,17 @@
+from etl_project.assets.checkpoint import Checkpoint
+import uuid
+
+def test_checkpoint_round_trip(postgresql_client):
+    checkpoint = Checkpoint(postgresql_client=postgresql_client, checkpoint_table_name=f"pipeline_checkpoints_{uuid.uuid4().hex[:8]}")
+    try:
+        assert checkpoint.get(run_id=1) == {}
+        checkpoint.set(run_id=1, step="extract_games")
+        checkpoint.set(run_id=1, step="load_games", result={"rows": 10})
+        checkpoint.set(run_id=2, step="load_games", result={"rows": 20})
+        # completed again on retry
+        checkpoint.set(run_id=1, step="load_games", result={"rows": 11})
+
+        assert checkpoint.get(run_id=1) == {"extract_games": None, "load_games": {"rows": 11}}
+        assert checkpoint.get(run_id=2) == {"load_games": {"rows": 20}}
+    finally:
+        postgresql_client.drop_table(checkpoint.table.name)
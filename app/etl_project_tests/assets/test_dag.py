@@ -0,0 +1,66 @@
+from etl_project.assets.dag import Task, DagRunner, DagTaskError, resume_tasks
+import pytest
+
+def test_dag_runner_passes_upstream_results():
+    tasks = [
+        Task(name="extract", func=lambda: [1, 2, 3]),
+        Task(name="transform", func=lambda extract: [value * 2 for value in extract], depends_on=["extract"]),
+        Task(name="load", func=lambda transform, extract: sum(transform) + len(extract), depends_on=["transform", "extract"])
+    ]
+    runner = DagRunner(tasks=tasks, max_workers=2)
+    results = runner.run()
+    assert results["load"] == 15
+    assert set(runner.timings) == {"extract", "transform", "load"}
+    assert runner.timings["transform"]["started_at"] >= runner.timings["extract"]["finished_at"]
+
+def test_dag_runner_stops_on_failure():
+    ran = []
+    def fail():
+        raise ValueError("boom")
+    tasks = [
+        Task(name="extract", func=fail),
+        Task(name="load", func=lambda extract: ran.append("load"), depends_on=["extract"])
+    ]
+    with pytest.raises(DagTaskError) as error:
+        DagRunner(tasks=tasks).run()
+    assert error.value.task_name == "extract"
+    assert isinstance(error.value.error, ValueError)
+    assert ran == []
+
+def test_dag_runner_rejects_cycles():
+    tasks = [
+        Task(name="a", func=lambda b: b, depends_on=["b"]),
+        Task(name="b", func=lambda a: a, depends_on=["a"])
+    ]
+    with pytest.raises(Exception, match="cycle"):
+        DagRunner(tasks=tasks)
+
+def test_resume_tasks_skips_completed_tasks_and_their_upstream_tasks():
+    ran = []
+    def step(name, value):
+        def run(**upstream_results):
+            ran.append(name)
+            return value
+        return run
+    tasks = [
+        Task(name="extract_games", func=step("extract_games", 1)),
+        Task(name="extract_players", func=step("extract_players", 2)),
+        Task(name="transform_games", func=step("transform_games", 3), depends_on=["extract_games"]),
+        Task(name="transform_players", func=step("transform_players", 4), depends_on=["extract_players"]),
+        Task(name="load_games", func=step("load_games", 5), depends_on=["transform_games"]),
+        Task(name="load_players", func=step("load_players", 6), depends_on=["transform_players"]),
+        Task(name="report", func=step("report", 7), depends_on=["load_games"])
+    ]
+    resumed = resume_tasks(tasks=tasks, completed={"load_games": lambda: {"rows": 5}, "extract_players": lambda: 20, "report": lambda: 7})
+    assert [task.name for task in resumed] == ["extract_players", "transform_players", "load_players", "report"]
+
+    resumed = resume_tasks(
+        tasks=tasks,
+        completed={"load_games": lambda: {"rows": 5}, "extract_players": lambda: 20, "report": lambda: 7},
+        targets=["load_games", "load_players"]
+    )
+    assert [task.name for task in resumed] == ["extract_players", "transform_players", "load_games", "load_players"]
+    results = DagRunner(tasks=resumed).run()
+    assert results["load_games"] == {"rows": 5}
+    assert results["extract_players"] == 20
+    assert sorted(ran) == ["load_players", "transform_players"]
@@ -0,0 +1,21 @@
+from etl_project.assets.dtypes import apply_dtypes
+import pandas as pd
+import pytest
+
+def test_apply_dtypes_casts_and_reports_memory():
+    df = pd.DataFrame({
+        "team_id": [1, 2, 3],
+        "league": ["standard", "standard", "standard"],
+        "score": [101.0, None, 99.0],
+        "rank": pd.array([1, None, 3], dtype="Int64"),
+        "name": ["a", "b", "c"]
+    })
+    df_cast = apply_dtypes(df=df, dtypes={"team_id": "int16", "league": "category", "score": "Int16", "rank": "int16", "missing": "int16"})
+    assert df_cast.dtypes.astype(str).to_dict() == {"team_id": "int16", "league": "category", "score": "Int16", "rank": "Int16", "name": "object"}
+    assert df_cast["score"].tolist() == [101, pd.NA, 99]
+    assert df_cast.attrs["memory_usage"]["after"] < df_cast.attrs["memory_usage"]["before"]
+    assert df["team_id"].dtype == "int64"
+
+def test_apply_dtypes_rejects_values_out_of_range():
+    with pytest.raises(Exception, match="team_id"):
+        apply_dtypes(df=pd.DataFrame({"team_id": [1, 40000]}), dtypes={"team_id": "int16"})
@@ -0,0 +1,24 @@
+from etl_project.assets.fields import extract_fields
+from etl_project.assets.nba import GAMES_FIELDS, GAMES_COLUMNS
+import pandas as pd
+
+def test_extract_fields_matches_json_normalize():
+    records = [
+        {"id": 1, "date": {"start": "2022-10-18T23:30:00.000Z"}, "status": {"short": 3}, "scores": {"home": {"points": 117}}, "extra": [1, 2]},
+        {"id": 2, "date": {"start": "2022-10-19T23:30:00.000Z"}, "status": {"short": 1}, "scores": {"home": {"points": None}}},
+        {"id": 3, "date": None, "status": {}, "scores": {"home": {"points": 99}}}
+    ]
+    fields = {"id": int, "date.start": str, "status.short": int, "scores.home.points": float}
+    df = extract_fields(records=records, fields=fields)
+    expected = pd.json_normalize(records).reindex(columns=list(fields))
+    assert df.columns.tolist() == list(fields)
+    assert df["id"].dtype == "int64"
+    assert df["status.short"].dtype == "Int64"
+    assert df["date.start"].tolist() == ["2022-10-18T23:30:00.000Z", "2022-10-19T23:30:00.000Z", None]
+    assert df["status.short"].tolist() == [3, 1, pd.NA]
+    pd.testing.assert_series_equal(df["scores.home.points"], expected["scores.home.points"].astype("float64"))
+
+def test_extract_fields_on_empty_records():
+    df = extract_fields(records=[], fields=GAMES_FIELDS)
+    assert df.empty
+    assert set(GAMES_COLUMNS) - {"league", "season"} <= set(df.columns)
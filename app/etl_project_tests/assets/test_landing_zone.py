@@ -0,0 +1,34 @@
+from etl_project.assets.landing_zone import LandingZone
+import os
+import pandas as pd
+import pytest
+
+def test_landing_zone_round_trip(tmp_path):
+    df = pd.DataFrame({
+        "id": [1, 2],
+        "nba.tags": [["a"], []],
+        "points": ["12", 7],
+        "league": ["standard", "standard"]
+    })
+    path = LandingZone(landing_folder_path=tmp_path, run_id=1).land(df=df, league="standard", season=2022, endpoint="games")
+    assert path == tmp_path / "league=standard" / "season=2022" / "endpoint=games" / "run_id=1" / "part-0.parquet"
+
+    df_landed = LandingZone(landing_folder_path=tmp_path).read(league="standard", season=2022, endpoint="games")
+    assert df_landed["id"].tolist() == [1, 2]
+    assert df_landed["nba.tags"].tolist() == ['["a"]', '[]']
+    assert df_landed["points"].tolist() == ["12", "7"]
+
+def test_landing_zone_reads_required_columns_of_latest_run(tmp_path):
+    df = pd.DataFrame({"id": [1], "league": ["standard"]})
+    LandingZone(landing_folder_path=tmp_path, run_id=1).land(df=df, league="standard", season=2022, endpoint="games")
+    path = LandingZone(landing_folder_path=tmp_path, run_id=2).land(df=df.assign(id=2), league="standard", season=2022, endpoint="games")
+    os.utime(path, (path.stat().st_atime, path.stat().st_mtime + 10))
+
+    landing_zone = LandingZone(landing_folder_path=tmp_path)
+    assert landing_zone.latest_run_id(league="standard", season=2022, endpoint="games") == "2"
+    df_landed = landing_zone.read(league="standard", season=2022, endpoint="games", columns=["id", "date.start"])
+    assert df_landed.columns.tolist() == ["id"]
+    assert df_landed["id"].tolist() == [2]
+    assert landing_zone.read(league="standard", season=2022, endpoint="games", run_id=1)["id"].tolist() == [1]
+    with pytest.raises(Exception):
+        landing_zone.read(league="standard", season=2021, endpoint="games")
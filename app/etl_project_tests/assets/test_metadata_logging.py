@@ -0,0 +1,32 @@
+from etl_project.assets.metadata_logging import MetaDataLogging, MetaDataLoggingStatus
+from datetime import datetime, timedelta
+import uuid
+
+def test_failed_run_is_resumed_until_it_is_too_old_or_resumed_too_often(postgresql_client):
+    log_table_name = f"pipeline_logs_{uuid.uuid4().hex[:8]}"
+    def fail_run(timestamp: datetime = None) -> int:
+        metadata_logger = MetaDataLogging(pipeline_name="nba", postgresql_client=postgresql_client, log_table_name=log_table_name)
+        resumed_run_id = metadata_logger.resume_failed_run(max_age=timedelta(hours=24), max_resumes=2)
+        metadata_logger.log(status=MetaDataLoggingStatus.RUN_START, timestamp=timestamp)
+        metadata_logger.log(status=MetaDataLoggingStatus.RUN_FAILURE, timestamp=timestamp)
+        metadata_logger.close()
+        return resumed_run_id, metadata_logger.run_id
+
+    try:
+        _, first_run_id = fail_run()
+        assert fail_run() == (first_run_id, first_run_id)
+        assert fail_run() == (first_run_id, first_run_id)
+        # resumed twice already
+        resumed_run_id, run_id = fail_run(timestamp=datetime.now() - timedelta(days=2))
+        assert resumed_run_id is None and run_id != first_run_id
+        # failed two days ago
+        assert fail_run()[0] is None
+
+        metadata_logger = MetaDataLogging(pipeline_name="nba", postgresql_client=postgresql_client, log_table_name=log_table_name)
+        metadata_logger.log(status=MetaDataLoggingStatus.RUN_SUCCESS)
+        metadata_logger.close()
+        assert MetaDataLogging(pipeline_name="nba", postgresql_client=postgresql_client, log_table_name=log_table_name).resume_failed_run() is None
+    finally:
+        postgresql_client.drop_table(log_table_name)
+        with postgresql_client.begin() as connection:
+            connection.exec_driver_sql(f"drop sequence if exists {log_table_name}_run_id_seq")
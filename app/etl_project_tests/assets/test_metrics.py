@@ -0,0 +1,38 @@
+from etl_project.assets.metrics import StageMetrics
+from etl_project.assets.nba import fan_out_teams
+from etl_project.connectors.nba_api import NBAApiClient
+import pandas as pd
+
+class FakeResponse:
+    content = b"0123456789"
+
+def test_stage_metrics_counts_rows_and_requests_of_worker_threads():
+    nba_api_client = NBAApiClient(api_key="test")
+    stage_metrics = StageMetrics(nba_api_client=nba_api_client)
+
+    def extract(df_teams):
+        def get_players(team):
+            nba_api_client._count_request(FakeResponse())
+            return [{"team": team}]
+        return pd.DataFrame(fan_out_teams(func=get_players, teams=df_teams["team_id"].tolist(), max_workers=3))
+
+    df = stage_metrics.measure(name="extract_players", func=extract)(df_teams=pd.DataFrame({"team_id": [1, 2, 3, 4]}))
+    nba_api_client._count_request(FakeResponse()) # outside of any stage
+
+    record = stage_metrics.stages["extract_players"]
+    assert len(df) == 4
+    assert record["rows_in"] == 4
+    assert record["rows_out"] == 4
+    assert record["api_requests"] == 4
+    assert record["api_bytes_received"] == 40
+    assert record["seconds"] >= 0
+    assert nba_api_client.request_counter.requests == 5
+
+def test_stage_metrics_prometheus_text():
+    stage_metrics = StageMetrics()
+    with stage_metrics.stage(name="load_games", rows_in=3) as record:
+        record["rows_out"] = 2
+    text = stage_metrics.to_prometheus(labels={"pipeline": "nba", "season": 2022})
+    assert "# TYPE etl_stage_rows_out gauge" in text
+    assert 'etl_stage_rows_out{pipeline="nba",season="2022",stage="load_games"} 2' in text
+    assert 'etl_stage_api_requests{pipeline="nba",season="2022",stage="load_games"} 0' in text
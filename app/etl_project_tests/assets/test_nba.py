@@ -0,0 +1,298 @@
+from etl_project.assets.nba import fan_out_teams, TeamExtractionError, TeamDirectory, iter_records, \
+    transform_games, transform_standings, calculate_age, calculate_ages, get_games_watermark, \
+    iter_player_statistics, aggregate_player_statistics, transform_player_statistics, extract_games, \
+    transform_team_form, transform_team_season_summary, transform_player_season_summary, fan_out_teams_async, extract_seasons_async, \
+    GAME_STATUS_FINISHED
+from etl_project.connectors.nba_api import NBAApiClient
+from datetime import date, datetime, timedelta, timezone
+import asyncio
+import numpy as np
+import pandas as pd
+import time
+import pytest
+
+def test_fan_out_teams_preserves_team_order():
+    def get_players(team):
+        time.sleep(0.01 * (5 - team))
+        return [{"team": team}]
+
+    data = fan_out_teams(func=get_players, teams=[1, 2, 3, 4], max_workers=4)
+
+    assert [record["team"] for record in data] == [1, 2, 3, 4]
+
+def test_fan_out_teams_surfaces_failed_teams():
+    def get_players(team):
+        if team in (2, 4):
+            raise Exception("Status Code: 500")
+        return [{"team": team}]
+
+    with pytest.raises(TeamExtractionError) as e:
+        fan_out_teams(func=get_players, teams=[1, 2, 3, 4], max_workers=2)
+
+    assert list(e.value.failures.keys()) == [2, 4]
+
+class FakeNBAApiClient:
+    def __init__(self):
+        self.team_requests = 0
+
+    def get_teams(self, league):
+        self.team_requests += 1
+        return [
+            {"id": 1, "name": "Atlanta Hawks", "leagues": {"standard": {"conference": "East", "division": "Southeast"}}},
+            {"id": 2, "name": "Boston Celtics", "leagues": {"standard": {"conference": "East", "division": "Atlantic"}}}
+        ]
+
+def test_team_directory_fetches_teams_once():
+    nba_api_client = FakeNBAApiClient()
+    team_directory = TeamDirectory(nba_api_client=nba_api_client)
+
+    assert team_directory.get_team_ids("standard") == [1, 2]
+    assert team_directory.get_teams("standard")[1]["division_name"] == "Atlantic"
+    assert nba_api_client.team_requests == 1
+
+    team_directory.invalidate("standard")
+    team_directory.get_team_ids("standard")
+    assert nba_api_client.team_requests == 2
+
+def test_fan_out_teams_async_preserves_team_order_and_surfaces_failed_teams():
+    async def get_players(team):
+        await asyncio.sleep(0.01 * (5 - team))
+        if team == 3:
+            raise Exception("Status Code: 500")
+        return [{"team": team}]
+
+    assert asyncio.run(fan_out_teams_async(func=get_players, teams=[1, 2, 4])) == [{"team": 1}, {"team": 2}, {"team": 4}]
+    with pytest.raises(TeamExtractionError) as e:
+        asyncio.run(fan_out_teams_async(func=get_players, teams=[1, 2, 3, 4]))
+    assert list(e.value.failures.keys()) == [3]
+
+def test_extract_seasons_async_requests_teams_once_per_league():
+    class FakeAsyncNBAApiClient:
+        def __init__(self):
+            self.team_requests = 0
+        async def get_teams(self, league):
+            self.team_requests += 1
+            return [{"id": 1}, {"id": 2}]
+        async def get_games(self, league, season, game_date=None):
+            return [{"id": season, "league": league, "season": season}]
+        async def get_players(self, season, team):
+            return [{"id": team * 100}]
+        async def get_player_statistics(self, season, team):
+            return [{"player": {"id": team * 100}, "team": {"id": team}, "points": 1}]
+        async def get_standings(self, league, season):
+            return [{"team": {"id": 1}}]
+
+    nba_api_client = FakeAsyncNBAApiClient()
+    extracts = asyncio.run(extract_seasons_async(nba_api_client=nba_api_client, units=[("standard", 2021), ("standard", 2022)]))
+
+    assert nba_api_client.team_requests == 1
+    assert list(extracts.keys()) == [("standard", 2021), ("standard", 2022)]
+    assert extracts[("standard", 2022)]["games"]["id"].tolist() == [2022]
+    assert extracts[("standard", 2022)]["players"]["id"].tolist() == [100, 200]
+    assert extracts[("standard", 2021)]["players_statistics"]["team.id"].tolist() == [1, 2]
+    assert extracts[("standard", 2021)]["standings"]["season"].tolist() == [2021]
+
+def test_iter_records_yields_bounded_batches():
+    df = pd.DataFrame({"game_id": range(7)})
+    chunks = list(iter_records(df=df, chunksize=3))
+
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+    assert chunks[2] == [{"game_id": 6}]
+
+def test_transform_games_winner_and_loser():
+    df_games = pd.DataFrame({
+        "id": [1, 2, 3],
+        "league": "standard",
+        "season": 2022,
+        "date.start": ["2022-10-18T23:30:00.000Z", "2022-10-19T23:30:00.000Z", "2022-10-20T23:30:00.000Z"],
+        "teams.home.id": [10, 11, 12],
+        "teams.home.name": ["A", "B", "C"],
+        "scores.home.points": [110.0, 90.0, np.nan],
+        "teams.visitors.id": [20, 21, 22],
+        "teams.visitors.name": ["D", "E", "F"],
+        "scores.visitors.points": [100.0, 95.0, np.nan]
+    })
+    df = transform_games(df_games=df_games)
+
+    assert df["winner_team_id"].tolist() == [10, 21, 22]
+    assert df["loser_team_id"].tolist() == [20, 11, 22]
+    assert df["date"].tolist()[0] == date(2022, 10, 18)
+
+def test_transform_standings_key():
+    df_standings = pd.DataFrame({
+        "team.id": [1], "team.name": ["Atlanta Hawks"], "league": ["standard"], "season": [2022],
+        "conference.name": ["east"], "conference.rank": [7], "division.name": ["southeast"], "division.rank": [2],
+        "win.total": [41], "loss.total": [41]
+    })
+    df = transform_standings(df_standings=df_standings)
+
+    assert df["standings_table_id"].tolist() == ["1standard2022"]
+
+def test_calculate_ages_matches_calculate_age():
+    birthday_today = pd.Timestamp(date.today()) - pd.DateOffset(years=30)
+    birth_dates = pd.Series(pd.to_datetime(["1984-12-30", "1999-01-01", "2000-02-29"]).append(pd.DatetimeIndex([birthday_today])))
+
+    assert calculate_ages(birth_dates).tolist() == [calculate_age(birth_date) for birth_date in birth_dates.dt.date]
+
+def test_get_games_watermark_ignores_unfinished_games():
+    df_games = pd.DataFrame({
+        "id": [1, 2, 3],
+        "date.start": ["2023-01-03T00:30:00.000Z", "2023-01-04T00:30:00.000Z", "2023-01-05T00:30:00.000Z"],
+        "status.short": [3, 3, 1]
+    })
+
+    assert get_games_watermark(df_games=df_games) == date(2023, 1, 4)
+    assert get_games_watermark(df_games=pd.DataFrame()) is None
+
+def test_aggregate_player_statistics_matches_full_transform():
+    df_players = pd.DataFrame({
+        "id": [1, 2],
+        "height.meters": ["2.01", "1.90"],
+        "weight.kilograms": ["100", "90"],
+        "birth.date": ["1990-01-15", "1995-06-01"],
+        "leagues.standard.jersey": [23, 7],
+        "season": [2022, 2022],
+        "league": ["standard", "standard"]
+    })
+    df_players_statistics = pd.DataFrame({
+        "player.id": [1, 1, 2, 2, 1],
+        "player.firstname": ["A", "A", "B", "B", "A"],
+        "player.lastname": ["X", "X", "Y", "Y", "X"],
+        "team.id": [10, 10, 10, 10, 10],
+        "pos": ["F", "F", "G", "G", "F"],
+        "points": [10, 20, 5, None, 7],
+        "totReb": [1, 2, 3, 4, 5],
+        "assists": [0, 1, 0, 1, 0],
+        "min": ["30:30", "20:00", "10", None, "5:30"],
+        "season": [2022] * 5,
+        "league": ["standard"] * 5
+    })
+    batches = [df_players_statistics.iloc[:2], df_players_statistics.iloc[2:4], df_players_statistics.iloc[4:]]
+    df_aggregated = aggregate_player_statistics(batches=iter(batches))
+    assert len(df_aggregated) == 2
+    expected = transform_player_statistics(df_players=df_players, df_players_statistics=df_players_statistics)
+    actual = transform_player_statistics(df_players=df_players, df_player_statistics_summary=df_aggregated)
+    pd.testing.assert_frame_equal(actual, expected)
+    totals = actual.set_index("player_id")[["points", "rebounds", "assists", "minutes", "games_played"]].to_dict(orient="index")
+    assert totals == {
+        1: {"points": 37, "rebounds": 8, "assists": 1, "minutes": 56.0, "games_played": 3},
+        2: {"points": 5, "rebounds": 7, "assists": 1, "minutes": 10.0, "games_played": 2}
+    }
+
+def test_iter_player_statistics_yields_one_batch_per_team_in_order():
+    class FakeNBAApiClient:
+        def get_teams(self, league):
+            return [{"id": 3}, {"id": 1}, {"id": 2}]
+        def get_player_statistics(self, season, team):
+            return [{"player": {"id": team * 100}, "team": {"id": team}, "points": 1}]
+        def iter_player_statistics(self, season, teams, max_workers=1):
+            return NBAApiClient.iter_player_statistics(self, season=season, teams=teams, max_workers=max_workers)
+
+    nba_api_client = FakeNBAApiClient()
+    team_directory = TeamDirectory(nba_api_client=nba_api_client)
+    batches = list(iter_player_statistics(nba_api_client=nba_api_client, league="standard", season=2022, max_workers=2, team_directory=team_directory))
+    assert [batch["team.id"].tolist() for batch in batches] == [[3], [1], [2]]
+    assert batches[0]["league"].tolist() == ["standard"]
+
+class FakeSeasonGamesClient:
+    """Serves the games of one season, in full or by date, and records the requests"""
+    def __init__(self, games):
+        self.games = games
+        self.full_season_requests = 0
+        self.game_dates = []
+    def get_games(self, league, season, game_date=None):
+        if game_date is None:
+            self.full_season_requests += 1
+            return self.games
+        self.game_dates.append(game_date)
+        return [game for game in self.games if game["date"]["start"].startswith(str(game_date))]
+
+def make_game(game_id: int, start: date, status: int = GAME_STATUS_FINISHED) -> dict:
+    return {"id": game_id, "league": "standard", "season": 2020, "date": {"start": f"{start}T00:30:00.000Z"}, "status": {"short": status}}
+
+def test_extract_games_since_requests_only_the_dates_since_the_watermark():
+    today = datetime.now(timezone.utc).date()
+    since = today - timedelta(days=2)
+    nba_api_client = FakeSeasonGamesClient(games=[make_game(1, since - timedelta(days=1)), make_game(2, since), make_game(3, today, status=1)])
+    df = extract_games(nba_api_client=nba_api_client, league="standard", season=2020, since=since)
+    assert df["id"].tolist() == [2, 3]
+    assert nba_api_client.game_dates == [since, since + timedelta(days=1), today]
+    assert nba_api_client.full_season_requests == 0
+
+def test_extract_games_since_an_old_watermark_makes_a_single_full_season_request():
+    # the 2019 season ran into October 2020, the watermark is at its last game
+    nba_api_client = FakeSeasonGamesClient(games=[make_game(1, date(2020, 9, 30)), make_game(2, date(2020, 10, 11))])
+    df = extract_games(nba_api_client=nba_api_client, league="standard", season=2019, since=date(2020, 10, 11))
+    assert df["id"].tolist() == [2]
+    assert nba_api_client.game_dates == []
+    assert nba_api_client.full_season_requests == 1
+    assert get_games_watermark(df_games=df) == date(2020, 10, 11)
+
+def make_transformed_games(results: list[bool]) -> pd.DataFrame:
+    """Games of team 1 against team 2 in date order, team 1 playing at home every other game and winning when `results` is True"""
+    rows = []
+    for position, won in enumerate(results):
+        team_1_score, team_2_score = (110, 100) if won else (100, 110)
+        home_team, away_team = (1, 2) if position % 2 == 0 else (2, 1)
+        rows.append({
+            "game_id": position + 1, "league": "standard", "season": 2022, "date": date(2022, 11, 1 + position), "status": GAME_STATUS_FINISHED,
+            "home_team_id": home_team, "home_team_name": f"Team {home_team}",
+            "home_team_score": team_1_score if home_team == 1 else team_2_score,
+            "away_team_id": away_team, "away_team_name": f"Team {away_team}",
+            "away_team_score": team_2_score if home_team == 1 else team_1_score
+        })
+    # a game in progress, with scores, and a game that has not been played yet
+    rows.append({**rows[-1], "game_id": len(results) + 1, "date": date(2022, 12, 30), "status": 2, "home_team_score": 48, "away_team_score": 48})
+    rows.append({**rows[-1], "game_id": len(results) + 2, "date": date(2022, 12, 31), "status": 1, "home_team_score": None, "away_team_score": None})
+    return transform_games(pd.DataFrame(rows).rename(columns={
+        "game_id": "id", "date": "date.start", "status": "status.short", "home_team_id": "teams.home.id", "home_team_name": "teams.home.name", "home_team_score": "scores.home.points",
+        "away_team_id": "teams.visitors.id", "away_team_name": "teams.visitors.name", "away_team_score": "scores.visitors.points"
+    }))
+
+def test_transform_team_form():
+    results = [True] * 9 + [False, False, True]
+    df_form = transform_team_form(df_games=make_transformed_games(results))
+
+    team_1 = df_form[df_form["team_id"] == 1]
+    team_2 = df_form[df_form["team_id"] == 2]
+    assert len(df_form) == 2 * len(results)
+    assert team_1["wins"].tolist() == [1, 2, 3, 4, 5, 6, 7, 8, 9, 9, 9, 10]
+    assert team_1["streak"].tolist() == [1, 2, 3, 4, 5, 6, 7, 8, 9, -1, -2, 1]
+    assert team_2["streak"].tolist() == [-1, -2, -3, -4, -5, -6, -7, -8, -9, 1, 2, -1]
+    # the last 10 games of the 12th game are games 3 to 12
+    assert team_1["last_10_wins"].tolist()[-1] == 8
+    assert team_1["last_10_losses"].tolist()[-1] == 2
+
+def test_transform_team_form_skips_games_in_progress():
+    df_games = make_transformed_games([True, False])
+    assert df_games["status"].tolist() == [GAME_STATUS_FINISHED, GAME_STATUS_FINISHED, 2, 1]
+
+    df_form = transform_team_form(df_games=df_games)
+    assert sorted(df_form["game_id"].unique().tolist()) == [1, 2]
+    assert df_form.groupby("team_id")["losses"].max().tolist() == [1, 1]
+
+    # games loaded before their status was stored count once both scores are known
+    df_form = transform_team_form(df_games=df_games.assign(status=pd.array([None] * 4, dtype="Int16")))
+    assert sorted(df_form["game_id"].unique().tolist()) == [1, 2, 3]
+
+def test_transform_team_season_summary():
+    df_summary = transform_team_season_summary(df_team_form=transform_team_form(df_games=make_transformed_games([True, False, True, True])))
+
+    team_1 = df_summary[df_summary["team_id"] == 1].iloc[0]
+    assert (team_1["games_played"], team_1["wins"], team_1["losses"]) == (4, 3, 1)
+    assert (team_1["home_wins"], team_1["home_losses"], team_1["away_wins"], team_1["away_losses"]) == (2, 0, 1, 1)
+    assert team_1["points_per_game"] == 107.5
+    assert team_1["home_points_per_game"] == 110.0
+    assert team_1["away_points_per_game"] == 105.0
+    assert team_1["streak"] == 2
+
+def test_transform_player_season_summary():
+    df_players_statistics = pd.DataFrame({
+        "player_id": [1, 2], "team_id": [10, 10], "league": "standard", "season": 2022, "first_name": ["A", "B"], "last_name": ["C", "D"],
+        "position": ["G", "F"], "points": [50, 9], "rebounds": [20, 3], "assists": [10, 0], "minutes": [120.0, 30.0], "games_played": [4, 2]
+    })
+
+    df_summary = transform_player_season_summary(df_players_statistics=df_players_statistics)
+    assert df_summary["points_per_game"].tolist() == [12.5, 4.5]
+    assert df_summary["rebounds_per_game"].tolist() == [5.0, 1.5]
+    assert df_summary["minutes_per_game"].tolist() == [30.0, 15.0]
@@ -0,0 +1,45 @@
+from etl_project.assets.schema import create_tables
+from sqlalchemy import MetaData, Table, Column, Integer, String, Date, inspect, text
+
+def test_players_statistics_has_a_primary_key():
+    tables = create_tables(metadata=MetaData())
+
+    assert {column.name for column in tables["players_statistics"].primary_key.columns} == {"player_id", "team_id", "league", "season"}
+
+def test_partitioned_tables_include_the_season_in_their_primary_key():
+    tables = create_tables(metadata=MetaData(), partition_by_season=True)
+
+    for table in tables.values():
+        assert table.dialect_options["postgresql"]["partition_by"] == "LIST (season)"
+        assert "season" in table.primary_key.columns
+    assert not create_tables(metadata=MetaData())["games"].dialect_options["postgresql"]["partition_by"]
+
+def test_create_table_migrates_the_players_statistics_table_of_earlier_versions(postgresql_client):
+    # earlier versions created the table without a key and loaded a row per position
+    baseline_metadata = MetaData()
+    Table(
+        "players_statistics", baseline_metadata,
+        Column("player_id", Integer), Column("birth_date", Date), Column("jersey_number", Integer), Column("season", Integer),
+        Column("league", String), Column("first_name", String), Column("last_name", String), Column("team_id", Integer),
+        Column("position", String), Column("current_age", Integer), Column("points", Integer), Column("player_table_id", String)
+    )
+    postgresql_client.create_table(metadata=baseline_metadata)
+    try:
+        with postgresql_client.begin() as connection:
+            connection.execute(text(
+                "insert into players_statistics (player_id, season, league, team_id, position, points, player_table_id) values "
+                "(1, 2022, 'standard', 10, 'SG', 300, '1standard2022'), (1, 2022, 'standard', 10, 'PG', 200, '1standard2022'), "
+                "(2, 2022, 'standard', 10, 'C', 100, '2standard2022'), (null, 2022, 'standard', 10, 'C', 50, null)"
+            ))
+        postgresql_client._schema_cache["tables"].discard("players_statistics")
+
+        metadata = MetaData()
+        table = create_tables(metadata=metadata)["players_statistics"]
+        postgresql_client.create_table(metadata=metadata)
+
+        primary_key = inspect(postgresql_client.engine).get_pk_constraint("players_statistics")["constrained_columns"]
+        assert set(primary_key) == {"player_id", "team_id", "league", "season"}
+        assert sorted(row["player_id"] for row in postgresql_client.select_all(table)) == [1, 2]
+        postgresql_client.upsert(data=[{"player_id": 1, "season": 2022, "league": "standard", "team_id": 10, "points": 500}], table=table, metadata=metadata)
+    finally:
+        postgresql_client.drop_table("players_statistics")
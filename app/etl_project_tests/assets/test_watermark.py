@@ -0,0 +1,22 @@
+from etl_project.assets.watermark import Watermark
+from datetime import date
+import uuid
+
+def test_watermark_never_moves_backwards(postgresql_client):
+    watermark = Watermark(pipeline_name="nba", postgresql_client=postgresql_client, watermark_table_name=f"pipeline_watermarks_{uuid.uuid4().hex[:8]}")
+    try:
+        assert watermark.get(league="standard", season=2022) is None
+        watermark.set(league="standard", season=2022, watermark=date(2023, 1, 10))
+        # e.g. a rerun of an earlier extract
+        watermark.set(league="standard", season=2022, watermark=date(2023, 1, 5))
+        assert watermark.get(league="standard", season=2022) == date(2023, 1, 10)
+        watermark.set(league="standard", season=2022, watermark=date(2023, 1, 12))
+        assert watermark.get(league="standard", season=2022) == date(2023, 1, 12)
+
+        watermark.set(league="standard", season=2021, watermark=date(2022, 6, 16))
+        other_pipeline_watermark = Watermark(pipeline_name="nba_backfill", postgresql_client=postgresql_client, watermark_table_name=watermark.table.name)
+        assert watermark.get(league="standard", season=2021) == date(2022, 6, 16)
+        assert watermark.get(league="africa", season=2022) is None
+        assert other_pipeline_watermark.get(league="standard", season=2022) is None
+    finally:
+        postgresql_client.drop_table(watermark.table.name)
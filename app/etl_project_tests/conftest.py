@@ -0,0 +1,5 @@
+"""
+The throwaway Postgres database of the benchmark suite, for the tests of the database-backed code.
+Those tests are skipped when neither BENCHMARK_DATABASE_URL nor `pgserver` is available.
+"""
+from etl_project_benchmarks.conftest import database_url, postgresql_client # noqa: F401
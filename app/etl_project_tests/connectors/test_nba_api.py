@@ -1,7 +1,12 @@
 from dotenv import load_dotenv
-from etl_project.connectors.nba_api import NBAApiClient
+from etl_project.connectors.nba_api import NBAApiClient, GAME_STATUS_FINISHED, FINISHED_SEASON_GRACE_DAYS
+from etl_project.connectors.response_cache import ResponseCache
+from etl_project.connectors.rate_limiter import TokenBucketRateLimiter
+from datetime import date, timedelta
 import os 
+import json
 import pytest
+import requests
 
 @pytest.fixture
 def setup():
@@ -21,4 +26,72 @@ def test_get_standings(setup):
     data = nba_client.get_standings(league="standard", season=2022)
 
     assert type(data) == list
-    assert len(data) > 0
\ No newline at end of file
+    assert len(data) > 0
+
+def test_season_is_historical_once_every_game_is_finished(tmp_path):
+    response_cache = ResponseCache(cache_folder_path=tmp_path)
+    nba_client = NBAApiClient(api_key="test", response_cache=response_cache)
+    last_game = date.today() - timedelta(days=FINISHED_SEASON_GRACE_DAYS + 1)
+    games = [
+        {"id": 1, "date": {"start": "2020-01-01T00:00:00.000Z"}, "status": {"short": GAME_STATUS_FINISHED}},
+        {"id": 2, "date": {"start": f"{last_game}T00:00:00.000Z"}, "status": {"short": 1}}
+    ]
+    params = {"league": "standard", "season": 2019}
+
+    # a game still to play, e.g. a season running past July
+    nba_client._record_finished_season(endpoint="games", params=params, data=games)
+    assert not nba_client._is_finished_season(league="standard", season=2019)
+
+    games[1]["status"]["short"] = GAME_STATUS_FINISHED
+    nba_client._record_finished_season(endpoint="games", params={**params, "date": str(last_game)}, data=games)
+    assert not nba_client._is_finished_season(league="standard", season=2019)
+    nba_client._record_finished_season(endpoint="games", params=params, data=games)
+    assert nba_client._is_finished_season(league="standard", season=2019)
+    assert not nba_client._is_finished_season(league="vegas", season=2019)
+    # later runs learn it from the response cache
+    assert NBAApiClient(api_key="test", response_cache=response_cache)._is_finished_season(league="standard", season=2019)
+
+def test_season_is_not_finished_right_after_its_last_game():
+    nba_client = NBAApiClient(api_key="test")
+    games = [{"id": 1, "date": {"start": f"{date.today()}T00:00:00.000Z"}, "status": {"short": GAME_STATUS_FINISHED}}]
+    nba_client._record_finished_season(endpoint="games", params={"league": "standard", "season": 2022}, data=games)
+    assert not nba_client._is_finished_season(league="standard", season=2022)
+
+class FakeSession:
+    """Answers every request with the same payload and counts the requests"""
+    def __init__(self, payload: dict, status_code: int = 200, headers: dict = None):
+        self.payload = payload
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.requests = 0
+    def get(self, url, params, headers, timeout):
+        self.requests += 1
+        response = requests.Response()
+        response.status_code = self.status_code
+        response._content = json.dumps(self.payload).encode("utf-8")
+        response.headers.update(self.headers)
+        return response
+
+def test_get_raises_when_still_rate_limited_after_the_retries():
+    nba_client = NBAApiClient(api_key="test", max_retries=1, backoff_factor=0.0, rate_limiter=TokenBucketRateLimiter(requests_per_minute=100000))
+    nba_client.session = FakeSession(payload={"errors": {"rateLimit": "Too many requests"}, "response": []})
+    with pytest.raises(Exception, match="rate limit"):
+        nba_client.get_players(season=2022, team=1)
+    assert nba_client.session.requests == 2
+
+def test_retry_after_is_capped_at_the_max_backoff():
+    nba_client = NBAApiClient(api_key="test", max_backoff=5.0)
+    response = requests.Response()
+    response.headers["Retry-After"] = "86400"
+    assert nba_client._backoff_seconds(attempt=0, response=response) == 5.0
+    response.headers["Retry-After"] = "2"
+    assert nba_client._backoff_seconds(attempt=0, response=response) == 2.0
+
+@pytest.mark.parametrize("errors", [{"rateLimit": "Too many requests"}, {"requests": "You have reached the request limit for the day"}, {"token": "Error/Missing application key"}])
+def test_error_replies_are_never_cached(tmp_path, errors):
+    response_cache = ResponseCache(cache_folder_path=tmp_path)
+    nba_client = NBAApiClient(api_key="test", max_retries=0, response_cache=response_cache)
+    nba_client.session = FakeSession(payload={"errors": errors, "response": []})
+    with pytest.raises(Exception):
+        nba_client.get_teams(league="standard")
+    assert list(tmp_path.glob("*.json")) == []
@@ -0,0 +1,18 @@
+from etl_project.connectors.postgresql import PostgreSqlClient, split_rows, MAX_STATEMENT_PARAMETERS
+from sqlalchemy import Table, MetaData, Column, Integer
+import pytest
+
+def test_split_rows_keeps_statements_within_the_parameter_limit():
+    table = Table("wide", MetaData(), *[Column(f"column_{position}", Integer) for position in range(11)])
+    rows = [{column.name: row for column in table.columns} for row in range(5000)]
+    slices = list(split_rows(rows=rows, table=table))
+    assert all(len(rows_slice) * len(table.columns) <= MAX_STATEMENT_PARAMETERS for rows_slice in slices)
+    assert [row for rows_slice in slices for row in rows_slice] == rows
+    assert list(split_rows(rows=[], table=table)) == []
+
+def test_overwrite_rejects_partitioned_tables():
+    postgresql_client = PostgreSqlClient(server_name="localhost", database_name="nba", username="nba", password="nba")
+    metadata = MetaData()
+    table = Table("games", metadata, Column("id", Integer, primary_key=True), Column("season", Integer, primary_key=True), postgresql_partition_by="LIST (season)")
+    with pytest.raises(Exception, match="partitioned by season"):
+        postgresql_client.overwrite_chunks(chunks=[[{"id": 1, "season": 2022}]], table=table, metadata=metadata)
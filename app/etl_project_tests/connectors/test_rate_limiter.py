@@ -0,0 +1,15 @@
+from etl_project.connectors.rate_limiter import TokenBucketRateLimiter
+
+def test_reserve_waits_once_bucket_is_empty():
+    rate_limiter = TokenBucketRateLimiter(requests_per_minute=2)
+
+    assert rate_limiter.reserve() == 0
+    assert rate_limiter.reserve() == 0
+    assert rate_limiter.reserve() > 0
+
+def test_update_from_headers():
+    rate_limiter = TokenBucketRateLimiter(requests_per_minute=10)
+    rate_limiter.update_from_headers({"X-RateLimit-Limit": "300", "X-RateLimit-Remaining": "0"})
+
+    assert rate_limiter.capacity == 300
+    assert rate_limiter.reserve() > 0
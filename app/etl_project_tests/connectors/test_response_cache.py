@@ -0,0 +1,45 @@
+from etl_project.connectors.response_cache import ResponseCache
+import time
+
+def test_set_and_get(tmp_path):
+    cache = ResponseCache(cache_folder_path=tmp_path, ttl_seconds={"teams": 60})
+    key = ResponseCache.make_key(endpoint="teams", params={"league": "standard"})
+    cache.set(key=key, data=[{"id": 1}], ttl_key="teams", etag='"abc"')
+    entry = cache.get(key)
+
+    assert entry["data"] == [{"id": 1}]
+    assert entry["etag"] == '"abc"'
+    assert cache.is_fresh(entry)
+
+def test_entry_expires_after_ttl(tmp_path):
+    cache = ResponseCache(cache_folder_path=tmp_path, ttl_seconds={"games": 0})
+    key = ResponseCache.make_key(endpoint="games", params={"league": "standard", "season": 2022})
+    cache.set(key=key, data=[], ttl_key="games")
+
+    assert not cache.is_fresh(cache.get(key))
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = ResponseCache(cache_folder_path=tmp_path, max_entries=2)
+    for team in [1, 2]:
+        cache.set(key=str(team), data=[team], ttl_key="players")
+        time.sleep(0.01)
+    cache.get("1")
+    time.sleep(0.01)
+    cache.set(key="3", data=[3], ttl_key="players")
+
+    assert cache.get("1") is not None
+    assert cache.get("2") is None
+    assert cache.get("3") is not None
+
+def test_folder_is_only_scanned_when_the_cap_is_exceeded(tmp_path, monkeypatch):
+    cache = ResponseCache(cache_folder_path=tmp_path, max_entries=20)
+    scans = []
+    evict = cache._evict
+    monkeypatch.setattr(cache, "_evict", lambda: scans.append(1) or evict())
+    for team in range(21):
+        cache.set(key=str(team), data=[team], ttl_key="players")
+    cache.set(key="20", data=[20], ttl_key="players")
+
+    assert len(scans) == 1
+    assert len(list(tmp_path.glob("*.json"))) == 18
+    assert ResponseCache(cache_folder_path=tmp_path, max_entries=20).get("20") is not None
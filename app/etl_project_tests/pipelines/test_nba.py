@@ -0,0 +1,55 @@
+from etl_project.assets.checkpoint import Checkpoint
+from etl_project.assets.dag import DagTaskError
+from etl_project.assets.nba import TeamDirectory
+from etl_project.assets.pipeline_logging import PipelineLogging
+from etl_project.assets.schema import create_tables
+from etl_project_benchmarks.conftest import create_benchmark_nba_api_client
+from etl_project_benchmarks.mock_nba_api import MockNBAApi
+import etl_project.pipelines.nba as nba_pipeline
+from sqlalchemy import MetaData
+import random
+import pytest
+
+def test_resumed_run_skips_its_completed_steps(postgresql_client, tmp_path, monkeypatch):
+    monkeypatch.setattr(nba_pipeline, "create_postgresql_client", lambda config={}: postgresql_client)
+    loaded_tables = []
+    def load(**kwargs):
+        loaded_tables.append(kwargs["table"].name)
+        if kwargs["table"].name == "players_statistics" and fail_players_statistics:
+            raise Exception("players_statistics load failed")
+        return load_table(**kwargs)
+    load_table = nba_pipeline.load
+    monkeypatch.setattr(nba_pipeline, "load", load)
+
+    config = {"resume": True, "landing_folder_path": str(tmp_path / "landing")}
+    run_id = random.randint(1, 2 ** 31 - 1)
+    with MockNBAApi(teams=4, players_per_team=3, games_per_team=6) as mock_nba_api:
+        nba_api_client = create_benchmark_nba_api_client(base_url=mock_nba_api.base_url)
+        def run_pipeline():
+            return nba_pipeline.run_pipeline(
+                pipeline_name="nba", config=config, league="standard", season=2022,
+                pipeline_logging=PipelineLogging(pipeline_name="nba", log_folder_path=str(tmp_path)),
+                postgresql_logging_client=postgresql_client, nba_api_client=nba_api_client,
+                team_directory=TeamDirectory(nba_api_client=nba_api_client), run_id=run_id
+            )
+        try:
+            fail_players_statistics = True
+            with pytest.raises(DagTaskError):
+                run_pipeline()
+            completed_steps = Checkpoint(postgresql_client=postgresql_client).get(run_id=run_id)
+            assert {"extract_games", "extract_standings", "extract_players", "extract_player_statistics"} <= set(completed_steps)
+            assert "load_players_statistics" not in completed_steps
+
+            fail_players_statistics = False
+            loaded_tables.clear()
+            with nba_api_client.count_requests() as request_counter:
+                run_metrics = run_pipeline()
+            assert request_counter.requests == 0
+            assert "players_statistics" in loaded_tables
+            assert not {f"load_{table_name}" for table_name in loaded_tables} & set(completed_steps)
+            assert {"games", "standings", "players_statistics"} <= set(run_metrics["load"])
+        finally:
+            nba_api_client.close()
+            for table_name in create_tables(metadata=MetaData()):
+                postgresql_client.drop_table(table_name)
+            postgresql_client.drop_table("row_hashes")